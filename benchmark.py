@@ -0,0 +1,964 @@
+"""
+Performance Benchmarks
+Script đo hiệu năng các thành phần của hệ thống Face Access Control
+
+Usage:
+    python benchmark.py matching [--sizes 100 1000 10000]
+    python benchmark.py prototype [--users 1000] [--per-user 100]
+    python benchmark.py ann [--users 10000] [--nprobe 1 4 8 16 32]
+    python benchmark.py batch [--batch-sizes 1 2 4 8 16]
+    python benchmark.py tracker [--frames 3000] [--people 3]
+    python benchmark.py stride [--frames 300] [--speed 2]
+    python benchmark.py detection [--max-sides 0 640 320]
+    python benchmark.py train [--users 20] [--per-user 30] [--workers 1 2 4]
+    python benchmark.py quantization [--users 1000] [--per-user 100]
+    python benchmark.py threshold [--far 0.001]
+    python benchmark.py render [--frames 300] [--faces 2]
+    python benchmark.py pipeline [--frames 300]
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+import config
+from modules.gallery_store import GalleryStore
+from modules.recognizer_sface import SFaceRecognizer
+
+
+def print_header(title: str):
+    print("=" * 60)
+    print(title)
+    print("=" * 60)
+
+
+def random_unit_vectors(n: int, dim: int, seed: int = 0) -> np.ndarray:
+    """Sinh n vector đơn vị ngẫu nhiên (giả lập embeddings)"""
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def synthetic_gallery(
+    num_users: int, per_user: int, dim: int, noise: float = 0.6, seed: int = 0
+):
+    """
+    Gallery giả lập có cấu trúc identity: mỗi user = 1 tâm + nhiễu
+
+    Returns:
+        (names, gallery (N, D), probes (num_users, D), probe_names)
+    """
+    rng = np.random.default_rng(seed)
+    centers = random_unit_vectors(num_users, dim, seed=seed)
+    samples = np.repeat(centers, per_user, axis=0)
+    samples += noise * rng.standard_normal(samples.shape).astype(np.float32) / np.sqrt(dim)
+    samples /= np.linalg.norm(samples, axis=1, keepdims=True)
+
+    probes = centers + noise * rng.standard_normal(centers.shape).astype(np.float32) / np.sqrt(dim)
+    probes /= np.linalg.norm(probes, axis=1, keepdims=True)
+
+    names = [f"user{i:05d}" for i in range(num_users) for _ in range(per_user)]
+    probe_names = [f"user{i:05d}" for i in range(num_users)]
+    return names, samples, probes, probe_names
+
+
+def time_call(fn, repeats: int) -> float:
+    """Thời gian trung bình mỗi lần gọi (ms)"""
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) * 1000.0 / repeats
+
+
+# ==================== MATCHING ====================
+
+
+def bench_matching(args):
+    """Latency của predict-matching theo kích thước gallery"""
+    print_header("GALLERY MATCHING: per-vector loop vs vectorized")
+
+    recognizer = SFaceRecognizer()
+    recognizer.update_threshold(config.SFACE_THRESHOLD)
+
+    print(f"\n{'gallery':>10} | {'loop (ms)':>10} | {'matrix (ms)':>11} | {'speedup':>8}")
+    print("-" * 50)
+
+    for size in args.sizes:
+        gallery = random_unit_vectors(size, args.dim, seed=size)
+        names = [f"user{i // 100:05d}" for i in range(size)]
+        recognizer._set_gallery(names, gallery)
+        probe = gallery[size // 2] + 0.01
+
+        # Baseline: một lần gọi match / vector như phiên bản cũ
+        known_list = list(gallery)
+        if recognizer.model is not None:
+
+            def loop_match():
+                scores = [
+                    recognizer.model.match(
+                        probe.astype(np.float32).reshape(1, -1),
+                        known.astype(np.float32).reshape(1, -1),
+                        cv2.FaceRecognizerSF_FR_COSINE,
+                    )
+                    for known in known_list
+                ]
+                return int(np.argmax(scores))
+
+        else:
+
+            def loop_match():
+                scores = [
+                    float(np.dot(probe.astype(np.float32), known.astype(np.float32)))
+                    for known in known_list
+                ]
+                return int(np.argmax(scores))
+
+        repeats = max(3, min(200, 200000 // size))
+        loop_ms = time_call(loop_match, max(1, repeats // 10))
+        matrix_ms = time_call(lambda: recognizer.match_embedding(probe), repeats)
+
+        print(
+            f"{size:>10} | {loop_ms:>10.3f} | {matrix_ms:>11.4f} | "
+            f"{loop_ms / matrix_ms:>7.1f}x"
+        )
+
+    print("-" * 50)
+    if recognizer.model is None:
+        print("(SFace model not loaded: loop baseline uses np.dot per vector)")
+
+
+# ==================== PROTOTYPE INDEX ====================
+
+
+def evaluate_index(recognizer, probes, probe_names, reference=None):
+    """
+    Chạy match_embedding cho từng probe
+
+    Returns:
+        (ms/probe, accuracy, agreement với reference, kết quả)
+    """
+    start = time.perf_counter()
+    results = [recognizer.match_embedding(p)[0] for p in probes]
+    ms = (time.perf_counter() - start) * 1000.0 / len(probes)
+
+    accuracy = np.mean([r == t for r, t in zip(results, probe_names)])
+    agreement = (
+        np.mean([r == f for r, f in zip(results, reference)])
+        if reference is not None
+        else 1.0
+    )
+    return ms, accuracy, agreement, results
+
+
+def bench_prototype(args):
+    """Flat scan vs prototype index (centroid / k-medoids)"""
+    print_header("PROTOTYPE INDEX: latency and accuracy vs full scan")
+
+    names, gallery, probes, probe_names = synthetic_gallery(
+        args.users, args.per_user, args.dim, noise=args.noise
+    )
+    print(f"Gallery: {args.users} users x {args.per_user} images = {len(gallery)} rows")
+
+    recognizer = SFaceRecognizer()
+    recognizer.update_threshold(0.0)
+    probes = probes[: args.probes]
+    probe_names = probe_names[: args.probes]
+
+    recognizer.set_index_type("flat")
+    recognizer._set_gallery(names, gallery)
+    flat_ms, flat_acc, _, flat_results = evaluate_index(recognizer, probes, probe_names)
+
+    print(f"\n{'index':>24} | {'ms/probe':>9} | {'speedup':>8} | {'accuracy':>8} | {'agree':>6}")
+    print("-" * 68)
+    print(f"{'flat':>24} | {flat_ms:>9.3f} | {1.0:>7.1f}x | {flat_acc:>8.3f} | {1.0:>6.3f}")
+
+    variants = [("centroid", 1), ("centroid", 3), ("kmedoids", 1), ("kmedoids", 3)]
+    for method, per_user in variants:
+        config.SFACE_PROTOTYPE_METHOD = method
+        config.SFACE_PROTOTYPES_PER_USER = per_user
+        config.SFACE_PROTOTYPE_TOP_K = args.top_k
+        recognizer.set_index_type("prototype")
+        ms, acc, agree, _ = evaluate_index(recognizer, probes, probe_names, flat_results)
+        label = f"{method} x{per_user} top{args.top_k}"
+        print(f"{label:>24} | {ms:>9.3f} | {flat_ms / ms:>7.1f}x | {acc:>8.3f} | {agree:>6.3f}")
+
+    print("-" * 68)
+
+
+# ==================== ANN (IVF) INDEX ====================
+
+
+def bench_ann(args):
+    """IVF index: recall@1 và latency theo nprobe"""
+    print_header("IVF INDEX: recall@1 / latency vs nprobe")
+
+    names, gallery, probes, probe_names = synthetic_gallery(
+        args.users, args.per_user, args.dim, noise=args.noise
+    )
+    probes = probes[: args.probes]
+    probe_names = probe_names[: args.probes]
+    print(f"Gallery: {args.users} users x {args.per_user} images = {len(gallery)} rows")
+
+    # Không ghi đè index thật của hệ thống
+    config.SFACE_INDEX_PATH = os.path.join(tempfile.mkdtemp(), "index.npz")
+    config.SFACE_IVF_NLIST = args.nlist
+
+    recognizer = SFaceRecognizer()
+    recognizer.update_threshold(0.0)
+
+    recognizer.set_index_type("flat")
+    recognizer._set_gallery(names, gallery)
+    flat_ms, _, _, flat_results = evaluate_index(recognizer, probes, probe_names)
+
+    start = time.perf_counter()
+    recognizer.set_index_type("ivf")
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    recognizer.set_index_type("ivf")  # lần 2: đọc lại index đã lưu
+    load_s = time.perf_counter() - start
+
+    print(f"nlist: {len(recognizer.index.centroids)}")
+    print(f"Build + save: {build_s:.2f}s | Startup load: {load_s:.2f}s")
+
+    print(f"\n{'nprobe':>8} | {'ms/probe':>9} | {'speedup':>8} | {'recall@1':>8}")
+    print("-" * 44)
+    print(f"{'flat':>8} | {flat_ms:>9.3f} | {1.0:>7.1f}x | {1.0:>8.3f}")
+    for nprobe in args.nprobe:
+        recognizer.index.nprobe = nprobe
+        ms, _, recall, _ = evaluate_index(recognizer, probes, probe_names, flat_results)
+        print(f"{nprobe:>8} | {ms:>9.3f} | {flat_ms / ms:>7.1f}x | {recall:>8.3f}")
+    print("-" * 44)
+
+
+# ==================== BATCHED EMBEDDING ====================
+
+
+def load_face_crops(count: int):
+    """Lấy ảnh từ dataset (resize 112x112) làm face crops mẫu"""
+    crops = []
+    for root, _, files in os.walk(config.DATASET_DIR):
+        for f in sorted(files):
+            if f.lower().endswith((".jpg", ".jpeg", ".png")):
+                img = cv2.imread(os.path.join(root, f))
+                if img is not None:
+                    crops.append(cv2.resize(img, (112, 112)))
+            if len(crops) >= count:
+                return crops
+
+    # Dataset trống: dùng ảnh ngẫu nhiên
+    rng = np.random.default_rng(0)
+    while len(crops) < count:
+        crops.append(rng.integers(0, 255, (112, 112, 3), dtype=np.uint8))
+    return crops
+
+
+def bench_batch(args):
+    """Throughput (faces/sec) của extract_embeddings theo batch size"""
+    print_header("BATCHED EMBEDDING: faces/sec vs batch size")
+
+    recognizer = SFaceRecognizer()
+    if recognizer.model is None:
+        print("[X] SFace model not loaded. Run: python download_models.py")
+        return
+
+    crops = load_face_crops(max(args.batch_sizes))
+
+    print(f"\n{'batch':>6} | {'single (faces/s)':>16} | {'batched (faces/s)':>17} | {'speedup':>8}")
+    print("-" * 58)
+    for size in args.batch_sizes:
+        batch = crops[:size]
+        single_ms = time_call(
+            lambda: [recognizer.extract_embedding(c) for c in batch], args.repeats
+        )
+        batched_ms = time_call(lambda: recognizer.extract_embeddings(batch), args.repeats)
+        single_fps = size * 1000.0 / single_ms
+        batched_fps = size * 1000.0 / batched_ms
+        print(
+            f"{size:>6} | {single_fps:>16.1f} | {batched_fps:>17.1f} | "
+            f"{batched_fps / single_fps:>7.2f}x"
+        )
+    print("-" * 58)
+    if not recognizer.batch_supported:
+        print("(Batched forward not supported by this model/OpenCV: fell back to single mode)")
+
+
+# ==================== TRACKER ====================
+
+
+def simulate_doorway(frames: int, people: int, seed: int = 0):
+    """
+    Luồng detection giả lập: người đi qua cửa với jitter và miss ngẫu nhiên
+
+    Returns:
+        List (theo frame) các list detection dict
+    """
+    rng = np.random.default_rng(seed)
+    stream = []
+    visit_length = 150
+    for f in range(frames):
+        detections = []
+        for p in range(people):
+            # Mỗi người xuất hiện lệch pha, đi ngang qua khung hình
+            phase = (f + p * visit_length // max(people, 1)) % (visit_length * 2)
+            if phase >= visit_length or rng.random() < 0.05:
+                continue
+            x = 50 + phase * 3 + p * 120 + rng.normal(0, 2)
+            y = 150 + p * 40 + rng.normal(0, 2)
+            detections.append(
+                {
+                    "bbox": (int(x), int(y), 110, 130),
+                    "landmarks": np.zeros((5, 2), np.float32),
+                    "confidence": 0.9,
+                }
+            )
+        stream.append(detections)
+    return stream
+
+
+def bench_tracker(args):
+    """Số lần gọi recognizer: mỗi frame vs tracker"""
+    from modules.tracker import FaceTracker
+
+    print_header("FACE TRACKER: recognizer invocations per stream")
+
+    stream = simulate_doorway(args.frames, args.people)
+    observations = sum(len(d) for d in stream)
+
+    tracker = FaceTracker()
+    logs = 0
+    for detections in stream:
+        for track in tracker.update(detections):
+            if tracker.needs_recognition(track, config.SFACE_THRESHOLD):
+                tracker.set_identity(track, "person", config.SFACE_THRESHOLD + 0.1)
+            if tracker.should_log(track):
+                logs += 1
+
+    print(f"Frames: {args.frames} | Face observations: {observations}")
+    print(f"Recognizer calls without tracker: {observations}")
+    print(f"Recognizer calls with tracker:    {tracker.recognitions}")
+    print(f"Reduction: {observations / max(tracker.recognitions, 1):.1f}x")
+    print(f"Tracks created: {tracker._next_id - 1} | Access log entries: {logs}")
+
+
+# ==================== DETECTION STRIDE ====================
+
+
+def synthetic_video(frames: int, speed: float, size=(640, 480)):
+    """
+    Video giả lập: ảnh dataset di chuyển ngang khung hình (speed px/frame)
+    """
+    source = None
+    for root, _, files in os.walk(config.DATASET_DIR):
+        images = sorted(f for f in files if f.lower().endswith((".jpg", ".jpeg", ".png")))
+        if images:
+            source = cv2.imread(os.path.join(root, images[0]))
+            break
+    if source is None:
+        source = load_face_crops(1)[0]
+
+    w, h = size
+    source = cv2.resize(source, (w // 2, h // 2))
+    video = []
+    for i in range(frames):
+        canvas = np.full((h, w, 3), 40, np.uint8)
+        offset = int((i * speed) % (w - source.shape[1]))
+        # Đi qua đi lại thay vì nhảy về đầu
+        if (int(i * speed) // (w - source.shape[1])) % 2:
+            offset = w - source.shape[1] - offset
+        canvas[h // 4 : h // 4 + source.shape[0], offset : offset + source.shape[1]] = source
+        video.append(canvas)
+    return video
+
+
+def bench_stride(args):
+    """Detection mỗi frame vs stride + optical flow"""
+    from modules.detector_yunet import YuNetDetector
+    from modules.tracker import iou_matrix
+
+    print_header("DETECTION STRIDE: ms/frame and box accuracy")
+
+    video = synthetic_video(args.frames, args.speed)
+
+    full = YuNetDetector()
+    if full.model is None:
+        print("[X] YuNet model not loaded. Run: python download_models.py")
+        return
+
+    start = time.perf_counter()
+    reference = [full.detect_with_landmarks(f) for f in video]
+    full_ms = (time.perf_counter() - start) * 1000.0 / len(video)
+
+    print(f"\n{'mode':>18} | {'ms/frame':>9} | {'YuNet calls':>11} | {'mean IoU':>8}")
+    print("-" * 56)
+    print(f"{'every frame':>18} | {full_ms:>9.2f} | {len(video):>11} | {1.0:>8.3f}")
+
+    for stride, adaptive in [(2, False), (4, False), (3, True)]:
+        detector = YuNetDetector()
+        detector.detection_stride = detector.current_stride = stride
+        detector.adaptive_stride = adaptive
+
+        start = time.perf_counter()
+        outputs = [detector.detect_tracked(f) for f in video]
+        ms = (time.perf_counter() - start) * 1000.0 / len(video)
+
+        calls = sum(1 for o in outputs if not any(d.get("interpolated") for d in o))
+        ious = [
+            float(iou_matrix([o[0]["bbox"]], [r[0]["bbox"]])[0, 0])
+            for o, r in zip(outputs, reference)
+            if o and r
+        ]
+        label = f"stride {stride}" + (" adaptive" if adaptive else "")
+        print(f"{label:>18} | {ms:>9.2f} | {calls:>11} | {np.mean(ious) if ious else 0:>8.3f}")
+    print("-" * 56)
+
+
+# ==================== DOWNSCALED DETECTION ====================
+
+
+def bench_detection(args):
+    """Detection ms/frame theo độ phân giải camera và DETECTION_MAX_SIDE"""
+    from modules.detector_yunet import YuNetDetector
+
+    print_header("DOWNSCALED DETECTION: ms/frame vs resolution")
+
+    detector = YuNetDetector()
+    if detector.model is None:
+        print("[X] YuNet model not loaded. Run: python download_models.py")
+        return
+
+    base = synthetic_video(1, 0)[0]
+    resolutions = [(640, 480), (1280, 720), (1920, 1080), (3840, 2160)]
+
+    header = " | ".join(f"{'native' if m == 0 else f'max {m}':>10}" for m in args.max_sides)
+    print(f"\n{'resolution':>11} | {header}")
+    print("-" * (14 + 13 * len(args.max_sides)))
+    for w, h in resolutions:
+        frame = cv2.resize(base, (w, h))
+        cells = []
+        for max_side in args.max_sides:
+            detector.max_side = max_side
+            faces = detector.detect_with_landmarks(frame)
+            ms = time_call(lambda: detector.detect_with_landmarks(frame), args.repeats)
+            cells.append(f"{ms:>7.2f}/{len(faces)}f")
+        print(f"{f'{w}x{h}':>11} | " + " | ".join(f"{c:>10}" for c in cells))
+    print("-" * (14 + 13 * len(args.max_sides)))
+    print("(cell = ms per frame / faces found)")
+
+
+# ==================== PARALLEL TRAINING ====================
+
+
+def make_synthetic_dataset(root: str, users: int, per_user: int) -> None:
+    """Dataset giả lập: nhân bản ảnh dataset thật thành users x per_user ảnh"""
+    sources = []
+    for dirpath, _, files in os.walk(config.DATASET_DIR):
+        sources += [
+            os.path.join(dirpath, f)
+            for f in sorted(files)
+            if f.lower().endswith((".jpg", ".jpeg", ".png"))
+        ]
+    if not sources:
+        raise RuntimeError("Dataset is empty: cannot build synthetic dataset")
+
+    k = 0
+    for u in range(users):
+        user_dir = os.path.join(root, f"user{u:04d}")
+        os.makedirs(user_dir)
+        for i in range(per_user):
+            shutil.copyfile(sources[k % len(sources)], os.path.join(user_dir, f"{i:03d}.jpg"))
+            k += 1
+
+
+def bench_train(args):
+    """Thời gian training theo số worker process"""
+    print_header("PARALLEL TRAINING: speedup vs worker processes")
+
+    workdir = tempfile.mkdtemp()
+    # Không ghi đè embeddings / index / manifest / cache thật
+    redirected = {
+        "SFACE_GALLERY_DIR": os.path.join(workdir, "gallery"),
+        "SFACE_EMBEDDINGS_PATH": os.path.join(workdir, "embeddings.pkl"),
+        "SFACE_INDEX_PATH": os.path.join(workdir, "index.npz"),
+        "SFACE_MANIFEST_PATH": os.path.join(workdir, "manifest.json"),
+        "SFACE_CACHE_PATH": os.path.join(workdir, "embedding_cache.npz"),
+    }
+    saved = {key: getattr(config, key) for key in redirected}
+    try:
+        for key, value in redirected.items():
+            setattr(config, key, value)
+
+        dataset = os.path.join(workdir, "dataset")
+        make_synthetic_dataset(dataset, args.users, args.per_user)
+        print(f"Synthetic dataset: {args.users} users x {args.per_user} images")
+        print(f"CPU count: {os.cpu_count()}")
+
+        recognizer = SFaceRecognizer()
+        if recognizer.model is None:
+            print("(SFace model not loaded: timing detection + alignment only)")
+
+        timings = []
+        for workers in args.workers:
+            # Cache rỗng mỗi lần chạy: đo embedding song song, không đo cache hit
+            if os.path.exists(config.SFACE_CACHE_PATH):
+                os.remove(config.SFACE_CACHE_PATH)
+            start = time.perf_counter()
+            if recognizer.model is not None:
+                recognizer.train(dataset, num_workers=workers)
+            else:
+                jobs = recognizer._list_training_images(dataset)
+                recognizer._analyze_images([p for _, p in jobs], workers)
+            timings.append((workers, time.perf_counter() - start))
+
+        print(f"\n{'workers':>8} | {'seconds':>8} | {'images/s':>9} | {'speedup':>8}")
+        print("-" * 44)
+        total = args.users * args.per_user
+        for workers, seconds in timings:
+            print(
+                f"{workers:>8} | {seconds:>8.2f} | {total / seconds:>9.1f} | "
+                f"{timings[0][1] / seconds:>7.2f}x"
+            )
+        print("-" * 44)
+    finally:
+        for key, value in saved.items():
+            setattr(config, key, value)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+# ==================== QUANTIZED GALLERY ====================
+
+
+def load_real_gallery(probe_every: int = 5):
+    """
+    Gallery thật của hệ thống (không ghi gì ra đĩa), tách mỗi probe_every
+    dòng làm probe
+
+    Returns:
+        (names, gallery, probes, probe_names) hoặc None nếu chưa train
+    """
+    store = GalleryStore()
+    if store.exists():
+        names, gallery = store.read()
+        gallery = gallery.to_float32() if hasattr(gallery, "to_float32") else gallery
+    elif os.path.exists(config.SFACE_EMBEDDINGS_PATH):
+        import pickle
+
+        with open(config.SFACE_EMBEDDINGS_PATH, "rb") as f:
+            names, embeddings = pickle.load(f)
+        gallery = np.vstack([np.asarray(e).reshape(1, -1) for e in embeddings])
+    else:
+        return None
+
+    gallery = np.asarray(gallery, dtype=np.float32)
+    gallery = gallery / np.linalg.norm(gallery, axis=1, keepdims=True)
+    is_probe = np.arange(len(names)) % probe_every == 0
+    return (
+        [n for n, p in zip(names, is_probe) if not p],
+        gallery[~is_probe],
+        gallery[is_probe],
+        [n for n, p in zip(names, is_probe) if p],
+    )
+
+
+def evaluate_quantization(names, gallery, probes, probe_names, threshold):
+    """So sánh float32 / float16 / int8 trên cùng gallery + probes"""
+    recognizer = SFaceRecognizer()
+    recognizer.set_index_type("flat")
+    recognizer.update_threshold(threshold)
+
+    print(f"\n{'dtype':>8} | {'MB':>8} | {'ms/batch':>9} | {'accuracy':>8} | "
+          f"{'agree':>6} | {'max |ds|':>9} | {'flips':>5}")
+    print("-" * 72)
+
+    baseline = None
+    for dtype in ("float32", "float16", "int8"):
+        config.SFACE_GALLERY_DTYPE = dtype
+        recognizer._set_gallery(names, gallery)
+
+        ms = time_call(lambda: recognizer.index.search(probes), 5)
+        rows, scores = recognizer.index.search(probes)
+        results = [recognizer.known_names[r] for r in rows]
+        accuracy = np.mean([r == t for r, t in zip(results, probe_names)])
+
+        if baseline is None:
+            baseline = (results, scores)
+        agree = np.mean([r == b for r, b in zip(results, baseline[0])])
+        max_error = np.abs(scores - baseline[1]).max()
+        # Quyết định GRANTED/DENIED bị đổi so với float32
+        flips = int(np.sum((scores >= threshold) != (baseline[1] >= threshold)))
+
+        print(f"{dtype:>8} | {recognizer.gallery.nbytes / 2**20:>8.2f} | {ms:>9.2f} | "
+              f"{accuracy:>8.3f} | {agree:>6.3f} | {max_error:>9.5f} | {flips:>5}")
+    print("-" * 72)
+    config.SFACE_GALLERY_DTYPE = "float32"
+
+
+def bench_quantization(args):
+    """Bộ nhớ, tốc độ và độ chính xác của gallery float16 / int8 so với float32"""
+    print_header("QUANTIZED GALLERY: memory / accuracy vs float32")
+
+    real = load_real_gallery()
+    if real is not None:
+        print(f"\nReal gallery: {len(real[1])} rows, {len(real[2])} held-out probes")
+        evaluate_quantization(*real, threshold=config.SFACE_THRESHOLD)
+
+    names, gallery, probes, probe_names = synthetic_gallery(
+        args.users, args.per_user, config.SFACE_EMBEDDING_SIZE, noise=args.noise
+    )
+    probes = probes[: args.probes]
+    probe_names = probe_names[: args.probes]
+    print(f"\nSynthetic gallery: {args.users} users x {args.per_user} images "
+          f"= {len(gallery)} rows, {len(probes)} probes")
+    evaluate_quantization(names, gallery, probes, probe_names, threshold=args.threshold)
+
+
+# ==================== THRESHOLD ====================
+
+
+def genuine_impostor_scores(embeddings: np.ndarray, names: list):
+    """Cosine similarity của mọi cặp ảnh: (cùng người, khác người)"""
+    scores = embeddings @ embeddings.T
+    labels = np.asarray(names)
+    same = labels[:, None] == labels[None, :]
+    upper = np.triu(np.ones_like(same), k=1)
+    return scores[same & upper], scores[~same & upper]
+
+
+def bench_threshold(args):
+    """
+    Phân bố điểm cùng người / khác người trên dataset thật, crop bbox và
+    crop đã căn chỉnh, để chọn SFACE_THRESHOLD cho từng chế độ
+    """
+    print_header("SFACE THRESHOLD: genuine / impostor scores per crop mode")
+
+    recognizer = SFaceRecognizer()
+    if recognizer.model is None:
+        print("SFace model not loaded: run python download_models.py")
+        return
+    from modules import model_registry
+
+    detector = model_registry.thread_detector()
+    jobs = recognizer._list_training_images(config.DATASET_DIR)
+    print(f"Dataset: {len(jobs)} images, {len(set(u for u, _ in jobs))} users, "
+          f"target FAR {args.far:.4f}")
+
+    print(f"\n{'mode':>9} | {'genuine':>8} | {'impostor':>8} | {'min gen':>8} | "
+          f"{'max imp':>8} | {'thr@FAR':>8} | {'FRR@thr':>8} | "
+          f"{'FRR@' + str(config.SFACE_THRESHOLD):>9}")
+    print("-" * 92)
+    saved = config.SFACE_ALIGN_FACES
+    try:
+        for aligned in (False, True):
+            config.SFACE_ALIGN_FACES = aligned
+            names, rows = [], []
+            for user, path in jobs:
+                entry = recognizer._analyze_image_file(detector, path)
+                if entry is not None and recognizer._passes_quality(entry):
+                    names.append(user)
+                    rows.append(entry["embedding"])
+            if len(set(names)) < 2:
+                print(f"{'aligned' if aligned else 'bbox':>9} | need 2+ users with faces")
+                continue
+
+            genuine, impostor = genuine_impostor_scores(np.vstack(rows), names)
+            # Ngưỡng nhỏ nhất giữ tỷ lệ chấp nhận nhầm <= FAR
+            threshold = float(np.quantile(impostor, 1.0 - args.far))
+            print(
+                f"{'aligned' if aligned else 'bbox':>9} | {genuine.mean():>8.3f} | "
+                f"{impostor.mean():>8.3f} | {genuine.min():>8.3f} | "
+                f"{impostor.max():>8.3f} | {threshold:>8.3f} | "
+                f"{np.mean(genuine < threshold):>8.3f} | "
+                f"{np.mean(genuine < config.SFACE_THRESHOLD):>9.3f}"
+            )
+    finally:
+        config.SFACE_ALIGN_FACES = saved
+    print("-" * 92)
+
+
+# ==================== FRAME RENDERING ====================
+
+
+def render_legacy(frame, faces, fps_text, info_text):
+    """Per-frame path before FrameRenderer: copies + putText + 2 cvtColor"""
+    snapshot = frame.copy()
+    face_rgb = None
+    for i, (x, y, w, h) in enumerate(faces):
+        roi = frame[y : y + h, x : x + w]
+        if i == 0:
+            face_snapshot = roi.copy()
+        cv2.rectangle(frame, (x, y), (x + w, y + h), config.COLOR_SUCCESS, config.BBOX_THICKNESS)
+        cv2.putText(frame, f"user{i} (0.87)", (x, y - 10), config.FONT_FACE,
+                    config.FONT_SCALE, config.COLOR_SUCCESS, config.FONT_THICKNESS)
+        if i == 0:
+            face_rgb = cv2.cvtColor(roi, cv2.COLOR_BGR2RGB)
+    for text, org in ((fps_text, (10, 60)), (info_text, (10, 30))):
+        cv2.putText(frame, text, org, config.FONT_FACE, config.FONT_SCALE,
+                    config.COLOR_TEXT, config.FONT_THICKNESS)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), face_rgb
+
+
+def render_buffered(renderer, frame, faces, fps_text, info_text, rgb_output=True):
+    """Same drawing through FrameRenderer (rgb_output=False: MJPEG stream path)"""
+    display = renderer.begin(frame)
+    face_rgb = None
+    for i, bbox in enumerate(faces):
+        renderer.draw_face(display, bbox, f"user{i} (0.87)", config.COLOR_SUCCESS)
+        if i == 0:
+            renderer.set_face(bbox)
+            face_rgb = renderer.face_rgb(bbox)
+    renderer.draw_text(display, fps_text, (10, 60))
+    renderer.draw_text(display, info_text, (10, 30))
+    return (renderer.rgb(display) if rgb_output else display), face_rgb
+
+
+def bench_render(args):
+    """ms/frame và bộ nhớ cấp phát mỗi frame: đường vẽ cũ vs FrameRenderer"""
+    import tracemalloc
+    from modules.frame_renderer import FrameRenderer
+
+    print_header("FRAME RENDERING: ms/frame and allocations/frame")
+
+    # Fresh frame per iteration, like CameraManager.read()
+    base = synthetic_video(1, 0, size=(args.width, args.height))[0]
+    frames = [base.copy() for _ in range(args.frames)]
+    faces = [(60 + 150 * i, 120, 120, 140) for i in range(args.faces)]
+    info_text = "SFACE | YUNET"
+
+    def run(render):
+        # Timing pass, then an allocation pass (tracemalloc slows things down)
+        start = time.perf_counter()
+        for i, frame in enumerate(frames):
+            render(frame, f"FPS: {25 + i // 30 % 3}")
+        ms = (time.perf_counter() - start) * 1000.0 / len(frames)
+
+        tracemalloc.start()
+        allocated = 0
+        for i, frame in enumerate(frames):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            outputs = render(frame, f"FPS: {25 + i // 30 % 3}")
+            allocated += tracemalloc.get_traced_memory()[1] - before
+            del outputs
+        tracemalloc.stop()
+        return ms, allocated / len(frames) / 1024
+
+    renderer_rgb, renderer_stream = FrameRenderer(), FrameRenderer()
+    modes = [
+        ("legacy (copy+putText)", lambda f, t: render_legacy(f, faces, t, info_text)),
+        ("FrameRenderer, RGB", lambda f, t: render_buffered(renderer_rgb, f, faces, t, info_text)),
+        ("FrameRenderer, MJPEG", lambda f, t: render_buffered(
+            renderer_stream, f, faces, t, info_text, rgb_output=False)),
+    ]
+
+    print(f"\n{args.width}x{args.height}, {args.faces} faces, {args.frames} frames")
+    print(f"\n{'path':>22} | {'ms/frame':>9} | {'KiB allocated/frame':>19}")
+    print("-" * 57)
+    for label, render in modes:
+        ms, kib = run(render)
+        print(f"{label:>22} | {ms:>9.3f} | {kib:>19.1f}")
+    print("-" * 57)
+    print(f"Text cache: {renderer_rgb.text_hits} hits / {renderer_rgb.text_misses} misses")
+
+
+# ==================== PIPELINE ====================
+
+
+def bench_pipeline(args):
+    """Throughput tuần tự vs pipeline capture → detect → recognize → render"""
+    from modules.detector_yunet import YuNetDetector
+    from modules.frame_renderer import FrameRenderer
+    from modules.pipeline import FramePacket, FramePipeline
+
+    print_header("PIPELINE: sequential vs overlapped stages")
+
+    detector = YuNetDetector()
+    if detector.model is None:
+        print("[X] YuNet model not loaded. Run: python download_models.py")
+        return
+
+    recognizer = SFaceRecognizer()
+    if recognizer.model is not None:
+        recognize_label = "SFace"
+
+        def recognize(packet):
+            recognizer.predict_faces(packet.frame, packet.detections)
+            return packet
+    else:
+        # No SFace model: same-sized GIL-free OpenCV work per face instead
+        recognize_label = "simulated (no SFace model)"
+
+        def recognize(packet):
+            for d in packet.detections:
+                x, y, w, h = d["bbox"]
+                crop = cv2.resize(packet.frame[max(0, y) : y + h, max(0, x) : x + w], (112, 112))
+                for _ in range(args.recognize_work):
+                    crop = cv2.GaussianBlur(crop, (9, 9), 0)
+            return packet
+
+    video = synthetic_video(60, 3)
+    renderer = FrameRenderer()
+
+    def detect(packet):
+        packet.detections = detector.detect_with_landmarks(packet.frame)
+        return packet
+
+    def render(packet):
+        display = renderer.begin(packet.frame)
+        for d in packet.detections:
+            renderer.draw_face(display, d["bbox"], "user (0.87)", config.COLOR_SUCCESS)
+        packet.outputs = cv2.imencode(".jpg", display)[1]
+        return packet
+
+    counter = [0]
+
+    def capture(paced: bool = True):
+        # Like a threaded camera: a new frame every 1 / camera_fps seconds
+        if paced:
+            time.sleep(1.0 / args.camera_fps)
+        counter[0] += 1
+        return FramePacket(counter[0], video[counter[0] % len(video)])
+
+    stage_fns = [detect, recognize, render]
+    print(f"\nRecognition: {recognize_label}, cv2 threads: {cv2.getNumThreads()}, "
+          f"CPUs: {os.cpu_count()}")
+
+    # Sequential: sum of stages
+    start = time.perf_counter()
+    for _ in range(args.frames):
+        packet = capture(paced=False)  # A fresh frame is already waiting
+        for fn in stage_fns:
+            packet = fn(packet)
+    seq_fps = args.frames / (time.perf_counter() - start)
+
+    # Pipelined: bounded drop-oldest queues between stage threads
+    pipeline = FramePipeline(
+        [("capture", capture), ("detect", detect), ("recognize", recognize), ("render", render)]
+    )
+    pipeline.start()
+    start = time.perf_counter()
+    done = 0
+    while done < args.frames:
+        if pipeline.get() is not None:
+            done += 1
+    pipe_fps = done / (time.perf_counter() - start)
+    pipeline.stop()
+
+    print(f"\n{'mode':>12} | {'frames/s':>9}")
+    print("-" * 25)
+    print(f"{'sequential':>12} | {seq_fps:>9.1f}")
+    print(f"{'pipelined':>12} | {pipe_fps:>9.1f}")
+    print("-" * 25)
+
+    print(f"\n{'stage':>10} | {'ms/frame':>8} | {'latency ms':>10} | {'dropped':>7}")
+    print("-" * 45)
+    for name, st in pipeline.get_stats().items():
+        if name == "output":
+            continue
+        print(f"{name:>10} | {st['avg_ms']:>8.2f} | {st['latency_ms']:>10.2f} | {st['dropped']:>7}")
+    print("-" * 45)
+
+
+# ==================== MAIN ====================
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Face Access Control benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("matching", help="Gallery matching latency vs gallery size")
+    p.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 50000])
+    p.add_argument(
+        "--dim", type=int, default=config.SFACE_EMBEDDING_SIZE, help="Embedding dimension"
+    )
+    p.set_defaults(func=bench_matching)
+
+    p = sub.add_parser("prototype", help="Prototype index vs full scan")
+    p.add_argument("--users", type=int, default=1000)
+    p.add_argument("--per-user", type=int, default=100)
+    p.add_argument("--probes", type=int, default=200)
+    p.add_argument("--top-k", type=int, default=config.SFACE_PROTOTYPE_TOP_K)
+    p.add_argument("--noise", type=float, default=0.6)
+    p.add_argument(
+        "--dim", type=int, default=config.SFACE_EMBEDDING_SIZE, help="Embedding dimension"
+    )
+    p.set_defaults(func=bench_prototype)
+
+    p = sub.add_parser("ann", help="IVF index recall@1 / latency")
+    p.add_argument("--users", type=int, default=10000)
+    p.add_argument("--per-user", type=int, default=10)
+    p.add_argument("--probes", type=int, default=200)
+    p.add_argument("--nlist", type=int, default=config.SFACE_IVF_NLIST)
+    p.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    p.add_argument("--noise", type=float, default=1.0)
+    p.add_argument(
+        "--dim", type=int, default=config.SFACE_EMBEDDING_SIZE, help="Embedding dimension"
+    )
+    p.set_defaults(func=bench_ann)
+
+    p = sub.add_parser("batch", help="Batched embedding throughput")
+    p.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    p.add_argument("--repeats", type=int, default=20)
+    p.set_defaults(func=bench_batch)
+
+    p = sub.add_parser("tracker", help="Recognizer invocations with/without tracker")
+    p.add_argument("--frames", type=int, default=3000)
+    p.add_argument("--people", type=int, default=3)
+    p.set_defaults(func=bench_tracker)
+
+    p = sub.add_parser("stride", help="Detection stride with optical flow")
+    p.add_argument("--frames", type=int, default=300)
+    p.add_argument("--speed", type=float, default=2.0, help="Motion in px/frame")
+    p.set_defaults(func=bench_stride)
+
+    p = sub.add_parser("detection", help="Detection cost vs camera resolution")
+    p.add_argument("--max-sides", type=int, nargs="+", default=[0, 640, 320])
+    p.add_argument("--repeats", type=int, default=10)
+    p.set_defaults(func=bench_detection)
+
+    p = sub.add_parser("train", help="Parallel training speedup")
+    p.add_argument("--users", type=int, default=20)
+    p.add_argument("--per-user", type=int, default=30)
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    p.set_defaults(func=bench_train)
+
+    p = sub.add_parser("quantization", help="float16 / int8 gallery vs float32")
+    p.add_argument("--users", type=int, default=1000)
+    p.add_argument("--per-user", type=int, default=100)
+    p.add_argument("--probes", type=int, default=500)
+    p.add_argument("--noise", type=float, default=1.0)
+    p.add_argument("--threshold", type=float, default=0.5)
+    p.set_defaults(func=bench_quantization)
+
+    p = sub.add_parser("threshold", help="Genuine / impostor scores per crop mode")
+    p.add_argument("--far", type=float, default=0.001, help="Target false accept rate")
+    p.set_defaults(func=bench_threshold)
+
+    p = sub.add_parser("render", help="Frame drawing / RGB conversion cost")
+    p.add_argument("--frames", type=int, default=300)
+    p.add_argument("--faces", type=int, default=2)
+    p.add_argument("--width", type=int, default=config.CAMERA_WIDTH)
+    p.add_argument("--height", type=int, default=config.CAMERA_HEIGHT)
+    p.set_defaults(func=bench_render)
+
+    p = sub.add_parser("pipeline", help="Sequential vs pipelined live path")
+    p.add_argument("--frames", type=int, default=300)
+    p.add_argument("--camera-fps", type=float, default=120.0)
+    p.add_argument(
+        "--recognize-work", type=int, default=20,
+        help="Blur passes per face when the SFace model is missing",
+    )
+    p.set_defaults(func=bench_pipeline)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
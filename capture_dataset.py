@@ -8,7 +8,7 @@ import os
 import sys
 import config
 from modules.camera import CameraManager
-from modules.detector_yunet import YuNetDetector
+from modules import model_registry
 
 
 def capture_images(name: str, num_images: int = 20, auto_detect: bool = True):
@@ -47,7 +47,8 @@ def capture_images(name: str, num_images: int = 20, auto_detect: bool = True):
 
     detector = None
     if auto_detect:
-        detector = YuNetDetector()  # Haar nhanh hơn cho capture
+        # Detector đã warm-up, dùng lại giữa các lần chụp trong cùng thread
+        detector = model_registry.thread_detector()
 
     count = 0
     count_images = 0
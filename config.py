@@ -31,19 +31,102 @@ CAMERA_HEIGHT = 480
 # FPS mong muốn
 CAMERA_FPS = 30
 
+# Đọc camera bằng thread nền: read() luôn trả frame mới nhất thay vì frame
+# cũ còn trong buffer của driver khi xử lý chậm hơn camera
+CAMERA_THREADED = True
+
+# Số frame giữ trong ring buffer của thread đọc camera
+CAMERA_RING_BUFFER_SIZE = 2
+
+# Multi-camera: danh sách nguồn (camera ID hoặc đường dẫn video file)
+CAMERA_SOURCES = [CAMERA_ID]
+
+# Tên cửa (door) ghi vào access log cho từng nguồn trong CAMERA_SOURCES
+# (nguồn không có tên thì dùng số thứ tự camera)
+CAMERA_DOORS = []
+
+# Số frame tối đa chờ xử lý mỗi camera (camera live bỏ frame cũ nhất,
+# video file thì chờ - backpressure)
+MULTI_CAMERA_QUEUE_SIZE = 4
+
+# Số worker nhận diện dùng chung cho tất cả camera
+# (mỗi worker có 1 instance YuNet + SFace riêng)
+INFERENCE_WORKERS = min(4, os.cpu_count() or 1)
+
+# Chu kỳ in thống kê từng camera khi chạy `python main.py --multi-camera` (giây)
+MULTI_CAMERA_REPORT_INTERVAL = 10.0
+
 # ==================== CẤU HÌNH FACE DETECTION ====================
 
 # Phương pháp detection mặc định: 'yunet'
 DEFAULT_DETECTION_METHOD = "yunet"
 
+# Downscaled detection: chạy YuNet trên frame thu nhỏ có cạnh dài tối đa
+# DETECTION_MAX_SIDE pixel, rồi map bbox/landmarks về độ phân giải gốc
+# (0 = chạy ở độ phân giải gốc của camera)
+DETECTION_MAX_SIDE = 320
+
+# Detection stride: chạy YuNet đầy đủ mỗi N frame, các frame giữa dùng
+# optical flow để dịch bounding box (1 = detect mọi frame)
+DETECTION_STRIDE = 3
+
+# Tự động điều chỉnh stride theo chuyển động (1 .. DETECTION_MAX_STRIDE)
+DETECTION_ADAPTIVE_STRIDE = True
+DETECTION_MAX_STRIDE = 6
+
+# Chuyển động (pixel/frame) vượt ngưỡng này thì giảm stride và detect lại
+DETECTION_MOTION_THRESHOLD = 8.0
+
 # SFace Model paths
 SFACE_MODEL_PATH = os.path.join(MODELS_DIR, "sface/face_recognition_sface_2021dec.onnx")
 YUNET_MODEL_PATH = os.path.join(MODELS_DIR, "yunet/face_detection_yunet_2023mar.onnx")
+# Gallery embeddings: memory-mapped float32 matrix + bảng tên (xem gallery_store.py)
+SFACE_GALLERY_DIR = os.path.join(MODELS_DIR, "sface/gallery")
+# Compaction gallery (chạy nền) khi số dòng đã xóa vượt tỷ lệ này
+GALLERY_COMPACT_RATIO = 0.25
+
+# Kiểu dữ liệu gallery khi lưu và tính điểm:
+# 'float32' (chính xác), 'float16' (nhỏ hơn 2x), 'int8' (scale theo vector, nhỏ hơn ~4x)
+# Gallery đã lưu giữ kiểu cũ cho đến lần train full tiếp theo
+SFACE_GALLERY_DTYPE = "float32"
+SFACE_SCORE_CHUNK_ROWS = 4096  # Số dòng giải nén sang float32 mỗi lần tính điểm
+# File pickle cũ, tự động migrate sang SFACE_GALLERY_DIR khi load
 SFACE_EMBEDDINGS_PATH = os.path.join(MODELS_DIR, "sface/embeddings.pkl")
+SFACE_INDEX_PATH = os.path.join(MODELS_DIR, "sface/index.npz")
+# Manifest ảnh đã train (hash + mtime) cho training incremental
+SFACE_MANIFEST_PATH = os.path.join(MODELS_DIR, "sface/manifest.json")
+# Cache detect + embedding theo hash ảnh (tự xóa khi đổi model ONNX)
+SFACE_CACHE_PATH = os.path.join(MODELS_DIR, "sface/embedding_cache.npz")
+SFACE_CACHE_MAX_ENTRIES = 20000  # Vượt quá thì xóa entry ít dùng nhất (LRU)
 
 # SFace Parameters
-SFACE_EMBEDDING_SIZE = 512  # SFace tạo vector 512 chiều
+SFACE_EMBEDDING_SIZE = 128  # SFace (2021dec) tạo vector 128 chiều
 SFACE_THRESHOLD = 0.75  # Cosine Similarity threshold (higher is stricter, max 1.0)
+# 0.75 được chọn với crop theo bounding box (gallery cũ). Crop đã căn chỉnh
+# (SFACE_ALIGN_FACES) cho phân bố điểm khác: OpenCV công bố 0.363 cho SFace
+# trên LFW với ảnh căn chỉnh. Đo lại trên dataset của hệ thống trước khi đổi:
+#   python benchmark.py threshold [--far 0.001]
+
+# Gallery search index:
+#   'flat'      - quét toàn bộ embeddings (chính xác)
+#   'prototype' - so với đại diện mỗi user trước, rồi re-rank top-k user
+#   'ivf'       - phân cụm (inverted file), chỉ quét nprobe cụm gần nhất
+SFACE_INDEX_TYPE = "flat"
+
+# Prototype index: 'centroid' (trung bình / k-means) hoặc 'kmedoids'
+SFACE_PROTOTYPE_METHOD = "centroid"
+SFACE_PROTOTYPES_PER_USER = 1  # Số đại diện mỗi user
+SFACE_PROTOTYPE_TOP_K = 3  # Số user được re-rank với toàn bộ embeddings
+
+# IVF index (dùng cho gallery rất lớn, được lưu cạnh embeddings.pkl)
+SFACE_IVF_NLIST = 0  # Số cụm (0 = tự động 4 * sqrt(N))
+SFACE_IVF_NPROBE = 8  # Số cụm quét mỗi probe (tăng = recall cao hơn, chậm hơn)
+
+# Căn chỉnh khuôn mặt theo 5 landmarks trước khi trích xuất embedding
+# (False = crop theo bounding box + resize như cũ).
+# Đổi giá trị này cần train lại embeddings; đến lúc đó khuôn mặt live vẫn
+# được crop theo chế độ của gallery đã lưu (xem header.json).
+SFACE_ALIGN_FACES = True
 
 # ==================== CẤU HÌNH RECOGNITION CHUNG ====================
 
@@ -61,14 +144,38 @@ MIN_IMAGES_PER_PERSON = 10
 # Số lượng ảnh tối đa mỗi người (để tránh overfitting)
 MAX_IMAGES_PER_PERSON = 100
 
+# Số process song song khi training (0 = số CPU, 1 = chạy tuần tự)
+TRAIN_WORKERS = 0
+
+# Lọc ảnh chất lượng thấp: bỏ khuôn mặt quá tối (mean) hoặc quá phẳng (std)
+TRAIN_MIN_FACE_MEAN = 40
+TRAIN_MIN_FACE_STD = 20
+
 # ==================== CẤU HÌNH LOGGING ====================
 
 # Access log file path
 ACCESS_LOG_PATH = os.path.join(LOGS_DIR, "access_log.csv")
 
+# Nơi lưu access log: 'csv' (ACCESS_LOG_PATH) hoặc 'sqlite' (ACCESS_LOG_DB_PATH,
+# có index theo timestamp / name / status)
+LOG_BACKEND = "csv"
+ACCESS_LOG_DB_PATH = os.path.join(LOGS_DIR, "access_log.db")
+
+# Rotate file CSV mỗi ngày (access_log.YYYY-MM-DD.csv): 'daily' hoặc 'none'
+LOG_ROTATION = "daily"
+
 # Log format
 LOG_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
 
+# Ghi log ở thread nền (xem modules/access_log.py)
+LOG_BATCH_SIZE = 64  # Ghi ngay khi hàng đợi có đủ số record này
+LOG_FLUSH_INTERVAL = 1.0  # Giây tối đa một record nằm trong hàng đợi
+LOG_FSYNC_INTERVAL = 5.0  # Giây giữa 2 lần fsync (0 = fsync sau mỗi batch)
+LOG_QUEUE_SIZE = 10000  # Số record tối đa trong hàng đợi
+# Hàng đợi đầy: chờ tối đa số giây này, sau đó record vào bộ đệm tràn
+# (không bao giờ bỏ record GRANTED/DENIED, frame không bị chặn lâu)
+LOG_QUEUE_TIMEOUT = 0.2
+
 # Có log mỗi frame hay không (False = chỉ log khi có access granted/denied)
 LOG_EVERY_FRAME = False
 
@@ -77,6 +184,9 @@ LOG_EVERY_FRAME = False
 # Window title
 WINDOW_TITLE = "Face Access Control System"
 
+# Tạo link công khai *.gradio.live khi chạy (demo.launch(share=...))
+GRADIO_SHARE = True
+
 # Video display size
 VIDEO_DISPLAY_WIDTH = 800
 VIDEO_DISPLAY_HEIGHT = 600
@@ -99,11 +209,71 @@ BBOX_THICKNESS = 2
 SHOW_FPS = True
 FPS_UPDATE_INTERVAL = 30  # Update FPS mỗi 30 frames
 
-# ==================== CẤU HÌNH ACCESS CONTROL ====================
+# ==================== CẤU HÌNH VIDEO STREAM ====================
+
+# Phát video đã xử lý dạng MJPEG qua HTTP: mỗi frame chỉ encode JPEG 1 lần
+# cho mọi người xem (False = gửi ndarray RGB để Gradio tự encode)
+STREAM_ENABLED = True
+
+# Địa chỉ HTTP server của stream. Stream không có xác thực: mặc định chỉ
+# nghe trên máy local, đặt "0.0.0.0" nếu muốn mở cho máy khác
+STREAM_HOST = "127.0.0.1"
+STREAM_PORT = 8081
+
+# URL trình duyệt dùng để mở stream (rỗng = http://localhost:<STREAM_PORT>/stream.mjpg,
+# chỉ xem được trên chính máy này). Khi GRADIO_SHARE bật mà STREAM_URL rỗng,
+# người xem qua link share không tới được localhost: GUI dùng stream ảnh của Gradio
+STREAM_URL = ""
+
+# Chất lượng JPEG (1-100) và chiều rộng ảnh stream (0 = giữ nguyên kích thước)
+STREAM_JPEG_QUALITY = 80
+STREAM_WIDTH = 0
+
+# FPS đầu ra của stream (độc lập với FPS xử lý)
+STREAM_FPS = 15
+
+# ==================== CẤU HÌNH PIPELINE ====================
+
+# Chạy capture / detect / recognize / render ở các thread riêng, nối bằng
+# hàng đợi có giới hạn (False = xử lý tuần tự trong vòng lặp GUI)
+PIPELINE_ENABLED = True
+
+# Số frame tối đa chờ giữa 2 stage (đầy thì bỏ frame cũ nhất)
+PIPELINE_QUEUE_SIZE = 1
+
+# ==================== CẤU HÌNH FRAME PACING ====================
+
+# FPS xử lý tối đa (0 = không giới hạn); chỉ ngủ phần thời gian còn lại của frame
+PROCESSING_FPS = 30
+
+# Số lần cập nhật giao diện Gradio mỗi giây (0 = mỗi frame)
+OUTPUT_FPS = 15
+
+# Không thấy mặt người trong IDLE_AFTER giây thì giảm xuống IDLE_FPS (0 = tắt)
+IDLE_FPS = 5
+IDLE_AFTER = 10.0
+
+# ==================== CẤU HÌNH FACE TRACKING ====================
 
-# Thời gian cooldown giữa các lần access (giây)
-# Tránh log liên tục cho cùng 1 người
-ACCESS_COOLDOWN = 3.0
+# IoU tối thiểu để ghép detection với track
+TRACKER_IOU_THRESHOLD = 0.3
+
+# Số frame track được giữ khi không có detection
+TRACKER_MAX_MISSES = 10
+
+# Số frame giữa 2 lần nhận diện lại 1 track đã chắc chắn
+TRACKER_RECOGNITION_INTERVAL = 30
+
+# Số frame giữa 2 lần nhận diện lại 1 track Unknown / điểm sát ngưỡng
+TRACKER_RETRY_INTERVAL = 5
+
+# Track có score < threshold + margin được coi là chưa chắc chắn
+TRACKER_CONFIDENCE_MARGIN = 0.05
+
+# Số frame tối thiểu track phải tồn tại trước khi ghi log
+TRACKER_MIN_HITS = 2
+
+# ==================== CẤU HÌNH ACCESS CONTROL ====================
 
 # Có tự động mở cửa không (simulation)
 AUTO_UNLOCK = True
@@ -161,6 +331,75 @@ def validate_config():
     if not (0 < SFACE_THRESHOLD < 1.0):
         errors.append("SFACE_THRESHOLD should be between 0 and 1")
 
+    if DETECTION_MAX_SIDE < 0:
+        errors.append("DETECTION_MAX_SIDE must be >= 0")
+
+    if DETECTION_STRIDE < 1 or DETECTION_MAX_STRIDE < DETECTION_STRIDE:
+        errors.append("DETECTION_STRIDE must be >= 1 and <= DETECTION_MAX_STRIDE")
+
+    if SFACE_INDEX_TYPE not in ["flat", "prototype", "ivf"]:
+        errors.append("SFACE_INDEX_TYPE must be 'flat', 'prototype' or 'ivf'")
+
+    if SFACE_PROTOTYPE_METHOD not in ["centroid", "kmedoids"]:
+        errors.append("SFACE_PROTOTYPE_METHOD must be 'centroid' or 'kmedoids'")
+
+    if SFACE_PROTOTYPES_PER_USER < 1 or SFACE_PROTOTYPE_TOP_K < 1:
+        errors.append("SFACE_PROTOTYPES_PER_USER and SFACE_PROTOTYPE_TOP_K must be >= 1")
+
+    if TRAIN_WORKERS < 0:
+        errors.append("TRAIN_WORKERS must be >= 0")
+
+    if TRAIN_MIN_FACE_MEAN < 0 or TRAIN_MIN_FACE_STD < 0:
+        errors.append("TRAIN_MIN_FACE_MEAN and TRAIN_MIN_FACE_STD must be >= 0")
+
+    if SFACE_GALLERY_DTYPE not in ["float32", "float16", "int8"]:
+        errors.append("SFACE_GALLERY_DTYPE must be 'float32', 'float16' or 'int8'")
+
+    if SFACE_SCORE_CHUNK_ROWS < 1:
+        errors.append("SFACE_SCORE_CHUNK_ROWS must be >= 1")
+
+    if not (0 < GALLERY_COMPACT_RATIO <= 1.0):
+        errors.append("GALLERY_COMPACT_RATIO should be between 0 and 1")
+
+    if not 1 <= STREAM_JPEG_QUALITY <= 100:
+        errors.append("STREAM_JPEG_QUALITY should be between 1 and 100")
+
+    if STREAM_WIDTH < 0 or STREAM_FPS <= 0:
+        errors.append("STREAM_WIDTH must be >= 0 and STREAM_FPS > 0")
+
+    if PIPELINE_QUEUE_SIZE < 1:
+        errors.append("PIPELINE_QUEUE_SIZE must be >= 1")
+
+    if PROCESSING_FPS < 0 or OUTPUT_FPS < 0 or IDLE_FPS < 0 or IDLE_AFTER < 0:
+        errors.append("PROCESSING_FPS, OUTPUT_FPS, IDLE_FPS and IDLE_AFTER must be >= 0")
+
+    if LOG_BACKEND not in ["csv", "sqlite"]:
+        errors.append("LOG_BACKEND must be 'csv' or 'sqlite'")
+
+    if LOG_ROTATION not in ["daily", "none"]:
+        errors.append("LOG_ROTATION must be 'daily' or 'none'")
+
+    if LOG_BATCH_SIZE < 1 or LOG_QUEUE_SIZE < 1:
+        errors.append("LOG_BATCH_SIZE and LOG_QUEUE_SIZE must be >= 1")
+
+    if LOG_QUEUE_TIMEOUT < 0:
+        errors.append("LOG_QUEUE_TIMEOUT must be >= 0")
+
+    if not CAMERA_SOURCES:
+        errors.append("CAMERA_SOURCES must list at least one camera or video file")
+
+    if MULTI_CAMERA_REPORT_INTERVAL <= 0:
+        errors.append("MULTI_CAMERA_REPORT_INTERVAL must be > 0")
+
+    if LOG_FLUSH_INTERVAL < 0 or LOG_FSYNC_INTERVAL < 0:
+        errors.append("LOG_FLUSH_INTERVAL and LOG_FSYNC_INTERVAL must be >= 0")
+
+    if SFACE_CACHE_MAX_ENTRIES < 1:
+        errors.append("SFACE_CACHE_MAX_ENTRIES must be >= 1")
+
+    if SFACE_IVF_NLIST < 0 or SFACE_IVF_NPROBE < 1:
+        errors.append("SFACE_IVF_NLIST must be >= 0 and SFACE_IVF_NPROBE >= 1")
+
     if errors:
         print("Configuration errors:")
         for error in errors:
@@ -1,8 +1,17 @@
 """
 Face Access Control - GUI Package
 Export GUI classes
-"""
 
-from .main_window_gradio import GradioMainWindow
+GradioMainWindow is imported on first access, so `import gui` does not
+pull in Gradio.
+"""
 
 __all__ = ["GradioMainWindow"]
+
+
+def __getattr__(name):
+    if name == "GradioMainWindow":
+        from .main_window_gradio import GradioMainWindow
+
+        return GradioMainWindow
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
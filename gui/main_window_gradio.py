@@ -1,6 +1,7 @@
 import gradio as gr
 import cv2
 from PIL import Image
+import threading
 import time
 from typing import Optional
 import numpy as np
@@ -12,6 +13,13 @@ from modules.camera import CameraManager
 from modules.detector_yunet import YuNetDetector
 from modules.recognizer_sface import SFaceRecognizer
 from modules.database import Database
+from modules.mjpeg_streamer import MJPEGStreamer
+from modules.frame_renderer import FrameRenderer
+from modules.pipeline import FramePacket, FramePipeline
+from modules.frame_pacer import FramePacer
+from modules import model_registry
+from modules.startup_profiler import profiler
+from modules.tracker import FaceTracker
 import config
 import capture_dataset  # Import external capture logic
 
@@ -35,12 +43,13 @@ class GradioMainWindow:
         self.camera: Optional[CameraManager] = None
         self.detector: Optional[YuNetDetector] = None
         self.recognizer_sface: Optional[SFaceRecognizer] = None
+        self.streamer: Optional[MJPEGStreamer] = None
         self.database = Database()
 
         # State
         self.is_running = False
-        self.latest_frame = None  # To store the current frame for capture
-        self.latest_face_roi = None  # To store the current face for capture
+        # Draws onto reused buffers; snapshots are copied only on request
+        self.renderer = FrameRenderer()
         self.reload_recognition = (
             False  # Flag to force recognition loop to reset its cache
         )
@@ -62,8 +71,15 @@ class GradioMainWindow:
         self.frame_count = 0
         self.fps_start_time = time.time()
 
-        # Last access tracking
-        self.last_access_time = {}
+        # Face tracking: identity cached per track, one access log per track
+        self.tracker = FaceTracker()
+        # Shared by the detect and recognize stages
+        self._tracker_lock = threading.Lock()
+        self.pipeline: Optional[FramePipeline] = None
+
+        # Processing rate (drops to IDLE_FPS without faces) and GUI update rate
+        self.processing_pacer = FramePacer()
+        self.output_pacer = FramePacer(config.OUTPUT_FPS, idle_fps=0)
 
         # Initialize components
         self._initialize_components()
@@ -71,22 +87,36 @@ class GradioMainWindow:
         # Create GUI
         self.demo = self._create_gui()
 
+    @property
+    def latest_frame(self):
+        """Copy of the current raw frame (for capture)"""
+        return self.renderer.snapshot()
+
+    @property
+    def latest_face_roi(self):
+        """Copy of the current primary face (for capture)"""
+        return self.renderer.face_snapshot()
+
     def _initialize_components(self):
         """Initialize components similar to Tkinter version"""
         # Initialize camera
         self.camera = CameraManager()
 
-        # Initialize detector
-        self.detector = YuNetDetector()
+        # Initialize detector (shared, warmed-up instance, possibly preloaded by main.py)
+        self.detector = model_registry.get_detector()
 
-        # Initialize recognizers
-        self.recognizer_sface = SFaceRecognizer()
+        # Video stream: frames JPEG-encoded once, shared by every viewer.
+        # A localhost stream URL is unreachable through a Gradio share link:
+        # keep Gradio's image stream there unless STREAM_URL is configured
+        if config.STREAM_ENABLED and (config.STREAM_URL or not config.GRADIO_SHARE):
+            self.streamer = MJPEGStreamer()
+            if not self.streamer.start():
+                self.streamer = None  # Fall back to Gradio image streaming
 
-        # Initialize SFace if available
+        # Initialize SFace if available: model and gallery loaded once
         if SFACE_RECOGNITION_AVAILABLE:
-            self.recognizer_sface = SFaceRecognizer()
-            if self.database.model_exists("sface"):
-                self.recognizer_sface.load_embeddings()
+            self.recognizer_sface = model_registry.get_recognizer()
+            if self.recognizer_sface.is_embeddings_loaded():
                 # Sync threshold
                 self.recognizer_sface.update_threshold(self.threshold_sface)
 
@@ -98,7 +128,13 @@ class GradioMainWindow:
             with gr.Row():
                 # --- Column 1: Video Feed ---
                 with gr.Column(scale=3):
-                    self.video_feed = gr.Image(label="Video Feed", streaming=True)
+                    if self.streamer:
+                        self.video_feed = gr.HTML(
+                            f'<img src="{self.streamer.url}" alt="Video Feed" '
+                            f'style="width:100%">'
+                        )
+                    else:
+                        self.video_feed = gr.Image(label="Video Feed", streaming=True)
 
                 # --- Column 2: User Info ---
                 with gr.Column(scale=1):
@@ -298,7 +334,8 @@ class GradioMainWindow:
         if SFACE_RECOGNITION_AVAILABLE:
             try:
                 print("Training SFace...")
-                if self.recognizer_sface.train(config.DATASET_DIR):
+                # Incremental: only new/changed images are embedded
+                if self.recognizer_sface.train(config.DATASET_DIR, incremental=True):
                     self.recognizer_sface.load_embeddings()  # Reload
                     status_msg += "✓ SFace: Success\n"
                 else:
@@ -369,7 +406,12 @@ class GradioMainWindow:
 
                 # Update SFace embeddings
                 if SFACE_RECOGNITION_AVAILABLE and self.recognizer_sface:
-                    self.recognizer_sface.delete_user(name)
+                    if not self.recognizer_sface.delete_user(name):
+                        self.reload_recognition = True
+                        return (
+                            f"Warning: User '{name}' deleted from dataset, but the "
+                            "embeddings were not updated. Please retrain."
+                        )
 
                 self.reload_recognition = True  # Also reload logic
                 return f"Success: User '{name}' deleted."
@@ -408,168 +450,222 @@ class GradioMainWindow:
         self.frame_count = 0
         self.fps_start_time = time.time()
 
-        # State tracking for optimization
-        last_recognized_name = None
-        cached_db_image = None
-
-        while self.is_running:
-            # Ensure camera is open (e.g. if restarted loop)
-            if not self.camera.is_opened():
-                try:
-                    self.camera.open()
-                except:
-                    time.sleep(1)
+        # State tracking for optimization (render stage)
+        self._last_recognized_name = None
+        self._cached_db_image = None
+        self._capture_seq = 0
+        self.processing_pacer.reset()
+        self.output_pacer.reset()
+
+        stages = [
+            ("capture", self._capture_stage),
+            ("detect", self._detect_stage),
+            ("recognize", self._recognize_stage),
+            ("render", self._render_stage),
+        ]
+
+        if not config.PIPELINE_ENABLED:
+            # Sequential fallback: same stages, one frame at a time
+            while self.is_running:
+                packet = self._capture_stage()
+                if packet is None:
                     continue
+                for _, stage in stages[1:]:
+                    packet = stage(packet)
+                # GUI updates are thinned out to OUTPUT_FPS
+                if self.output_pacer.due():
+                    yield packet.outputs
+            return
+
+        # Stages overlap in their own threads (OpenCV releases the GIL)
+        self.pipeline = FramePipeline(stages)
+        self.pipeline.start()
+        try:
+            while self.is_running:
+                # Wait for the next GUI update slot, then take the newest frame
+                self.output_pacer.wait()
+                packet = self.pipeline.get(timeout=1.0)
+                if packet is None:
+                    continue
+                yield packet.outputs
+        finally:
+            self.pipeline.stop()
 
-            ret, frame = self.camera.read()
-            if not ret:
-                time.sleep(0.1)
-                continue
-
-            # Store raw frame and reset roi
-            self.latest_frame = frame.copy()
-            self.latest_face_roi = None
+    # ==================== PIPELINE STAGES ====================
 
-            # Check forced reload (e.g. from New/Delete user)
-            if self.reload_recognition:
-                last_recognized_name = None
-                cached_db_image = None
-                self.reload_recognition = False
+    def _capture_stage(self) -> Optional[FramePacket]:
+        """Read the next camera frame"""
+        # Sleep only for what is left of the frame budget (PROCESSING_FPS / IDLE_FPS)
+        self.processing_pacer.wait()
 
-            # Detect faces
+        # Ensure camera is open (e.g. if restarted loop)
+        if not self.camera.is_opened():
             try:
-                faces = self.detector.detect_faces(frame)
-            except Exception as e:
-                faces = []
-
-            # Defaults for this frame
-            current_name = "Unknown"
-            current_status = ""
-            current_face_crop_rgb = None
-
-            # Clear cache if no faces found
-            if not faces:
-                last_recognized_name = None
-                cached_db_image = None
-
-            for x, y, w, h in faces:
-                # Extract Face ROI (BGR)
-                face_roi = frame[y : y + h, x : x + w]
-                self.latest_face_roi = face_roi.copy()  # Store for snapshot
-
-                # Recognize
-                name = config.UNKNOWN_PERSON_NAME
-                score = 0.0
-
-                if self.current_method == "sface":  # sface
-                    name, score = self.recognizer_sface.predict(face_roi)
-
-                # Determine access status
-                is_granted = name != config.UNKNOWN_PERSON_NAME
-                color = config.COLOR_SUCCESS if is_granted else config.COLOR_DENIED
-                status_str = "GRANTED" if is_granted else "DENIED"
-
-                # Visualization matches Config
-                cv2.rectangle(
-                    frame, (x, y), (x + w, y + h), color, config.BBOX_THICKNESS
-                )
-                label = f"{name} ({score:.2f})"
-                cv2.putText(
-                    frame,
-                    label,
-                    (x, y - 10),
-                    config.FONT_FACE,
-                    config.FONT_SCALE,
-                    color,
-                    config.FONT_THICKNESS,
-                )
+                self.camera.open()
+            except:
+                time.sleep(1)
+                return None
+
+        ret, frame = self.camera.read()
+        if not ret:
+            time.sleep(0.1)
+            return None
 
-                # Log access
-                current_time = time.time()
-                if (
-                    name not in self.last_access_time
-                    or (current_time - self.last_access_time[name])
-                    > config.ACCESS_COOLDOWN
-                ):
+        self._capture_seq += 1
+        return FramePacket(self._capture_seq, frame)
+
+    def _detect_stage(self, packet: FramePacket) -> FramePacket:
+        """Detect faces and associate them with tracks"""
+        # Check forced reload (e.g. from New/Delete user)
+        if self.reload_recognition:
+            with self._tracker_lock:
+                self.tracker.reset()
+            self._last_recognized_name = None
+            self._cached_db_image = None
+            self.reload_recognition = False
+
+        # Detect faces (with landmarks for alignment, strided + optical flow)
+        try:
+            detections = self.detector.detect_tracked(packet.frame)
+        except Exception as e:
+            detections = []
+
+        # Associate detections with tracks
+        with self._tracker_lock:
+            packet.tracks = self.tracker.update(detections)
+            # Detection dicts of this frame (tracks move on with later frames)
+            packet.detections = [t.detection for t in packet.tracks]
+        return packet
+
+    def _recognize_stage(self, packet: FramePacket) -> FramePacket:
+        """Recognize due tracks (one batch), log access, freeze the results"""
+        # Recognize only tracks that are new, due, or borderline (one batch)
+        if self.current_method == "sface":  # sface
+            threshold = self.recognizer_sface.get_threshold()
+            with self._tracker_lock:
+                pending = [
+                    (track, detection)
+                    for track, detection in zip(packet.tracks, packet.detections)
+                    if self.tracker.needs_recognition(track, threshold)
+                ]
+            predictions = self.recognizer_sface.predict_faces(
+                packet.frame, [detection for _, detection in pending]
+            )
+            with self._tracker_lock:
+                for (track, _), (name, score) in zip(pending, predictions):
+                    self.tracker.set_identity(track, name, score)
+
+        with self._tracker_lock:
+            for track, detection in zip(packet.tracks, packet.detections):
+                name = track.name or config.UNKNOWN_PERSON_NAME
+                packet.faces.append((detection["bbox"], name, track.score))
+
+                # Log access (once per identity per track)
+                if self.tracker.should_log(track):
+                    status_str = (
+                        "GRANTED" if name != config.UNKNOWN_PERSON_NAME else "DENIED"
+                    )
                     self.database.log_access(
-                        name, self.current_method.upper(), score, status_str
+                        name, self.current_method.upper(), track.score, status_str
                     )
-                    self.last_access_time[name] = current_time
+        return packet
+
+    def _render_stage(self, packet: FramePacket) -> FramePacket:
+        """Draw results, publish the video frame and build the GUI outputs"""
+        # Raw frame stays clean (lazy snapshots); draw on a reused buffer
+        display = self.renderer.begin(packet.frame)
+        faces = packet.faces
+
+        # Defaults for this frame
+        current_name = "Unknown"
+        current_status = ""
+        current_face_crop_rgb = None
+
+        # No faces for IDLE_AFTER seconds: processing slows down to IDLE_FPS
+        self.processing_pacer.mark_activity(bool(faces))
+
+        profiler.mark("first frame")
+        if any(name != config.UNKNOWN_PERSON_NAME for _, name, _ in faces):
+            if profiler.mark("first recognized frame"):
+                print("\n" + profiler.report())
+
+        # Clear cache if no faces found
+        if not faces:
+            self._last_recognized_name = None
+            self._cached_db_image = None
+        else:
+            # Largest face drives the user info panel
+            primary = max(range(len(faces)), key=lambda i: faces[i][0][2] * faces[i][0][3])
+            self.renderer.set_face(faces[primary][0])
 
-                # Update current info for GUI
-                current_name = name
-                current_status = f"Last Access: {time.strftime('%H:%M:%S')}"
+        for i, (bbox, name, score) in enumerate(faces):
+            # Determine access status
+            is_granted = name != config.UNKNOWN_PERSON_NAME
+            color = config.COLOR_SUCCESS if is_granted else config.COLOR_DENIED
 
-                # Prepare LIVE face crop
-                # Important: Gradio Image expects arrays. We must ensure this is a valid array.
-                try:
-                    current_face_crop_rgb = cv2.cvtColor(face_roi, cv2.COLOR_BGR2RGB)
-                except:
-                    current_face_crop_rgb = None
+            # Visualization matches Config (label glyphs cached per string)
+            self.renderer.draw_face(display, bbox, f"{name} ({score:.2f})", color)
 
-                # Update DB Image with Caching
-                if name != last_recognized_name:
-                    last_recognized_name = name
-                    if name != config.UNKNOWN_PERSON_NAME:
-                        cached_db_image = self._get_user_db_image(name)
-                    else:
-                        cached_db_image = None
-
-                # Break after first face
-                break
-
-            # FPS
-            self.frame_count += 1
-            if self.frame_count >= config.FPS_UPDATE_INTERVAL:
-                elapsed = time.time() - self.fps_start_time
-                self.fps = int(self.frame_count / elapsed) if elapsed > 0 else 0
-                self.frame_count = 0
-                self.fps_start_time = time.time()
-
-            # OSD
-            cv2.putText(
-                frame,
-                f"FPS: {self.fps}",
-                (10, 60),
-                config.FONT_FACE,
-                config.FONT_SCALE,
-                config.COLOR_TEXT,
-                config.FONT_THICKNESS,
-            )
-            info_text = (
-                f"{self.current_method.upper()} | {self.current_detection.upper()}"
-            )
-            cv2.putText(
-                frame,
-                info_text,
-                (10, 30),
-                config.FONT_FACE,
-                config.FONT_SCALE,
-                config.COLOR_TEXT,
-                config.FONT_THICKNESS,
-            )
+            if i != primary:
+                continue
 
-            # Convert main frame to RGB
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-            # Yield outcomes
-            yield (
-                frame_rgb,
-                (
-                    "User recognized"
-                    if current_name != config.UNKNOWN_PERSON_NAME
-                    and current_name != "Unknown"
-                    else "Scanning..."
-                ),
-                f"FPS: {self.fps}",
-                f"Name: {current_name}",
-                current_status,
-                current_face_crop_rgb,
-                cached_db_image,
-            )
+            # Update current info for GUI
+            current_name = name
+            current_status = f"Last Access: {time.strftime('%H:%M:%S')}"
+
+            # Prepare LIVE face crop (RGB, written into a reused buffer)
+            current_face_crop_rgb = self.renderer.face_rgb(bbox)
+
+            # Update DB Image with Caching
+            if name != self._last_recognized_name:
+                self._last_recognized_name = name
+                if name != config.UNKNOWN_PERSON_NAME:
+                    self._cached_db_image = self._get_user_db_image(name)
+                else:
+                    self._cached_db_image = None
+
+        # FPS
+        self.frame_count += 1
+        if self.frame_count >= config.FPS_UPDATE_INTERVAL:
+            elapsed = time.time() - self.fps_start_time
+            self.fps = int(self.frame_count / elapsed) if elapsed > 0 else 0
+            self.frame_count = 0
+            self.fps_start_time = time.time()
+            if config.DEBUG:
+                print(f"[GradioMainWindow] Pacing: {self.processing_pacer.get_stats()}")
+                if self.pipeline is not None:
+                    print(f"[GradioMainWindow] Pipeline stats: {self.pipeline.get_stats()}")
+
+        # OSD (both strings change rarely: cached text masks)
+        self.renderer.draw_text(display, f"FPS: {self.fps}", (10, 60))
+        info_text = (
+            f"{self.current_method.upper()} | {self.current_detection.upper()}"
+        )
+        self.renderer.draw_text(display, info_text, (10, 30))
 
-            # Sleep
-            time.sleep(0.02)
+        if self.streamer:
+            # Encoded by the streamer at STREAM_FPS, not per yield
+            self.streamer.publish(display)
+            video_output = gr.update()
+        else:
+            # Convert main frame to RGB (reused buffer)
+            video_output = self.renderer.rgb(display)
+
+        packet.outputs = (
+            video_output,
+            (
+                "User recognized"
+                if current_name != config.UNKNOWN_PERSON_NAME
+                and current_name != "Unknown"
+                else "Scanning..."
+            ),
+            f"FPS: {self.fps}",
+            f"Name: {current_name}",
+            current_status,
+            current_face_crop_rgb,
+            self._cached_db_image,
+        )
+        return packet
 
     def _on_method_change(self, method):
         """Handle method change - Update Threshold Slider"""
@@ -608,6 +704,8 @@ class GradioMainWindow:
             self.threshold_sface = threshold
             if self.recognizer_sface:
                 self.recognizer_sface.update_threshold(threshold)
+                # Cached track identities were decided with the old threshold
+                self.reload_recognition = True
 
     def _view_logs(self):
         """Fetch logs and show"""
@@ -615,7 +713,15 @@ class GradioMainWindow:
         if not logs:
             return gr.update(value="No logs found.")
 
-        log_text = "Recent Access Logs (Latest 50):\n" + "=" * 50 + "\n"
+        # Today's totals come from the rollups, not from rescanning the log
+        today = time.strftime("%Y-%m-%d")
+        counts = self.database.get_access_counts(("status",), today, today)
+        log_text = (
+            f"Today: {counts.get(('GRANTED',), 0)} granted, "
+            f"{counts.get(('DENIED',), 0)} denied\n\n"
+        )
+
+        log_text += "Recent Access Logs (Latest 50):\n" + "=" * 50 + "\n"
         for log in reversed(logs):
             log_text += f"{log['timestamp']} | {log['name']} | {log['method']} | {log['status']}\n"
 
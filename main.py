@@ -4,12 +4,18 @@ Face Access Control - Main Application
 
 Usage:
     python main.py
+    python main.py --multi-camera       # Không GUI: mọi nguồn trong CAMERA_SOURCES
+    python main.py --profile-startup    # In thời gian từng bước khởi động
 """
 
-from gui.main_window_gradio import GradioMainWindow
+# Imported first: its clock is the start of the startup profile
+from modules.startup_profiler import profiler
 import config
 import sys
 import os
+import time
+
+from modules import model_registry
 
 
 def check_requirements():
@@ -26,12 +32,8 @@ def check_requirements():
     if not os.path.exists(config.LOGS_DIR):
         errors.append(f"Logs directory not found: {config.LOGS_DIR}")
 
-    # Kiểm tra có model nào đã train chưa
-    from modules.database import Database
-
-    db = Database()
-
-    has_sface = db.model_exists("sface")
+    # Kiểm tra có model nào đã train chưa (không nạp embeddings)
+    has_sface = model_registry.get_database().model_exists("sface")
 
     if not has_sface:
         errors.append("No trained models found! Please run train_sface.py first.")
@@ -55,10 +57,7 @@ def print_banner():
 
 def print_system_info():
     """In thông tin hệ thống"""
-    from modules.database import Database
-    from modules.recognizer_sface import SFaceRecognizer
-
-    db = Database()
+    db = model_registry.get_database()
 
     print("\n" + "=" * 60)
     print("SYSTEM INFORMATION")
@@ -79,23 +78,69 @@ def print_system_info():
     print(f"  - Detection Method: {config.DEFAULT_DETECTION_METHOD.upper()}")
     print(f"  - SFace Threshold: {config.SFACE_THRESHOLD}")
 
-    # Hiển thị danh sách users
+    # Hiển thị danh sách users (từ gallery dùng chung, không unpickle lại)
     if db.model_exists("sface"):
-        users_lbph = db.get_user_list("sface")
-        print(f"\nSFace Registered Users ({len(users_lbph)}):")
-        print(f"  {', '.join(users_lbph)}")
+        users = model_registry.registered_users()
+        print(f"\nSFace Registered Users ({len(users)}):")
+        print(f"  {', '.join(users)}")
 
     print("=" * 60)
 
 
+def run_multi_camera():
+    """
+    Chạy không GUI: nhận diện đồng thời mọi nguồn trong CAMERA_SOURCES,
+    ghi access log theo cửa (CAMERA_DOORS), in thống kê định kỳ (Ctrl+C để dừng)
+    """
+    from modules.multi_camera import MultiCameraManager
+
+    def on_result(result):
+        if profiler.mark("first frame"):
+            print("\n" + profiler.report())
+
+    with profiler.step("build multi-camera"):
+        manager = MultiCameraManager(config.CAMERA_SOURCES, on_result=on_result)
+
+    print(f"\nSources ({len(manager.sources)}):")
+    for source in manager.sources:
+        print(f"  - {source.source} -> door '{source.door}'")
+
+    if not manager.start():
+        return 1
+    print("\nApplication is running. Press Ctrl+C to exit.")
+
+    try:
+        last_report = time.time()
+        while manager.is_running():
+            time.sleep(0.5)
+            if time.time() - last_report < config.MULTI_CAMERA_REPORT_INTERVAL:
+                continue
+            last_report = time.time()
+            for s in manager.stats():
+                print(f"  [{s['source']}] read={s['read']} dropped={s['dropped']} "
+                      f"processed={s['processed']} queue={s['queue_depth']} "
+                      f"latency={s['avg_latency_ms']:.1f}ms")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        manager.stop()
+
+    print("[OK] Multi-camera stopped")
+    return 0
+
+
 def main():
     """Main function"""
+    profiler.enabled = "--profile-startup" in sys.argv
+
     # Print banner
     print_banner()
 
     # Validate config
     print("\nValidating configuration...")
-    if not config.validate_config():
+    with profiler.step("validate config"):
+        valid = config.validate_config()
+    if not valid:
         print("\n[X] Configuration validation failed!")
         return 1
     print("[OK] Configuration valid")
@@ -107,7 +152,8 @@ def main():
 
     # Check requirements
     print("\nChecking requirements...")
-    errors = check_requirements()
+    with profiler.step("check requirements"):
+        errors = check_requirements()
 
     if errors:
         print("\n[X] Requirements check failed:")
@@ -117,8 +163,23 @@ def main():
         return 1
     print("[OK] Requirements satisfied")
 
-    # Print system info
-    print_system_info()
+    # Models + gallery load in the background while Gradio is imported
+    model_registry.preload()
+
+    if "--multi-camera" in sys.argv:
+        with profiler.step("system info"):
+            print_system_info()
+        print("\n" + "=" * 60)
+        print("STARTING MULTI-CAMERA (HEADLESS)...")
+        print("=" * 60)
+        return run_multi_camera()
+
+    with profiler.step("import GUI"):
+        from gui.main_window_gradio import GradioMainWindow
+
+    # Print system info (users from the preloaded gallery)
+    with profiler.step("system info"):
+        print_system_info()
 
     # Start GUI
     print("\n" + "=" * 60)
@@ -126,8 +187,11 @@ def main():
     print("=" * 60)
     print("\nLaunching GUI...")
     try:
-        app = GradioMainWindow()
-        app.demo.launch(share=True)
+        with profiler.step("build GUI"):
+            app = GradioMainWindow()
+        if profiler.enabled:
+            print("\n" + profiler.report())
+        app.demo.launch(share=config.GRADIO_SHARE)
         print("[OK] GUI launched successfully")
         print("\nApplication is running. Close the window to exit.")
 
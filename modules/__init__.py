@@ -1,20 +1,34 @@
 """
 Face Access Control - Modules Package
 Export các class chính để dễ dàng import
+
+Classes are imported on first access (PEP 562), so importing one
+submodule does not load OpenCV models, the database layer and the camera
+code of all the others.
 """
 
-from .camera import CameraManager
-from .recognizer_sface import SFaceRecognizer
-from .detector_yunet import YuNetDetector
-from .database import Database
+import importlib
+
+_EXPORTS = {
+    'CameraManager': '.camera',
+    'SFaceRecognizer': '.recognizer_sface',
+    'YuNetDetector': '.detector_yunet',
+    'Database': '.database',
+}
 
-__all__ = [
-    'CameraManager',
-    'FaceDetector',
-    'SFaceRecognizer',
-    'YuNetDetector',
-    'Database'
-]
+__all__ = list(_EXPORTS)
 
 __version__ = '1.0.0'
 __author__ = 'Face Access Control Team'
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value  # Later lookups skip __getattr__
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
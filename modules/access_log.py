@@ -0,0 +1,742 @@
+"""
+Access Log Module
+Ghi access log ở thread nền và đọc log theo kiểu tail (chỉ đọc phần cần thiết)
+
+log_access() only puts a row on a queue. One writer thread per log store
+keeps it open, writes rows in batches (on LOG_BATCH_SIZE or every
+LOG_FLUSH_INTERVAL seconds), syncs every LOG_FSYNC_INTERVAL seconds and
+drains the queue at interpreter exit. Rows are never dropped: when the
+queue stays full for LOG_QUEUE_TIMEOUT seconds they are spilled to an
+overflow list, written in order once the queue has drained.
+
+Two stores are supported, chosen by the file extension:
+    .csv          daily rotation (access_log.YYYY-MM-DD.csv), reverse tail reads
+    .db/.sqlite   SQLite table indexed on timestamp, name, status and door
+
+Both keep daily rollups (count, first and last event per day / hour / name /
+status) up to date as batches are written, in a SQLite table: inside the log
+database itself, or in access_log.rollup.db next to a CSV log. For CSV the
+rollups record how far into which file they have counted, so a crash between
+the CSV write and the rollup commit is caught up on the next open.
+"""
+
+import atexit
+import csv
+import glob
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+from typing import Dict, Iterator, List, Optional
+
+import config
+
+
+LOG_HEADER = ["timestamp", "name", "method", "confidence", "status", "door"]
+
+
+def is_sqlite_path(log_path: str) -> bool:
+    return log_path.endswith((".db", ".sqlite"))
+
+
+def default_log_path() -> str:
+    """Access log store selected by LOG_BACKEND"""
+    if config.LOG_BACKEND == "sqlite":
+        return config.ACCESS_LOG_DB_PATH
+    return config.ACCESS_LOG_PATH
+
+
+def rollup_path(log_path: str) -> str:
+    """Database holding the rollups of a log store"""
+    if is_sqlite_path(log_path):
+        return log_path
+    return os.path.splitext(log_path)[0] + ".rollup.db"
+
+
+def rotated_log_files(log_path: str) -> List[str]:
+    """Rotated CSV files of a log, oldest first (ISO dates sort by name)"""
+    base, ext = os.path.splitext(log_path)
+    return sorted(glob.glob(f"{glob.escape(base)}.????-??-??*{ext}"))
+
+
+# ==================== STORES (WRITER SIDE) ====================
+
+
+class CsvLogSink:
+    """
+    Append-only CSV file with daily rotation
+
+    When a row belongs to a later day than the open file, the file is
+    renamed to access_log.<day>.csv and a new one is started.
+    """
+
+    def __init__(self, log_path: str, rotation: str = None):
+        self.log_path = log_path
+        self.rotation = rotation or config.LOG_ROTATION
+        self._file = None
+        self._writer = None
+        self._day: Optional[date] = None
+        self._rollups: Optional[sqlite3.Connection] = None
+
+    def _header_outdated(self) -> bool:
+        """True if the file on disk has another header (e.g. before the door column)"""
+        if not os.path.exists(self.log_path) or os.path.getsize(self.log_path) == 0:
+            return False
+        with open(self.log_path, "r", newline="", encoding="utf-8") as f:
+            return next(csv.reader(f), None) != LOG_HEADER
+
+    def _open(self) -> None:
+        if self._header_outdated():
+            # Do not append 6-column rows under an old header: move the
+            # file aside like a rotation (readers accept both layouts)
+            self._day = date.fromtimestamp(os.path.getmtime(self.log_path))
+            self._move_aside()
+        self._file = open(self.log_path, "a", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        if self._file.tell() == 0:
+            # Ghi header nếu file mới
+            self._writer.writerow(LOG_HEADER)
+            self._day = None
+        else:
+            self._day = date.fromtimestamp(os.path.getmtime(self.log_path))
+
+    def _rotate(self) -> None:
+        self.close()
+        self._move_aside()
+        self._open()
+
+    def _move_aside(self) -> None:
+        """Rename the current file to access_log.<day>.csv"""
+        base, ext = os.path.splitext(self.log_path)
+        target = f"{base}.{self._day.isoformat()}{ext}"
+        suffix = 1
+        while os.path.exists(target):
+            target = f"{base}.{self._day.isoformat()}-{suffix}{ext}"
+            suffix += 1
+        os.replace(self.log_path, target)
+
+    def write_rows(self, rows: List[List[str]]) -> None:
+        if self._file is None:
+            self._open()
+
+        for row in rows:
+            if self.rotation == "daily":
+                try:
+                    day = datetime.strptime(row[0], config.LOG_TIMESTAMP_FORMAT).date()
+                except ValueError:
+                    day = self._day  # Written as-is; rollups skip it
+                if self._day is not None and day is not None and day > self._day:
+                    self._file.flush()
+                    self._rotate()
+                self._day = day
+            self._writer.writerow(row)
+        self._file.flush()
+
+        # Count the new rows (and those of a file rotated meanwhile)
+        if self._rollups is None:
+            self._rollups = connect_rollups(rollup_path(self.log_path))
+        catch_up_rollups(self._rollups, self.log_path)
+
+    def sync(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = self._writer = None
+        if self._rollups is not None:
+            self._rollups.close()
+            self._rollups = None
+
+
+class SqliteLogSink:
+    """SQLite access log (WAL mode; one connection owned by the writer thread)"""
+
+    def __init__(self, log_path: str):
+        self.log_path = log_path
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def write_rows(self, rows: List[List[str]]) -> None:
+        if self._conn is None:
+            self._conn = connect_sqlite(self.log_path)
+            # fsync every commit only when asked to sync every batch
+            synchronous = "FULL" if config.LOG_FSYNC_INTERVAL == 0 else "NORMAL"
+            self._conn.execute(f"PRAGMA synchronous={synchronous}")
+        # Rows and their rollups commit together
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO access_log (timestamp, name, method, confidence, status, door) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(t, n, m, float(c), s, d) for t, n, m, c, s, d in rows],
+            )
+            update_rollups(self._conn, rows)
+
+    def sync(self) -> None:
+        if self._conn is not None:
+            self._conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self.sync()
+            self._conn.close()
+            self._conn = None
+
+
+def connect_sqlite(log_path: str) -> sqlite3.Connection:
+    """Open (and create / upgrade if needed) the SQLite access log"""
+    conn = sqlite3.connect(log_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS access_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            name TEXT NOT NULL,
+            method TEXT NOT NULL,
+            confidence REAL NOT NULL,
+            status TEXT NOT NULL,
+            door TEXT NOT NULL DEFAULT ''
+        );
+        CREATE INDEX IF NOT EXISTS idx_access_log_timestamp ON access_log (timestamp);
+        CREATE INDEX IF NOT EXISTS idx_access_log_name ON access_log (name);
+        CREATE INDEX IF NOT EXISTS idx_access_log_status ON access_log (status);
+        """
+    )
+
+    # Logs created before the door column / rollups existed
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(access_log)")]
+    if "door" not in columns:
+        with conn:
+            conn.execute("ALTER TABLE access_log ADD COLUMN door TEXT NOT NULL DEFAULT ''")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_access_log_door ON access_log (door)")
+
+    has_rollups = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='access_rollup'"
+    ).fetchone()
+    conn.executescript(ROLLUP_SCHEMA)
+    if not has_rollups:
+        with conn:
+            cursor = conn.execute(
+                "SELECT timestamp, name, method, confidence, status, door FROM access_log"
+            )
+            for rows in iter(lambda: cursor.fetchmany(10000), []):
+                update_rollups(conn, rows)
+    return conn
+
+
+# ==================== ROLLUPS ====================
+
+ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS access_rollup (
+    day TEXT NOT NULL,
+    hour INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    first TEXT NOT NULL,
+    last TEXT NOT NULL,
+    PRIMARY KEY (day, hour, name, status)
+);
+CREATE TABLE IF NOT EXISTS rollup_state (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def connect_rollups(path: str) -> sqlite3.Connection:
+    """Open the rollup database of a CSV log (autocommit, WAL)"""
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(ROLLUP_SCHEMA)
+    return conn
+
+
+def update_rollups(conn: sqlite3.Connection, rows) -> int:
+    """
+    Add log rows to the (day, hour, name, status) buckets
+
+    Rows are aggregated in memory first, so a batch costs one upsert per
+    bucket. first / last are stored as ISO timestamps. A malformed row
+    (unparsable timestamp, missing fields) is skipped on its own: it must
+    not block the rows after it.
+
+    Returns:
+        int: Rows skipped as malformed
+    """
+    buckets: Dict[tuple, list] = {}
+    skipped = 0
+    for row in rows:
+        try:
+            moment = datetime.strptime(row[0], config.LOG_TIMESTAMP_FORMAT)
+            name, status = row[1], row[4]
+        except (ValueError, TypeError, IndexError):
+            skipped += 1
+            continue
+        stamp = moment.isoformat(sep=" ")
+        key = (stamp[:10], moment.hour, name, status)
+        bucket = buckets.get(key)
+        if bucket is None:
+            buckets[key] = [1, stamp, stamp]
+        else:
+            bucket[0] += 1
+            bucket[1] = min(bucket[1], stamp)
+            bucket[2] = max(bucket[2], stamp)
+
+    conn.executemany(
+        "INSERT INTO access_rollup (day, hour, name, status, count, first, last) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (day, hour, name, status) DO UPDATE SET "
+        "count = count + excluded.count, "
+        "first = min(first, excluded.first), "
+        "last = max(last, excluded.last)",
+        [key + tuple(bucket) for key, bucket in buckets.items()],
+    )
+    return skipped
+
+
+def _count_csv_file(conn: sqlite3.Connection, path: str, offset: int) -> None:
+    """Add the complete lines of a CSV file after `offset` to the rollups"""
+    skipped = 0
+    with open(path, "rb") as f:
+        inode = os.fstat(f.fileno()).st_ino
+        f.seek(offset)
+        while True:
+            data = f.read(1 << 20)
+            end = data.rfind(b"\n")
+            if end < 0:
+                break  # EOF, or a line still being written
+            lines = data[: end + 1].decode("utf-8", errors="replace").splitlines()
+            skipped += update_rollups(
+                conn, [r for r in csv.reader(lines) if r and r[0] != "timestamp"]
+            )
+            offset += end + 1
+            f.seek(offset)
+
+    if skipped:
+        # Offset still moves past them: later rows keep being counted
+        print(f"[AccessLog] WARNING: {skipped} malformed rows not counted in {path}")
+
+    conn.executemany(
+        "INSERT OR REPLACE INTO rollup_state (key, value) VALUES (?, ?)",
+        [("inode", inode), ("offset", offset)],
+    )
+
+
+def catch_up_rollups(conn: sqlite3.Connection, log_path: str) -> None:
+    """
+    Count CSV rows written since the rollups were last updated
+
+    The rollups remember the inode and byte offset they reached, which
+    survives rotation (a rename keeps the inode). Runs in an IMMEDIATE
+    transaction, so concurrent callers never count the same rows twice.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        state = dict(conn.execute("SELECT key, value FROM rollup_state"))
+        inode, offset = state.get("inode"), state.get("offset", 0)
+
+        live = os.stat(log_path) if os.path.exists(log_path) else None
+        if live is not None and live.st_ino == inode:
+            todo = [(log_path, offset)]  # Common case: no rotation since last time
+        else:
+            files = rotated_log_files(log_path) + ([log_path] if live else [])
+            todo = [(path, 0) for path in files]  # First run: count the history
+            if inode is not None:
+                todo = [(path, 0) for path in files[-1:]]
+                for i, path in enumerate(files):
+                    if os.stat(path).st_ino == inode:
+                        todo = [(path, offset)] + [(p, 0) for p in files[i + 1:]]
+                        break
+
+        for path, start in todo:
+            _count_csv_file(conn, path, start)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+# ==================== BACKGROUND WRITER ====================
+
+
+class AccessLogWriter:
+    """
+    Background batched writer for one access log store
+
+    Attributes:
+        log_path: CSV or SQLite file
+        batch_size: Rows that trigger an immediate write
+        flush_interval: Max seconds a row waits in the queue
+        fsync_interval: Seconds between syncs (0 = after every batch)
+        queue_timeout: Seconds write() waits for room before spilling
+    """
+
+    def __init__(
+        self,
+        log_path: str = None,
+        batch_size: int = None,
+        flush_interval: float = None,
+        fsync_interval: float = None,
+        queue_size: int = None,
+        queue_timeout: float = None,
+    ):
+        self.log_path = log_path or default_log_path()
+        self.batch_size = batch_size or config.LOG_BATCH_SIZE
+        self.flush_interval = (
+            config.LOG_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        )
+        self.fsync_interval = (
+            config.LOG_FSYNC_INTERVAL if fsync_interval is None else fsync_interval
+        )
+        self.queue: "queue.Queue" = queue.Queue(
+            maxsize=queue_size or config.LOG_QUEUE_SIZE
+        )
+        self.queue_timeout = (
+            config.LOG_QUEUE_TIMEOUT if queue_timeout is None else queue_timeout
+        )
+        # Rows that did not fit in the queue; all newer than the queued rows
+        self._overflow: List[List[str]] = []
+        self._overflow_lock = threading.Lock()
+
+        self._sink = (
+            SqliteLogSink(self.log_path)
+            if is_sqlite_path(self.log_path)
+            else CsvLogSink(self.log_path)
+        )
+        self._last_fsync = time.monotonic()
+        self._thread: Optional[threading.Thread] = None
+
+        # Statistics
+        self.rows_written = 0
+        self.rows_spilled = 0
+        self.batches = 0
+        self.fsyncs = 0
+
+    def _log(self, msg: str) -> None:
+        """Internal logging helper"""
+        print(f"[AccessLogWriter] {msg}")
+
+    # ==================== PRODUCER SIDE ====================
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="access-log-writer", daemon=True
+        )
+        self._thread.start()
+
+    def write(self, row: List[str]) -> bool:
+        """
+        Queue one row (waits at most queue_timeout seconds, never drops it)
+
+        While the overflow list is not empty, rows go there too, so the
+        writer thread still sees them in order.
+
+        Returns:
+            bool: False if the queue was full and the row was spilled
+        """
+        with self._overflow_lock:
+            if not self._overflow:
+                try:
+                    self.queue.put(row, timeout=self.queue_timeout)
+                    return True
+                except queue.Full:
+                    pass
+            self._overflow.append(row)
+            self.rows_spilled += 1
+            return False
+
+    def flush(self, timeout: float = 2.0) -> bool:
+        """
+        Wait until every row queued so far is written (and synced)
+
+        Returns:
+            bool: False on timeout
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        try:
+            self.queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Drain the queue, sync and close the store"""
+        if self._thread is not None and self._thread.is_alive():
+            self.queue.put(None)
+            self._thread.join(timeout)
+        self._thread = None
+
+    def get_stats(self) -> dict:
+        return {
+            "queued": self.queue.qsize(),
+            "written": self.rows_written,
+            "spilled": self.rows_spilled,
+            "overflow": len(self._overflow),
+            "batches": self.batches,
+            "fsyncs": self.fsyncs,
+        }
+
+    # ==================== WRITER THREAD ====================
+
+    def _write_batch(self, rows: List[List[str]], force_sync: bool = False) -> None:
+        if rows:
+            self._sink.write_rows(rows)
+            self.rows_written += len(rows)
+            self.batches += 1
+
+        if force_sync or time.monotonic() - self._last_fsync >= self.fsync_interval:
+            self._sink.sync()
+            self._last_fsync = time.monotonic()
+            self.fsyncs += 1
+
+    def _take_overflow(self) -> List[List[str]]:
+        """Spilled rows, once every row queued before them has been taken"""
+        if not self._overflow or not self.queue.empty():
+            return []
+        with self._overflow_lock:
+            spilled, self._overflow = self._overflow, []
+        return spilled
+
+    def _run(self) -> None:
+        rows: List[List[str]] = []
+        deadline = None
+        while True:
+            spilled = self._take_overflow()
+            if spilled:
+                rows.extend(spilled)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = ()  # Flush interval elapsed
+
+            try:
+                if item is None or isinstance(item, threading.Event):
+                    # Shutdown / flush barrier: write everything, sync
+                    rows.extend(self._take_overflow())
+                    self._write_batch(rows, force_sync=True)
+                    rows, deadline = [], None
+                    if item is None:
+                        self._sink.close()
+                        return
+                    item.set()
+                    continue
+
+                if item:
+                    rows.append(item)
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+
+                if len(rows) >= self.batch_size or (
+                    deadline is not None and time.monotonic() >= deadline
+                ):
+                    self._write_batch(rows)
+                    rows, deadline = [], None
+            except Exception as e:
+                self._log(f"ERROR writing access log: {e}")
+                rows, deadline = [], None
+                if isinstance(item, threading.Event):
+                    item.set()
+
+
+# ==================== READERS ====================
+
+
+def tail_lines(path: str, limit: int, block_size: int = 8192) -> List[str]:
+    """
+    Last `limit` lines of a file, reading blocks backwards from the end
+
+    Only about limit * line_length bytes are read, whatever the file size.
+    """
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        data = b""
+        while pos > 0 and data.count(b"\n") <= limit:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+
+    lines = data.decode("utf-8").splitlines()
+    if pos > 0:
+        lines = lines[1:]  # First line may be partial
+    lines = [line for line in lines if line]
+    return lines[-limit:]
+
+
+def csv_records(lines) -> Iterator[Dict[str, str]]:
+    for row in csv.reader(lines):
+        if row and row[0] != "timestamp":
+            record = dict(zip(LOG_HEADER, row))
+            record.setdefault("door", "")  # Rows written before the door column
+            yield record
+
+
+def read_csv_logs(log_path: str, limit: int = None) -> List[Dict[str, str]]:
+    """
+    Records of a CSV log and its rotated files, oldest first
+
+    With a limit, files are tail-read from the newest one backwards, so
+    the cost is O(limit) and not O(history).
+    """
+    files = rotated_log_files(log_path)
+    if os.path.exists(log_path):
+        files.append(log_path)
+
+    if limit is None or limit <= 0:
+        logs = []
+        for path in files:
+            with open(path, "r", encoding="utf-8") as f:
+                logs.extend(csv_records(f))
+        return logs
+
+    logs: List[Dict[str, str]] = []
+    for path in reversed(files):
+        # +1: the header line may be among the lines read
+        records = list(csv_records(tail_lines(path, limit - len(logs) + 1)))
+        logs = records[-(limit - len(logs)):] + logs
+        if len(logs) >= limit:
+            break
+    return logs
+
+
+def read_sqlite_logs(log_path: str, limit: int = None) -> List[Dict[str, str]]:
+    """Records of a SQLite log, oldest first (same fields as the CSV)"""
+    if not os.path.exists(log_path):
+        return []
+    conn = connect_sqlite(log_path)
+    try:
+        query = (
+            "SELECT timestamp, name, method, confidence, status, door "
+            "FROM access_log ORDER BY id DESC"
+        )
+        if limit is not None and limit > 0:
+            rows = conn.execute(query + " LIMIT ?", (limit,)).fetchall()
+        else:
+            rows = conn.execute(query).fetchall()
+    finally:
+        conn.close()
+
+    return [sqlite_record(row) for row in reversed(rows)]
+
+
+def sqlite_record(row: tuple) -> Dict[str, str]:
+    """SQLite row -> record with the same fields / formatting as the CSV"""
+    timestamp, name, method, confidence, status, door = row
+    return {
+        "timestamp": timestamp,
+        "name": name,
+        "method": method,
+        "confidence": f"{confidence:.2f}",
+        "status": status,
+        "door": door,
+    }
+
+
+def read_logs(log_path: str, limit: int = None) -> List[Dict[str, str]]:
+    """Read the last `limit` records (all if None), oldest first"""
+    if is_sqlite_path(log_path):
+        return read_sqlite_logs(log_path, limit)
+    return read_csv_logs(log_path, limit)
+
+
+def log_files(log_path: str) -> List[str]:
+    """Every file backing a log store (for deletion)"""
+    rollups = rollup_path(log_path)
+    sqlite_files = [rollups, rollups + "-wal", rollups + "-shm"]
+    if is_sqlite_path(log_path):
+        return sqlite_files
+    return rotated_log_files(log_path) + [log_path] + sqlite_files
+
+
+# ==================== SHARED WRITERS ====================
+
+_writers: Dict[str, AccessLogWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(log_path: str) -> AccessLogWriter:
+    """Shared (started) writer for a log store, one per path per process"""
+    key = os.path.abspath(log_path)
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None:
+            writer = AccessLogWriter(log_path)
+            _writers[key] = writer
+        writer.start()
+        return writer
+
+
+def flush_writer(log_path: str) -> None:
+    """Make queued rows of a log store visible to readers"""
+    writer = _writers.get(os.path.abspath(log_path))
+    if writer is not None:
+        writer.flush()
+
+
+def close_writer(log_path: str) -> None:
+    """Close the writer of a log store (e.g. before deleting it)"""
+    with _writers_lock:
+        writer = _writers.pop(os.path.abspath(log_path), None)
+    if writer is not None:
+        writer.close()
+
+
+@atexit.register
+def close_all_writers() -> None:
+    """Flush every access log at shutdown"""
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close()
+
+
+# ==================== TESTING ====================
+
+if __name__ == "__main__":
+    import tempfile
+
+    print("Testing Access Log...")
+    print("=" * 50)
+
+    for name in ("access_log.csv", "access_log.db"):
+        path = os.path.join(tempfile.mkdtemp(), name)
+        writer = get_writer(path)
+
+        start = time.perf_counter()
+        for i in range(100000):
+            day = 1 + i // 20000
+            writer.write(
+                [f"2024-01-0{day} 00:00:00", f"user{i % 10}", "SFACE", "0.90", "GRANTED", ""]
+            )
+        enqueue_us = (time.perf_counter() - start) * 1e6 / 100000
+        writer.flush(timeout=30.0)
+        stats = writer.get_stats()
+        assert stats["written"] == 100000, stats  # Audit log: nothing may be lost
+
+        start = time.perf_counter()
+        tail = read_logs(path, limit=50)
+        tail_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        everything = read_logs(path)
+        full_ms = (time.perf_counter() - start) * 1000
+
+        print(f"{name}: enqueue {enqueue_us:.1f} us/row, files {len(log_files(path))}, "
+              f"written {stats['written']} (spilled {stats['spilled']})")
+        print(f"  tail(50): {len(tail)} rows in {tail_ms:.2f} ms, "
+              f"full: {len(everything)} rows in {full_ms:.1f} ms")
@@ -5,6 +5,9 @@ Quản lý webcam: mở, đọc frame, đóng camera
 
 import cv2
 import numpy as np
+import threading
+import time
+from collections import deque
 from typing import Tuple, Optional
 import config
 
@@ -19,13 +22,15 @@ class CameraManager:
         height (int): Chiều cao frame
         fps (int): Frames per second
         cap (cv2.VideoCapture): OpenCV VideoCapture object
+        threaded (bool): Đọc frame bằng thread nền (luôn trả frame mới nhất)
     """
     
     def __init__(self, 
                  camera_id: int = None,
                  width: int = None,
                  height: int = None,
-                 fps: int = None):
+                 fps: int = None,
+                 threaded: bool = None):
         """
         Khởi tạo Camera Manager
         
@@ -34,15 +39,29 @@ class CameraManager:
             width: Chiều rộng frame (mặc định từ config)
             height: Chiều cao frame (mặc định từ config)
             fps: Frames per second (mặc định từ config)
+            threaded: Bật background capture (mặc định từ config)
         """
         self.camera_id = camera_id if camera_id is not None else config.CAMERA_ID
         self.width = width if width is not None else config.CAMERA_WIDTH
         self.height = height if height is not None else config.CAMERA_HEIGHT
         self.fps = fps if fps is not None else config.CAMERA_FPS
+        self.threaded = threaded if threaded is not None else config.CAMERA_THREADED
         
         self.cap: Optional[cv2.VideoCapture] = None
         self.is_opened_flag = False
         
+        # Background capture: ring buffer (seq, frame) + counters
+        self._buffer = deque(maxlen=config.CAMERA_RING_BUFFER_SIZE)
+        self._buffer_cond = threading.Condition()
+        self._capture_thread: Optional[threading.Thread] = None
+        self._capture_running = False
+        self._grab_seq = 0
+        self._read_seq = 0
+        self.frames_grabbed = 0
+        self.frames_delivered = 0
+        self.frames_dropped = 0
+        self.grab_failures = 0
+        
         if config.DEBUG:
             print(f"[CameraManager] Initialized with camera_id={self.camera_id}, "
                   f"resolution={self.width}x{self.height}, fps={self.fps}")
@@ -66,6 +85,9 @@ class CameraManager:
             self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
             self.cap.set(cv2.CAP_PROP_FPS, self.fps)
             
+            # Giữ buffer của driver nhỏ nhất có thể để tránh frame cũ
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            
             # Verify actual properties
             actual_width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
             actual_height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
@@ -73,6 +95,9 @@ class CameraManager:
             
             self.is_opened_flag = True
             
+            if self.threaded:
+                self._start_capture_thread()
+            
             if config.DEBUG:
                 print(f"[CameraManager] Camera opened successfully")
                 print(f"[CameraManager] Actual resolution: {actual_width}x{actual_height}")
@@ -97,6 +122,9 @@ class CameraManager:
             print("[CameraManager] ERROR: Camera is not opened")
             return False, None
         
+        if self.threaded:
+            return self._read_latest()
+        
         try:
             ret, frame = self.cap.read()
             
@@ -110,13 +138,120 @@ class CameraManager:
             print(f"[CameraManager] ERROR reading frame: {e}")
             return False, None
     
+    # ==================== BACKGROUND CAPTURE ====================
+    
+    def _start_capture_thread(self) -> None:
+        """Khởi động thread đọc frame liên tục từ camera"""
+        with self._buffer_cond:
+            self._buffer.clear()
+            self._read_seq = self._grab_seq
+        self._capture_running = True
+        self._capture_thread = threading.Thread(
+            target=self._capture_loop, name=f"camera-{self.camera_id}", daemon=True
+        )
+        self._capture_thread.start()
+    
+    def _capture_loop(self) -> None:
+        """
+        Đọc frame liên tục vào ring buffer
+        
+        Frame chưa được read() lấy khi frame mới tới sẽ bị tính là dropped.
+        """
+        cap = self.cap
+        while self._capture_running:
+            try:
+                ret, frame = cap.read()
+            except Exception:
+                ret, frame = False, None
+            
+            if not ret or frame is None:
+                self.grab_failures += 1
+                time.sleep(0.01)
+                continue
+            
+            with self._buffer_cond:
+                if self._grab_seq > self._read_seq:
+                    self.frames_dropped += 1
+                self._grab_seq += 1
+                self.frames_grabbed += 1
+                self._buffer.append((self._grab_seq, frame))
+                self._buffer_cond.notify_all()
+        
+        if self.cap is not cap:
+            # release() hết thời gian chờ thread này và giao camera lại cho nó
+            cap.release()
+    
+    def _read_latest(self, timeout: float = 1.0) -> Tuple[bool, Optional[np.ndarray]]:
+        """
+        Lấy frame mới nhất chưa đọc (chờ tối đa timeout giây)
+        """
+        with self._buffer_cond:
+            self._buffer_cond.wait_for(
+                lambda: self._grab_seq > self._read_seq or not self._capture_running,
+                timeout=timeout,
+            )
+            # Hết thời gian chờ hoặc capture đã dừng: không trả lại frame đã đọc
+            if (
+                not self._capture_running
+                or self._grab_seq <= self._read_seq
+                or not self._buffer
+            ):
+                print("[CameraManager] ERROR: Failed to read frame")
+                return False, None
+            
+            seq, frame = self._buffer[-1]
+            self._read_seq = seq
+            self.frames_delivered += 1
+            return True, frame
+    
+    def _stop_capture_thread(self) -> bool:
+        """
+        Dừng thread đọc frame
+        
+        Returns:
+            bool: False nếu thread vẫn còn kẹt trong cap.read() sau 2 giây
+        """
+        self._capture_running = False
+        with self._buffer_cond:
+            self._buffer_cond.notify_all()
+        if self._capture_thread is None:
+            return True
+        self._capture_thread.join(timeout=2.0)
+        stopped = not self._capture_thread.is_alive()
+        self._capture_thread = None
+        return stopped
+    
+    def get_stats(self) -> dict:
+        """
+        Thống kê capture
+        
+        Returns:
+            dict: grabbed, delivered, dropped, grab_failures
+        """
+        return {
+            'grabbed': self.frames_grabbed,
+            'delivered': self.frames_delivered,
+            'dropped': self.frames_dropped,
+            'grab_failures': self.grab_failures,
+        }
+    
     def release(self) -> None:
         """
         Đóng camera và giải phóng tài nguyên
         """
+        stopped = self._stop_capture_thread()
+        
         if self.cap is not None:
-            self.cap.release()
             self.is_opened_flag = False
+            if not stopped:
+                # Không release khi thread còn trong cap.read(): thread tự
+                # release camera khi thoát
+                print("[CameraManager] WARNING: Capture thread still busy, "
+                      "camera will be released when it exits")
+                self.cap = None
+                return
+            
+            self.cap.release()
             
             if config.DEBUG:
                 print("[CameraManager] Camera released")
@@ -5,13 +5,21 @@ Quản lý lưu/đọc models, embeddings và access logs
 
 import cv2
 import json
-import pickle
-import csv
 import os
 from datetime import datetime
-from typing import Dict, List, Tuple, Any, Optional
+from typing import Dict, Iterator, List, Tuple, Any, Optional
 import numpy as np
 import config
+from .gallery_store import GalleryStore
+from .access_log import (
+    close_writer,
+    default_log_path,
+    flush_writer,
+    get_writer,
+    log_files,
+    read_logs,
+)
+from .log_query import count_by, first_last_per_day, query_logs
 
 
 class Database:
@@ -27,6 +35,11 @@ class Database:
         # Tạo các thư mục cần thiết
         config.create_directories()
 
+        # Revision của gallery đọc/ghi gần nhất (None = chưa đọc)
+        self.gallery_revision: Optional[int] = None
+        # Gallery đọc/ghi gần nhất được embed từ ảnh đã căn chỉnh hay chưa
+        self.gallery_aligned = bool(config.SFACE_ALIGN_FACES)
+
         if config.DEBUG:
             print("[Database] Initialized")
 
@@ -38,42 +51,34 @@ class Database:
         method: str,
         confidence: float,
         status: str,
+        door: str = "",
         log_path: str = None,
     ) -> bool:
         """
-        Ghi log truy cập
+        Ghi log truy cập (đưa vào hàng đợi, thread nền ghi xuống đĩa)
 
         Args:
             name: Tên người
             method: Phương pháp nhận diện ('LBPH', 'OpenFace' hoặc 'sFace)
             confidence: Confidence score hoặc distance
             status: Trạng thái ('GRANTED' hoặc 'DENIED')
-            log_path: Đường dẫn log file (mặc định từ config)
+            door: Cửa / camera ghi nhận (tùy chọn)
+            log_path: Đường dẫn log (.csv hoặc .db, mặc định theo LOG_BACKEND)
 
         Returns:
-            bool: True nếu ghi log thành công
+            bool: True nếu record được đưa vào hàng đợi (hoặc bộ đệm tràn)
         """
         try:
-            log_path = log_path or config.ACCESS_LOG_PATH
+            log_path = log_path or default_log_path()
 
             # Tạo timestamp
             timestamp = datetime.now().strftime(config.LOG_TIMESTAMP_FORMAT)
 
-            # Kiểm tra file có tồn tại không
-            file_exists = os.path.exists(log_path)
-
-            # Ghi vào CSV
-            with open(log_path, "a", newline="", encoding="utf-8") as f:
-                writer = csv.writer(f)
-
-                # Ghi header nếu file mới
-                if not file_exists:
-                    writer.writerow(
-                        ["timestamp", "name", "method", "confidence", "status"]
-                    )
-
-                # Ghi data
-                writer.writerow([timestamp, name, method, f"{confidence:.2f}", status])
+            # Không ghi trực tiếp: AccessLogWriter ghi theo batch ở thread nền
+            if not get_writer(log_path).write(
+                [timestamp, name, method, f"{confidence:.2f}", status, door]
+            ) and config.DEBUG:
+                print("[Database] WARNING: Access log queue full, record spilled to overflow")
 
             if config.DEBUG:
                 print(
@@ -90,31 +95,28 @@ class Database:
         self, log_path: str = None, limit: int = None
     ) -> List[Dict[str, Any]]:
         """
-        Đọc access logs
+        Đọc access logs (cũ nhất trước)
+
+        Với limit, chỉ đọc ngược từ cuối file (hoặc LIMIT trong SQLite) nên
+        chi phí O(limit), không phụ thuộc độ dài lịch sử.
 
         Args:
-            log_path: Đường dẫn log file (mặc định từ config)
+            log_path: Đường dẫn log (.csv hoặc .db, mặc định theo LOG_BACKEND)
             limit: Số lượng records tối đa (None = tất cả)
 
         Returns:
             List[Dict]: Danh sách access records
         """
         try:
-            log_path = log_path or config.ACCESS_LOG_PATH
-
-            if not os.path.exists(log_path):
-                print(f"[Database] WARNING: Log file not found: {log_path}")
-                return []
+            log_path = log_path or default_log_path()
 
-            logs = []
-            with open(log_path, "r", encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    logs.append(row)
+            # Ghi các record còn trong hàng đợi trước khi đọc
+            flush_writer(log_path)
 
-            # Limit nếu cần
-            if limit is not None and limit > 0:
-                logs = logs[-limit:]
+            logs = read_logs(log_path, limit)
+            if not logs:
+                print(f"[Database] WARNING: No access logs found: {log_path}")
+                return []
 
             if config.DEBUG:
                 print(f"[Database] Read {len(logs)} access logs")
@@ -127,22 +129,26 @@ class Database:
 
     def clear_access_logs(self, log_path: str = None) -> bool:
         """
-        Xóa tất cả access logs
+        Xóa tất cả access logs (kể cả các file đã rotate)
 
         Args:
-            log_path: Đường dẫn log file (mặc định từ config)
+            log_path: Đường dẫn log (.csv hoặc .db, mặc định theo LOG_BACKEND)
 
         Returns:
             bool: True nếu xóa thành công
         """
         try:
-            log_path = log_path or config.ACCESS_LOG_PATH
+            log_path = log_path or default_log_path()
 
-            if os.path.exists(log_path):
-                os.remove(log_path)
+            # Đóng file handle của writer nền trước khi xóa
+            close_writer(log_path)
 
-                if config.DEBUG:
-                    print(f"[Database] Access logs cleared: {log_path}")
+            for path in log_files(log_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+            if config.DEBUG:
+                print(f"[Database] Access logs cleared: {log_path}")
 
             return True
 
@@ -152,49 +158,154 @@ class Database:
 
             return False
 
+    def query_access_logs(self, log_path: str = None, **filters) -> Iterator[Dict[str, Any]]:
+        """
+        Truy vấn access logs theo thời gian / trường (trả về từng record)
+
+        Args:
+            log_path: Đường dẫn log (.csv hoặc .db, mặc định theo LOG_BACKEND)
+            **filters: start, end, name, status, method, door, min_confidence
+                (xem log_query.query_logs)
+
+        Returns:
+            Iterator[Dict]: Các record khớp, cũ nhất trước
+        """
+        log_path = log_path or default_log_path()
+        flush_writer(log_path)
+        return query_logs(log_path, **filters)
+
+    def get_access_counts(
+        self,
+        fields: Tuple[str, ...] = ("status",),
+        start_day=None,
+        end_day=None,
+        log_path: str = None,
+    ) -> Dict[tuple, int]:
+        """
+        Thống kê số lượt truy cập từ daily rollups (không quét lại log)
+
+        Args:
+            fields: Nhóm theo 'day', 'hour', 'name' và/hoặc 'status'
+            start_day: Ngày bắt đầu (bao gồm)
+            end_day: Ngày kết thúc (bao gồm)
+            log_path: Đường dẫn log (.csv hoặc .db, mặc định theo LOG_BACKEND)
+
+        Returns:
+            Dict: Tuple giá trị các field -> số lượt
+        """
+        try:
+            log_path = log_path or default_log_path()
+            flush_writer(log_path)
+            return count_by(fields, log_path, start_day, end_day)
+
+        except Exception as e:
+            print(f"[Database] ERROR reading access counts: {e}")
+            return {}
+
+    def get_first_last_access(
+        self, start_day=None, end_day=None, log_path: str = None
+    ) -> Dict[Tuple[str, str], Tuple[str, str]]:
+        """
+        Lần vào đầu tiên / cuối cùng (GRANTED) của mỗi người theo ngày
+
+        Returns:
+            Dict: (ngày, tên) -> (timestamp đầu, timestamp cuối)
+        """
+        try:
+            log_path = log_path or default_log_path()
+            flush_writer(log_path)
+            return first_last_per_day(log_path, start_day, end_day)
+
+        except Exception as e:
+            print(f"[Database] ERROR reading first/last access: {e}")
+            return {}
+
     # ==================== EMBEDDINGS MANAGEMENT ====================
 
-    def save_embeddings(self, names: List[str], embeddings: List[np.ndarray]) -> bool:
+    def save_embeddings(
+        self,
+        names: List[str],
+        embeddings: List[np.ndarray],
+        aligned: Optional[bool] = None,
+    ) -> bool:
         """
-        Lưu embeddings vào file
+        Lưu embeddings vào gallery store (ma trận float32 + bảng tên)
 
         Args:
             names: Danh sách tên
-            embeddings: Danh sách embeddings
+            embeddings: Danh sách embeddings (hoặc ma trận (N, D))
+            aligned: Embeddings từ ảnh đã căn chỉnh (mặc định SFACE_ALIGN_FACES)
 
         Returns:
             bool: True nếu lưu thành công
         """
-        try:
-            with open(config.SFACE_EMBEDDINGS_PATH, "wb") as f:
-                pickle.dump((names, embeddings), f)
+        store = GalleryStore()
+        if not store.write(names, embeddings, aligned):
+            return False
+        self.gallery_revision = store.header["revision"]
+        self.gallery_aligned = bool(store.header["aligned"])
 
-            if config.DEBUG:
-                print(f"[Database] Embeddings saved to: {config.SFACE_EMBEDDINGS_PATH}")
+        if config.DEBUG:
+            print(f"[Database] Embeddings saved to: {config.SFACE_GALLERY_DIR}")
 
-            return True
+        return True
 
-        except Exception as e:
-            print(f"[Database] ERROR saving embeddings: {e}")
+    def update_embeddings(
+        self,
+        remove: np.ndarray,
+        names: List[str],
+        embeddings: np.ndarray,
+        expected_revision: Optional[int] = None,
+    ) -> bool:
+        """
+        Cập nhật gallery chỉ ghi phần thay đổi (append + tombstone)
+
+        Args:
+            remove: Vị trí các dòng cần xóa (theo thứ tự của load_embeddings)
+            names: Tên các dòng thêm mới
+            embeddings: Embeddings thêm mới
+            expected_revision: Revision lúc đọc các vị trí trong remove
+                               (thường là self.gallery_revision); từ chối
+                               nếu gallery đã bị thay đổi từ đó
+
+        Returns:
+            bool: True nếu lưu thành công
+        """
+        store = GalleryStore()
+        if not store.update(remove, names, embeddings, expected_revision):
             return False
+        # Header vẫn trống nếu không có gì thay đổi
+        self.gallery_revision = store.header.get("revision", self.gallery_revision)
 
-    def load_embeddings(self) -> Tuple[List[str], List[np.ndarray]]:
+        if config.DEBUG:
+            print(
+                f"[Database] Gallery updated: +{len(names)} / -{len(remove)} embeddings"
+            )
+
+        return True
+
+    def load_embeddings(self) -> Tuple[List[str], np.ndarray]:
         """
-        Đọc embeddings từ file
+        Đọc embeddings từ gallery store (memory-map, không copy)
+
+        File embeddings.pkl cũ được tự động chuyển sang định dạng mới.
 
         Returns:
-            Tuple[List[str], List[np.ndarray]]: (names, embeddings)
+            Tuple[List[str], np.ndarray]: (names, ma trận (N, D) chỉ đọc)
         """
         try:
-            if not os.path.exists(config.SFACE_EMBEDDINGS_PATH):
+            store = GalleryStore()
+            if not store.exists() and os.path.exists(config.SFACE_EMBEDDINGS_PATH):
+                store.migrate_from_pickle(config.SFACE_EMBEDDINGS_PATH)
+
+            if not store.exists():
                 if config.DEBUG:
-                    print(
-                        f"[Database] Embeddings file not found: {config.SFACE_EMBEDDINGS_PATH}"
-                    )
+                    print(f"[Database] Gallery not found: {config.SFACE_GALLERY_DIR}")
                 return [], []
 
-            with open(config.SFACE_EMBEDDINGS_PATH, "rb") as f:
-                names, embeddings = pickle.load(f)
+            names, embeddings = store.read()
+            self.gallery_revision = store.header["revision"]
+            self.gallery_aligned = bool(store.header.get("aligned", False))
 
             if config.DEBUG:
                 print(f"[Database] Embeddings loaded: {len(names)} users")
@@ -205,6 +316,92 @@ class Database:
             print(f"[Database] ERROR loading embeddings: {e}")
             return [], []
 
+    def save_index(self, state: Dict[str, np.ndarray]) -> bool:
+        """
+        Lưu search index (IVF...) cạnh file embeddings
+
+        Args:
+            state: Dictionary các mảng NumPy của index
+
+        Returns:
+            bool: True nếu lưu thành công
+        """
+        try:
+            # Ghi file tạm rồi rename để không bao giờ để lại file hỏng
+            tmp_path = config.SFACE_INDEX_PATH + ".tmp.npz"
+            np.savez(tmp_path, **state)
+            os.replace(tmp_path, config.SFACE_INDEX_PATH)
+
+            if config.DEBUG:
+                print(f"[Database] Search index saved to: {config.SFACE_INDEX_PATH}")
+
+            return True
+
+        except Exception as e:
+            print(f"[Database] ERROR saving search index: {e}")
+            return False
+
+    def load_index(self) -> Dict[str, np.ndarray]:
+        """
+        Đọc search index đã lưu
+
+        Returns:
+            Dict[str, np.ndarray]: Các mảng của index (rỗng nếu chưa có)
+        """
+        try:
+            if not os.path.exists(config.SFACE_INDEX_PATH):
+                return {}
+
+            with np.load(config.SFACE_INDEX_PATH, allow_pickle=False) as data:
+                return {key: data[key] for key in data.files}
+
+        except Exception as e:
+            print(f"[Database] ERROR loading search index: {e}")
+            return {}
+
+    def save_manifest(self, manifest: Dict[str, Any]) -> bool:
+        """
+        Lưu manifest training (ảnh nào đã embed, hash, mtime)
+
+        Args:
+            manifest: Dictionary manifest (JSON-serializable)
+
+        Returns:
+            bool: True nếu lưu thành công
+        """
+        try:
+            tmp_path = config.SFACE_MANIFEST_PATH + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False)
+            os.replace(tmp_path, config.SFACE_MANIFEST_PATH)
+
+            if config.DEBUG:
+                print(f"[Database] Manifest saved to: {config.SFACE_MANIFEST_PATH}")
+
+            return True
+
+        except Exception as e:
+            print(f"[Database] ERROR saving manifest: {e}")
+            return False
+
+    def load_manifest(self) -> Dict[str, Any]:
+        """
+        Đọc manifest training
+
+        Returns:
+            Dict[str, Any]: Manifest (rỗng nếu chưa có)
+        """
+        try:
+            if not os.path.exists(config.SFACE_MANIFEST_PATH):
+                return {}
+
+            with open(config.SFACE_MANIFEST_PATH, "r", encoding="utf-8") as f:
+                return json.load(f)
+
+        except Exception as e:
+            print(f"[Database] ERROR loading manifest: {e}")
+            return {}
+
     # ==================== UTILITY FUNCTIONS ====================
 
     def get_user_list(self, method: str = "lbph") -> List[str]:
@@ -240,7 +437,9 @@ class Database:
             bool: True nếu model tồn tại
         """
         if method == "sface":
-            return os.path.exists(config.SFACE_EMBEDDINGS_PATH)
+            return GalleryStore().exists() or os.path.exists(
+                config.SFACE_EMBEDDINGS_PATH
+            )
 
         return False
 
@@ -5,8 +5,9 @@ Sử dụng YuNet ONNX model từ OpenCV Zoo
 
 import cv2
 import numpy as np
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 import os
+import time
 import config
 
 
@@ -16,7 +17,8 @@ class YuNetDetector:
 
     Attributes:
         model: YuNet detector model
-        input_size: Input size for the model (320x320)
+        input_size: Initial input size for the model (320x320)
+        max_side: Longest side YuNet actually sees (0 = native resolution)
         conf_threshold: Confidence threshold (default 0.6)
         nms_threshold: NMS threshold (default 0.3)
     """
@@ -41,6 +43,23 @@ class YuNetDetector:
         self.input_size = (320, 320)
         self.model = None
 
+        # Input size currently set on the model (setInputSize only on change)
+        self._model_input_size = None
+
+        # Downscaled detection: longest side fed to YuNet (0 = native size)
+        self.max_side = config.DETECTION_MAX_SIDE
+        self._small_frame = None
+
+        # Detection stride: full YuNet every N frames, optical flow in between
+        self.detection_stride = config.DETECTION_STRIDE
+        self.max_stride = config.DETECTION_MAX_STRIDE
+        self.adaptive_stride = config.DETECTION_ADAPTIVE_STRIDE
+        self.motion_threshold = config.DETECTION_MOTION_THRESHOLD
+        self.current_stride = self.detection_stride
+        self._last_detections: List[dict] = []
+        self._prev_gray = None
+        self._frames_since_detection = 0
+
         # Load model
         self.load_model()
 
@@ -65,6 +84,7 @@ class YuNetDetector:
                 self.conf_threshold,
                 self.nms_threshold,
             )
+            self._model_input_size = self.input_size
 
             if config.DEBUG:
                 print(f"[YuNetDetector] [OK] Model loaded: {self.model_path}")
@@ -75,6 +95,63 @@ class YuNetDetector:
             print(f"[YuNetDetector] ERROR loading model: {e}")
             return False
 
+    def _run_model(self, frame: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Run YuNet on a frame
+
+        If the frame is larger than max_side, YuNet runs on a downscaled
+        copy (reused buffer) and boxes/landmarks are mapped back, so the
+        detector cost does not grow with the camera resolution.
+
+        Returns:
+            (K, 15) raw detections in full-resolution coordinates, or None
+        """
+        h, w = frame.shape[:2]
+        scale = 1.0
+        if self.max_side and max(h, w) > self.max_side:
+            scale = self.max_side / float(max(h, w))
+            size = (max(1, int(round(w * scale))), max(1, int(round(h * scale))))
+            if self._small_frame is None or self._small_frame.shape[:2] != size[::-1]:
+                self._small_frame = np.empty((size[1], size[0], 3), np.uint8)
+            cv2.resize(frame, size, dst=self._small_frame, interpolation=cv2.INTER_AREA)
+            frame = self._small_frame
+            h, w = frame.shape[:2]
+
+        # Set input size based on frame size (only when it changes)
+        if self._model_input_size != (w, h):
+            self.model.setInputSize((w, h))
+            self._model_input_size = (w, h)
+
+        _, faces = self.model.detect(frame)
+
+        if faces is not None and scale != 1.0:
+            # Box (4) + landmarks (10) back to full resolution; keep score
+            faces = faces.copy()
+            faces[:, :14] /= scale
+        return faces
+
+    def warm_up(self, frame_size: Tuple[int, int] = None) -> float:
+        """
+        Run one inference on a blank frame
+
+        OpenCV allocates and plans the network on the first forward pass, so
+        doing it at load time keeps that cost off the first camera frame. It
+        also sets the input size that frames of frame_size will use.
+        Tracking state is not touched.
+
+        Args:
+            frame_size: (width, height) of the frames to come (default camera size)
+
+        Returns:
+            float: Warm-up time in ms (0 if the model is not loaded)
+        """
+        if self.model is None:
+            return 0.0
+        width, height = frame_size or (config.CAMERA_WIDTH, config.CAMERA_HEIGHT)
+        start = time.perf_counter()
+        self._run_model(np.zeros((height, width, 3), dtype=np.uint8))
+        return (time.perf_counter() - start) * 1000
+
     def detect_faces(self, frame: np.ndarray) -> List[Tuple[int, int, int, int]]:
         """
         Detect faces in frame
@@ -89,12 +166,8 @@ class YuNetDetector:
             return []
 
         try:
-            # Set input size based on frame size
-            h, w = frame.shape[:2]
-            self.model.setInputSize((w, h))
-
             # Detect faces
-            _, faces = self.model.detect(frame)
+            faces = self._run_model(frame)
 
             if faces is None:
                 return []
@@ -131,21 +204,23 @@ class YuNetDetector:
             return []
 
         try:
-            h, w = frame.shape[:2]
-            self.model.setInputSize((w, h))
-
-            _, faces = self.model.detect(frame)
+            faces = self._run_model(frame)
 
             if faces is None:
                 return []
 
             results = []
             for face in faces:
-                # Bounding box
+                # Bounding box (clamped to frame, same as detect_faces)
                 x, y, w, h = face[:4].astype(int)
+                x = max(0, x)
+                y = max(0, y)
+                w = min(w, frame.shape[1] - x)
+                h = min(h, frame.shape[0] - y)
 
                 # 5 landmarks: right eye, left eye, nose, right mouth, left mouth
-                landmarks = face[4:14].reshape(5, 2).astype(int)
+                # Kept sub-pixel (float32) for face alignment
+                landmarks = face[4:14].reshape(5, 2).astype(np.float32)
 
                 results.append(
                     {
@@ -162,6 +237,135 @@ class YuNetDetector:
                 print(f"[YuNetDetector] ERROR during landmark detection: {e}")
             return []
 
+    def detect_tracked(self, frame: np.ndarray) -> List[dict]:
+        """
+        Landmark detection with a detection stride
+
+        Full YuNet runs every current_stride frames; frames in between move
+        the last detections with sparse Lucas-Kanade optical flow on their
+        landmarks. With adaptive stride, fast motion shortens the stride
+        (down to 1) and a still scene lengthens it (up to max_stride).
+
+        Args:
+            frame: Input frame (BGR)
+
+        Returns:
+            Same format as detect_with_landmarks (interpolated boxes have
+            'interpolated': True)
+        """
+        if self.detection_stride <= 1 and not self.adaptive_stride:
+            return self.detect_with_landmarks(frame)
+
+        # Optical flow on a half-resolution grayscale image
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        gray = cv2.resize(
+            gray, (gray.shape[1] // 2, gray.shape[0] // 2), interpolation=cv2.INTER_AREA
+        )
+
+        results = None
+        if (
+            self._prev_gray is not None
+            and self._prev_gray.shape == gray.shape
+            and self._frames_since_detection < self.current_stride
+        ):
+            results = self._propagate(self._prev_gray, gray, frame.shape)
+
+        if results is None:
+            results = self.detect_with_landmarks(frame)
+            if self.adaptive_stride:
+                self._adapt_stride(self._detection_motion(results))
+            self._frames_since_detection = 0
+        self._frames_since_detection += 1
+
+        self._prev_gray = gray
+        self._last_detections = results
+        return results
+
+    def _propagate(
+        self, prev_gray: np.ndarray, gray: np.ndarray, frame_shape: tuple
+    ) -> Optional[List[dict]]:
+        """
+        Move last detections by the median optical-flow displacement
+
+        Returns:
+            Interpolated detections, or None if a full detection is needed
+        """
+        if not self._last_detections:
+            return []
+
+        # Landmarks + box centre per face, in half-resolution coordinates
+        points = []
+        for d in self._last_detections:
+            x, y, w, h = d["bbox"]
+            points.append(np.vstack([d["landmarks"], [[x + w / 2, y + h / 2]]]))
+        points = (np.vstack(points) / 2.0).astype(np.float32).reshape(-1, 1, 2)
+
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(
+            prev_gray, gray, points, None, winSize=(15, 15), maxLevel=2
+        )
+        if moved is None:
+            return None
+
+        displacement = (moved - points).reshape(-1, 6, 2) * 2.0
+        status = status.reshape(-1, 6).astype(bool)
+
+        results = []
+        max_motion = 0.0
+        for d, disp, ok in zip(self._last_detections, displacement, status):
+            if ok.sum() < 3:
+                return None  # Lost the face: re-detect
+            dx, dy = np.median(disp[ok], axis=0)
+            max_motion = max(max_motion, float(np.hypot(dx, dy)))
+
+            x, y, w, h = d["bbox"]
+            x = int(round(x + dx))
+            y = int(round(y + dy))
+            if x < 0 or y < 0 or x + w > frame_shape[1] or y + h > frame_shape[0]:
+                return None  # Leaving the frame: re-detect
+            results.append(
+                {
+                    "bbox": (x, y, w, h),
+                    "landmarks": d["landmarks"] + np.float32([dx, dy]),
+                    "confidence": d["confidence"],
+                    "interpolated": True,
+                }
+            )
+
+        if self.adaptive_stride and not self._adapt_stride(max_motion):
+            return None  # Too fast: re-detect now
+
+        return results
+
+    def _detection_motion(self, detections: List[dict]) -> float:
+        """Per-frame centre motion between the last two full detections"""
+        if not detections or not self._last_detections:
+            return 0.0
+
+        def centres(dets):
+            return np.array(
+                [[x + w / 2, y + h / 2] for x, y, w, h in (d["bbox"] for d in dets)]
+            )
+
+        dist = np.linalg.norm(
+            centres(detections)[:, None, :] - centres(self._last_detections)[None, :, :],
+            axis=2,
+        )
+        return float(dist.min(axis=1).max()) / max(self._frames_since_detection, 1)
+
+    def _adapt_stride(self, motion: float) -> bool:
+        """
+        Shorten the stride on fast motion, lengthen it on a still scene
+
+        Returns:
+            bool: False if motion is above the threshold
+        """
+        if motion > self.motion_threshold:
+            self.current_stride = max(1, self.current_stride // 2)
+            return False
+        if motion < self.motion_threshold / 2:
+            self.current_stride = min(self.max_stride, self.current_stride + 1)
+        return True
+
 
 # ==================== TESTING ====================
 
@@ -0,0 +1,206 @@
+"""
+Embedding Cache Module
+Cache kết quả detect + embedding của ảnh dataset theo nội dung file
+
+Entries are keyed by the SHA-1 of the image file. The whole cache is tagged
+with a model fingerprint (ONNX file hashes plus the settings that change the
+face crop); opening it with a different fingerprint starts from empty, so a
+new model never reuses stale embeddings. Least recently used entries are
+evicted when the cache grows past max_entries.
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import config
+
+
+def file_sha1(path: str) -> str:
+    """Content hash of a file (read in 64 KiB chunks)"""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def model_fingerprint(model_paths: List[str], settings: dict) -> str:
+    """
+    Identify the models + preprocessing that produced cached entries
+
+    Args:
+        model_paths: ONNX files involved (missing files hash as empty)
+        settings: Extra JSON-serializable settings (alignment, detection size...)
+    """
+    digest = hashlib.sha1()
+    for path in model_paths:
+        digest.update(file_sha1(path).encode() if os.path.exists(path) else b"-")
+    digest.update(json.dumps(settings, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """
+    On-disk cache of per-image face analysis
+
+    Each entry is a dict:
+        bbox: (x, y, w, h) of the largest face, None if no face was found
+        mean / std: Pixel statistics of the face crop (quality filter input)
+        embedding: L2-normalized embedding, None if extraction failed
+
+    Attributes:
+        path: .npz file
+        max_entries: Entries kept after LRU eviction
+        fingerprint: Model fingerprint of the loaded entries
+        hits / misses: Lookup counters
+    """
+
+    def __init__(self, path: str = None, max_entries: int = None):
+        self.path = path or config.SFACE_CACHE_PATH
+        self.max_entries = max_entries or config.SFACE_CACHE_MAX_ENTRIES
+        self.fingerprint = ""
+        self.entries: Dict[str, dict] = {}
+        self.last_used: Dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _log(self, msg: str) -> None:
+        """Internal logging helper"""
+        print(f"[EmbeddingCache] {msg}")
+
+    def open(self, fingerprint: str) -> None:
+        """
+        Load entries produced by the given model fingerprint
+
+        A cache written by another model (or a corrupt file) is discarded.
+        """
+        self.fingerprint = fingerprint
+        self.entries, self.last_used = {}, {}
+        if not os.path.exists(self.path):
+            return
+
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                if str(data["fingerprint"]) != fingerprint:
+                    self._log("Model changed, cache invalidated")
+                    return
+
+                for i, key in enumerate(data["keys"]):
+                    has_face = bool(data["has_face"][i])
+                    self.entries[str(key)] = {
+                        "bbox": tuple(int(v) for v in data["bboxes"][i]) if has_face else None,
+                        "mean": float(data["means"][i]),
+                        "std": float(data["stds"][i]),
+                        "embedding": (
+                            data["embeddings"][i].copy()
+                            if data["has_embedding"][i]
+                            else None
+                        ),
+                    }
+                    self.last_used[str(key)] = float(data["last_used"][i])
+        except Exception as e:
+            self._log(f"ERROR loading cache: {e}")
+            self.entries, self.last_used = {}, {}
+            return
+
+        if config.DEBUG:
+            self._log(f"[OK] Loaded {len(self.entries)} entries")
+
+    def get(self, key: str) -> Optional[dict]:
+        """Entry for an image hash (None on miss)"""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.last_used[key] = time.time()
+        return entry
+
+    def put(self, key: str, entry: dict) -> None:
+        """Store the analysis of an image"""
+        self.entries[key] = entry
+        self.last_used[key] = time.time()
+
+    def evict(self) -> int:
+        """Drop least recently used entries beyond max_entries"""
+        excess = len(self.entries) - self.max_entries
+        if excess <= 0:
+            return 0
+        for key in sorted(self.last_used, key=self.last_used.get)[:excess]:
+            del self.entries[key]
+            del self.last_used[key]
+        return excess
+
+    def save(self) -> bool:
+        """Evict, then write the cache atomically"""
+        evicted = self.evict()
+        keys = list(self.entries)
+        n = len(keys)
+
+        bboxes = np.zeros((n, 4), dtype=np.int32)
+        embeddings = np.zeros((n, config.SFACE_EMBEDDING_SIZE), dtype=np.float32)
+        has_face = np.zeros(n, dtype=bool)
+        has_embedding = np.zeros(n, dtype=bool)
+        for i, key in enumerate(keys):
+            entry = self.entries[key]
+            if entry["bbox"] is not None:
+                bboxes[i] = entry["bbox"]
+                has_face[i] = True
+            if entry["embedding"] is not None:
+                embeddings[i] = np.asarray(entry["embedding"]).reshape(-1)
+                has_embedding[i] = True
+
+        try:
+            tmp_path = self.path + ".tmp.npz"
+            np.savez(
+                tmp_path,
+                fingerprint=np.array(self.fingerprint),
+                keys=np.array(keys, dtype="U40"),
+                bboxes=bboxes,
+                means=np.array([self.entries[k]["mean"] for k in keys], dtype=np.float32),
+                stds=np.array([self.entries[k]["std"] for k in keys], dtype=np.float32),
+                embeddings=embeddings,
+                has_face=has_face,
+                has_embedding=has_embedding,
+                last_used=np.array([self.last_used[k] for k in keys], dtype=np.float64),
+            )
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            self._log(f"ERROR saving cache: {e}")
+            return False
+
+        if config.DEBUG:
+            self._log(f"Saved {n} entries ({evicted} evicted)")
+        return True
+
+
+# ==================== TESTING ====================
+
+if __name__ == "__main__":
+    import tempfile
+
+    print("Testing Embedding Cache...")
+    print("=" * 50)
+
+    path = os.path.join(tempfile.mkdtemp(), "cache.npz")
+    cache = EmbeddingCache(path, max_entries=2)
+    cache.open("model-a")
+    for i in range(3):
+        cache.put(f"img{i}", {
+            "bbox": (0, 0, 10, 10), "mean": 100.0, "std": 50.0,
+            "embedding": np.ones(config.SFACE_EMBEDDING_SIZE, np.float32),
+        })
+        time.sleep(0.01)
+    cache.save()
+
+    cache.open("model-a")
+    print(f"Entries after eviction: {sorted(cache.entries)}")
+    cache.open("model-b")
+    print(f"Entries with another model: {len(cache)}")
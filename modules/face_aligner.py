@@ -0,0 +1,161 @@
+"""
+Face Alignment Module
+Căn chỉnh khuôn mặt theo 5 landmarks của YuNet về ảnh chuẩn 112x112 cho SFace
+"""
+
+import cv2
+import numpy as np
+from typing import List
+import config
+
+
+# Canonical 5-point template for 112x112 SFace/ArcFace input
+# (right eye, left eye, nose tip, right mouth corner, left mouth corner),
+# same order as YuNet landmarks
+REFERENCE_LANDMARKS = np.array(
+    [
+        [38.2946, 51.6963],
+        [73.5318, 51.5014],
+        [56.0252, 71.7366],
+        [41.5493, 92.3655],
+        [70.7299, 92.2041],
+    ],
+    dtype=np.float64,
+)
+
+
+class FaceAligner:
+    """
+    Warps faces straight from the full frame into reusable 112x112 buffers
+
+    One similarity transform (rotation + uniform scale + translation) is
+    estimated per face from its 5 landmarks; cv2.warpAffine then writes
+    directly into a preallocated buffer, so no intermediate crop is made.
+
+    Attributes:
+        size: Output side length (112 for SFace)
+        buffers: Output buffers, reused by every align_batch() call
+    """
+
+    def __init__(self, size: int = 112):
+        self.size = size
+        self.reference = REFERENCE_LANDMARKS * (size / 112.0)
+        self.buffers: List[np.ndarray] = []
+
+    @staticmethod
+    def similarity_transform(src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+        """
+        Least-squares similarity transform src -> dst (Umeyama)
+
+        Args:
+            src: (K, 2) source points
+            dst: (K, 2) destination points
+
+        Returns:
+            (2, 3) affine matrix for cv2.warpAffine
+        """
+        src = np.asarray(src, dtype=np.float64)
+        dst = np.asarray(dst, dtype=np.float64)
+
+        src_mean = src.mean(axis=0)
+        dst_mean = dst.mean(axis=0)
+        src_c = src - src_mean
+        dst_c = dst - dst_mean
+
+        cov = dst_c.T @ src_c / len(src)
+        u, s, vt = np.linalg.svd(cov)
+        d = np.ones(2)
+        if np.linalg.det(u) * np.linalg.det(vt) < 0:
+            d[1] = -1.0
+
+        rotation = u @ np.diag(d) @ vt
+        var_src = (src_c**2).sum() / len(src)
+        scale = (s * d).sum() / var_src if var_src > 0 else 1.0
+        translation = dst_mean - scale * rotation @ src_mean
+
+        matrix = np.empty((2, 3), dtype=np.float64)
+        matrix[:, :2] = scale * rotation
+        matrix[:, 2] = translation
+        return matrix
+
+    def _buffer(self, i: int, channels: int) -> np.ndarray:
+        """Get (or allocate once) output buffer number i"""
+        while len(self.buffers) <= i:
+            self.buffers.append(np.empty((self.size, self.size, channels), np.uint8))
+        if self.buffers[i].shape[2] != channels:
+            self.buffers[i] = np.empty((self.size, self.size, channels), np.uint8)
+        return self.buffers[i]
+
+    def align(
+        self, frame: np.ndarray, landmarks: np.ndarray, out: np.ndarray = None
+    ) -> np.ndarray:
+        """
+        Align one face
+
+        Args:
+            frame: Full frame (BGR)
+            landmarks: (5, 2) YuNet landmarks in frame coordinates
+            out: Optional (size, size, 3) uint8 destination buffer
+
+        Returns:
+            Aligned face (the out buffer if given)
+        """
+        if out is None:
+            out = np.empty((self.size, self.size, frame.shape[2]), np.uint8)
+        matrix = self.similarity_transform(
+            np.asarray(landmarks).reshape(5, 2), self.reference
+        )
+        cv2.warpAffine(
+            frame,
+            matrix,
+            (self.size, self.size),
+            dst=out,
+            flags=cv2.INTER_LINEAR,
+            borderMode=cv2.BORDER_CONSTANT,
+        )
+        return out
+
+    def align_batch(
+        self, frame: np.ndarray, landmarks_list: List[np.ndarray]
+    ) -> List[np.ndarray]:
+        """
+        Align several faces of the same frame into the reusable buffers
+
+        The returned arrays are overwritten by the next call; copy them if
+        they must outlive the current frame.
+        """
+        channels = frame.shape[2]
+        return [
+            self.align(frame, landmarks, out=self._buffer(i, channels))
+            for i, landmarks in enumerate(landmarks_list)
+        ]
+
+
+# ==================== TESTING ====================
+
+if __name__ == "__main__":
+    print("Testing Face Aligner...")
+    print("=" * 50)
+
+    from modules.detector_yunet import YuNetDetector
+
+    detector = YuNetDetector()
+    aligner = FaceAligner()
+
+    cap = cv2.VideoCapture(config.CAMERA_ID)
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+
+        faces = detector.detect_with_landmarks(frame)
+        aligned = aligner.align_batch(frame, [f["landmarks"] for f in faces])
+        for i, face in enumerate(aligned):
+            cv2.imshow(f"Aligned {i}", face)
+
+        cv2.imshow("Frame", frame)
+        if cv2.waitKey(1) & 0xFF == ord("q"):
+            break
+
+    cap.release()
+    cv2.destroyAllWindows()
@@ -0,0 +1,150 @@
+"""
+Frame Pacer Module
+Điều tiết tốc độ vòng lặp theo FPS mục tiêu, giảm FPS khi không có người
+
+wait() is called once per iteration. It measures how long the iteration
+took and sleeps only for what is left of the frame budget (1 / fps), so a
+slow frame is never followed by an extra fixed delay. Deadlines advance
+from the previous one, and a loop that falls behind restarts from "now"
+instead of bursting to catch up. After idle_after seconds without faces
+the pacer drops to idle_fps until activity is reported again.
+"""
+
+import time
+
+import config
+
+
+class FramePacer:
+    """
+    Deadline-based loop pacing with a low-power idle rate
+
+    Attributes:
+        target_fps: Active rate (0 = unlimited)
+        idle_fps: Rate after idle_after seconds without activity (0 = no idle mode)
+        idle_after: Seconds without activity before going idle
+    """
+
+    def __init__(self, target_fps: float = None, idle_fps: float = None, idle_after: float = None):
+        self.target_fps = config.PROCESSING_FPS if target_fps is None else target_fps
+        self.idle_fps = config.IDLE_FPS if idle_fps is None else idle_fps
+        self.idle_after = config.IDLE_AFTER if idle_after is None else idle_after
+
+        self._deadline = None
+        self._work_start = None
+        self._last_activity = time.monotonic()
+
+        # Statistics
+        self.frames = 0
+        self.overruns = 0
+        self.work_time = 0.0
+        self.sleep_time = 0.0
+
+    @property
+    def idle(self) -> bool:
+        return bool(self.idle_fps) and time.monotonic() - self._last_activity >= self.idle_after
+
+    @property
+    def fps(self) -> float:
+        """Rate currently aimed at"""
+        return self.idle_fps if self.idle else self.target_fps
+
+    def mark_activity(self, active: bool = True) -> None:
+        """Report whether the last frame had something to process (e.g. faces)"""
+        if active:
+            self._last_activity = time.monotonic()
+
+    def reset(self) -> None:
+        """Forget the schedule (e.g. when the loop restarts)"""
+        self._deadline = None
+        self._work_start = None
+        self._last_activity = time.monotonic()
+
+    def wait(self) -> float:
+        """
+        Sleep for the rest of the current frame budget
+
+        Returns:
+            float: Seconds slept
+        """
+        now = time.monotonic()
+        if self._work_start is not None:
+            self.work_time += now - self._work_start
+            self.frames += 1
+
+        fps = self.fps
+        slept = 0.0
+        if fps > 0:
+            interval = 1.0 / fps
+            if self._deadline is None:
+                self._deadline = now
+            self._deadline += interval
+            slept = self._deadline - now
+            if slept > interval:
+                # Rate just dropped (went idle) or clock jumped: restart the schedule
+                self._deadline = now + interval
+                slept = interval
+            if slept > 0:
+                time.sleep(slept)
+            else:
+                self.overruns += 1
+                self._deadline = now  # Behind schedule: do not burst
+                slept = 0.0
+        self.sleep_time += slept
+
+        self._work_start = time.monotonic()
+        return slept
+
+    def due(self) -> bool:
+        """
+        Non-blocking variant: True if a frame is due now (and consume it)
+
+        Used to thin out a faster loop, e.g. GUI updates from processing.
+        """
+        fps = self.fps
+        now = time.monotonic()
+        if fps <= 0:
+            return True
+        if self._deadline is not None and now < self._deadline:
+            return False
+        interval = 1.0 / fps
+        # Next slot one interval later, without accumulating lag
+        if self._deadline is None or now - self._deadline > interval:
+            self._deadline = now + interval
+        else:
+            self._deadline += interval
+        self.frames += 1
+        return True
+
+    def get_stats(self) -> dict:
+        n = self.frames
+        return {
+            "fps": self.fps,
+            "idle": self.idle,
+            "frames": n,
+            "overruns": self.overruns,
+            "avg_work_ms": self.work_time * 1000 / n if n else 0.0,
+            "avg_sleep_ms": self.sleep_time * 1000 / n if n else 0.0,
+        }
+
+
+# ==================== TESTING ====================
+
+if __name__ == "__main__":
+    print("Testing Frame Pacer...")
+    print("=" * 50)
+
+    for work_ms in (5, 20, 50):
+        pacer = FramePacer(target_fps=30, idle_fps=0)
+        start = time.monotonic()
+        while time.monotonic() - start < 1.0:
+            pacer.wait()
+            time.sleep(work_ms / 1000)
+        print(f"work {work_ms} ms: {pacer.frames} frames/s "
+              f"(fixed 20 ms sleep would give {int(1000 / (work_ms + 20))}), {pacer.get_stats()}")
+
+    pacer = FramePacer(target_fps=30, idle_fps=5, idle_after=0.5)
+    start = time.monotonic()
+    while time.monotonic() - start < 1.5:
+        pacer.wait()
+    print(f"Idle after 0.5 s: {pacer.frames} frames in 1.5 s, {pacer.get_stats()}")
@@ -0,0 +1,215 @@
+"""
+Frame Renderer Module
+Vẽ kết quả nhận diện lên buffer dùng lại, snapshot chỉ copy khi được yêu cầu
+
+The raw camera frame is never drawn on: it is kept by reference and only
+copied when snapshot() / face_snapshot() is called. Boxes and labels are
+drawn onto a small ring of preallocated display buffers (a consumer such
+as MJPEGStreamer or the GUI generator may still be using the previous
+one; the RGB outputs have one buffer per ring slot too). Text is rendered
+once per string into a cached mask and blitted afterwards, and RGB
+conversions write into reused buffers, so a steady-state frame allocates
+no new image arrays.
+"""
+
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+import config
+
+
+class FrameRenderer:
+    """
+    Reused-buffer drawing for the live recognition view
+
+    Attributes:
+        ring_size: Display buffers cycled through (>= 2 when frames are
+            handed to another thread)
+        text_cache_size: Rendered text masks kept (LRU)
+    """
+
+    def __init__(self, ring_size: int = 3, text_cache_size: int = 64):
+        self.ring_size = ring_size
+        self.text_cache_size = text_cache_size
+
+        self._ring: List[np.ndarray] = []
+        self._ring_index = 0
+        self._rgb: List[np.ndarray] = []
+        self._face_rgb: List[np.ndarray] = []
+        self._text_cache: "OrderedDict[str, Tuple[np.ndarray, int, int]]" = OrderedDict()
+
+        self._raw: Optional[np.ndarray] = None
+        self._face_bbox: Optional[Tuple[int, int, int, int]] = None
+
+        # Statistics
+        self.text_hits = 0
+        self.text_misses = 0
+
+    # ==================== FRAME LIFECYCLE ====================
+
+    def begin(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Start a new frame
+
+        Args:
+            frame: Raw BGR camera frame (kept by reference, not modified)
+
+        Returns:
+            np.ndarray: Display buffer holding a copy of the frame to draw on
+        """
+        self._raw = frame
+        self._face_bbox = None
+
+        if len(self._ring) < self.ring_size or self._ring[0].shape != frame.shape:
+            # First frame or resolution change: (re)allocate once
+            self._ring = [np.empty_like(frame) for _ in range(self.ring_size)]
+            self._rgb = [np.empty_like(frame) for _ in range(self.ring_size)]
+            self._face_rgb = [np.empty_like(frame) for _ in range(self.ring_size)]
+
+        self._ring_index = (self._ring_index + 1) % self.ring_size
+        display = self._ring[self._ring_index]
+        np.copyto(display, frame)
+        return display
+
+    def set_face(self, bbox: Optional[Tuple[int, int, int, int]]) -> None:
+        """Remember the primary face of the frame for face_snapshot()"""
+        self._face_bbox = bbox
+
+    # ==================== LAZY SNAPSHOTS ====================
+
+    def snapshot(self) -> Optional[np.ndarray]:
+        """Copy of the latest raw frame (made only when called)"""
+        return None if self._raw is None else self._raw.copy()
+
+    def face_snapshot(self) -> Optional[np.ndarray]:
+        """Copy of the primary face crop of the latest raw frame"""
+        if self._raw is None or self._face_bbox is None:
+            return None
+        roi = self._crop(self._raw, self._face_bbox)
+        return roi.copy() if roi.size else None
+
+    # ==================== RGB OUTPUT ====================
+
+    def rgb(self, display: np.ndarray) -> np.ndarray:
+        """BGR display buffer -> RGB, written into a reused buffer"""
+        out = self._rgb[self._ring_index]
+        cv2.cvtColor(display, cv2.COLOR_BGR2RGB, dst=out)
+        return out
+
+    def face_rgb(self, bbox: Tuple[int, int, int, int]) -> Optional[np.ndarray]:
+        """
+        RGB crop of a face from the raw frame (view into a reused buffer)
+
+        Like the display buffer, it is reused ring_size frames later.
+        """
+        roi = self._crop(self._raw, bbox)
+        if roi.size == 0:
+            return None
+        h, w = roi.shape[:2]
+        out = self._face_rgb[self._ring_index][:h, :w]
+        cv2.cvtColor(roi, cv2.COLOR_BGR2RGB, dst=out)
+        return out
+
+    @staticmethod
+    def _crop(frame: np.ndarray, bbox: Tuple[int, int, int, int]) -> np.ndarray:
+        x, y, w, h = bbox
+        x0, y0 = max(0, x), max(0, y)
+        return frame[y0 : max(y0, y + h), x0 : max(x0, x + w)]
+
+    # ==================== OVERLAYS ====================
+
+    def draw_face(
+        self,
+        display: np.ndarray,
+        bbox: Tuple[int, int, int, int],
+        label: str,
+        color: Tuple[int, int, int],
+    ) -> None:
+        """Bounding box + cached label above it"""
+        x, y, w, h = bbox
+        cv2.rectangle(display, (x, y), (x + w, y + h), color, config.BBOX_THICKNESS)
+        self.draw_text(display, label, (x, y - 10), color)
+
+    def draw_text(
+        self,
+        display: np.ndarray,
+        text: str,
+        org: Tuple[int, int],
+        color: Tuple[int, int, int] = None,
+    ) -> None:
+        """
+        Same result as cv2.putText(display, text, org, ...) with the config
+        font, but the glyphs are rasterized once per string
+        """
+        color = config.COLOR_TEXT if color is None else color
+        mask, left, top = self._text_mask(text)
+
+        # Clip the cached mask against the frame borders
+        x0, y0 = org[0] - left, org[1] - top
+        mh, mw = mask.shape[:2]
+        fx0, fy0 = max(0, x0), max(0, y0)
+        fx1 = min(display.shape[1], x0 + mw)
+        fy1 = min(display.shape[0], y0 + mh)
+        if fx0 >= fx1 or fy0 >= fy1:
+            return
+
+        np.copyto(
+            display[fy0:fy1, fx0:fx1],
+            np.array(color, dtype=display.dtype),
+            where=mask[fy0 - y0 : fy1 - y0, fx0 - x0 : fx1 - x0],
+        )
+
+    def _text_mask(self, text: str) -> Tuple[np.ndarray, int, int]:
+        """
+        Rasterized text as a boolean (h, w, 1) mask
+
+        Returns:
+            (mask, left, top): offsets from the putText origin to the mask corner
+        """
+        entry = self._text_cache.get(text)
+        if entry is not None:
+            self._text_cache.move_to_end(text)
+            self.text_hits += 1
+            return entry
+
+        self.text_misses += 1
+        (tw, th), baseline = cv2.getTextSize(
+            text, config.FONT_FACE, config.FONT_SCALE, config.FONT_THICKNESS
+        )
+        pad = config.FONT_THICKNESS
+        canvas = np.zeros((th + baseline + 2 * pad, tw + 2 * pad), dtype=np.uint8)
+        cv2.putText(
+            canvas, text, (pad, th + pad),
+            config.FONT_FACE, config.FONT_SCALE, 255, config.FONT_THICKNESS,
+        )
+        entry = (canvas[:, :, None] > 0, pad, th + pad)
+
+        self._text_cache[text] = entry
+        if len(self._text_cache) > self.text_cache_size:
+            self._text_cache.popitem(last=False)
+        return entry
+
+
+# ==================== TESTING ====================
+
+if __name__ == "__main__":
+    print("Testing Frame Renderer...")
+    print("=" * 50)
+
+    frame = np.full((480, 640, 3), 40, np.uint8)
+    renderer = FrameRenderer()
+
+    display = renderer.begin(frame)
+    renderer.draw_text(display, "FPS: 30", (10, 60))
+    expected = frame.copy()
+    cv2.putText(expected, "FPS: 30", (10, 60), config.FONT_FACE, config.FONT_SCALE,
+                config.COLOR_TEXT, config.FONT_THICKNESS)
+    print(f"Cached text identical to putText: {np.array_equal(display, expected)}")
+
+    renderer.draw_face(display, (-20, 5, 100, 100), "Alice (0.91)", config.COLOR_SUCCESS)
+    renderer.set_face((300, 200, 80, 80))
+    print(f"Raw frame untouched: {bool((frame == 40).all())}")
+    print(f"Face snapshot: {renderer.face_snapshot().shape}, "
+          f"RGB crop: {renderer.face_rgb((300, 200, 80, 80)).shape}")
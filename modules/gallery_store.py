@@ -0,0 +1,562 @@
+"""
+Gallery Store Module
+Lưu gallery embeddings dạng nhị phân, đọc bằng memory-map (không pickle)
+
+Layout of the gallery directory (generation g, files of generation 0 have
+no ".g" suffix):
+    header.json       format version, generation, revision, dim,
+                      row/tombstone counts, model, alignment flag
+    vectors.g.f32     (count, dim) float32 matrix, row-major, append-only
+                      (vectors.g.f16 / vectors.g.i8 + scales.g.f32 for
+                      quantized galleries, see quantization.py)
+    ids.g.u32         (count,) uint32 row -> name id, append-only
+    tombstones.g.u32  stored indices of deleted rows, append-only
+    names.g.json      name table, indexed by id (only grows)
+
+Loading maps the vectors read-only with np.memmap, so startup cost does not
+depend on the gallery size and no arbitrary code is executed.
+
+Every write ends with an atomic rename of header.json (the commit point).
+Enrolling appends rows and deleting appends tombstones, so both write only
+the delta; bytes past the counts in the header belong to an uncommitted
+(or crashed) write, are invisible to readers and are truncated by the next
+write. Compaction rewrites live rows into generation g + 1 in a background
+thread; readers still mapping generation g keep a valid (unlinked) file,
+and a reader that had not opened its files yet retries with the new header.
+
+The revision counts commits that change the live rows (write and update;
+compaction keeps it, since live positions do not move). update() can be
+given the revision its row positions were read at and refuses to apply
+them to a gallery that changed since.
+"""
+
+import json
+import os
+import pickle
+import threading
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+import config
+from .quantization import QuantizedMatrix, quantize_gallery
+
+
+FORMAT_VERSION = 2
+
+# Vector file of each gallery dtype (int8 rows also need scales.f32)
+VECTOR_FILES = {"float32": "vectors.f32", "float16": "vectors.f16", "int8": "vectors.i8"}
+DATA_FILES = tuple(VECTOR_FILES.values()) + (
+    "scales.f32", "ids.u32", "tombstones.u32", "names.json"
+)
+
+# Serializes writers of this process (appends, tombstones, compaction)
+_write_lock = threading.Lock()
+
+# Attempts of read() racing a compaction that removes the generation it read
+READ_RETRIES = 3
+
+
+class GalleryStore:
+    """
+    Columnar on-disk gallery (memory-mapped float32 matrix + name table)
+
+    Row positions in the API (update(remove=...)) refer to live rows in
+    the order returned by read(), at the revision read() returned in
+    header["revision"].
+
+    Attributes:
+        directory: Gallery directory
+        header: Header of the last read/written gallery
+    """
+
+    HEADER = "header.json"
+
+    def __init__(self, directory: str = None):
+        self.directory = directory or config.SFACE_GALLERY_DIR
+        self.header: dict = {}
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _file(self, kind: str, generation: int) -> str:
+        """Path of a data file ('vectors.f32', 'ids.u32', ...) of a generation"""
+        if generation == 0:
+            return self._path(kind)
+        base, ext = kind.split(".")
+        return self._path(f"{base}.{generation}.{ext}")
+
+    def _log(self, msg: str) -> None:
+        """Internal logging helper"""
+        print(f"[GalleryStore] {msg}")
+
+    def exists(self) -> bool:
+        return os.path.exists(self._path(self.HEADER))
+
+    # ==================== LOW-LEVEL I/O ====================
+
+    @staticmethod
+    def _write_atomic(path: str, data: Union[bytes, memoryview]) -> None:
+        """Write to a temporary file, fsync, then rename over path"""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _append(path: str, committed_bytes: int, data: Union[bytes, memoryview]) -> None:
+        """
+        Append after the committed prefix of a file, dropping any leftover
+        bytes of an uncommitted write first
+        """
+        with open(path, "ab") as f:
+            f.truncate(committed_bytes)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _read_header(self) -> dict:
+        with open(self._path(self.HEADER), "r", encoding="utf-8") as f:
+            header = json.load(f)
+
+        if header.get("version") not in (1, FORMAT_VERSION):
+            raise ValueError(f"Unsupported gallery format: {header.get('version')}")
+        if header.get("dtype", "float32") not in VECTOR_FILES:
+            raise ValueError(f"Unsupported gallery dtype: {header['dtype']}")
+        if header["dim"] != config.SFACE_EMBEDDING_SIZE:
+            raise ValueError(
+                f"Gallery dimension {header['dim']} != "
+                f"SFACE_EMBEDDING_SIZE {config.SFACE_EMBEDDING_SIZE}"
+            )
+        # Version 1 = generation 0 without tombstones
+        header.setdefault("generation", 0)
+        header.setdefault("revision", 0)
+        header.setdefault("tombstones", 0)
+        header.setdefault("dtype", "float32")
+        header["version"] = FORMAT_VERSION
+        return header
+
+    def _commit(self, header: dict) -> None:
+        """Publish a new header (atomic rename)"""
+        self._write_atomic(
+            self._path(self.HEADER), json.dumps(header, indent=2).encode("utf-8")
+        )
+        self.header = header
+
+    def _read_names(self, generation: int) -> List[str]:
+        path = self._file("names.json", generation)
+        if not os.path.exists(path):
+            return []
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _live_mask(self, header: dict) -> np.ndarray:
+        """Boolean mask of non-deleted stored rows"""
+        mask = np.ones(header["count"], dtype=bool)
+        if header["tombstones"]:
+            tombstones = np.fromfile(
+                self._file("tombstones.u32", header["generation"]),
+                dtype=np.uint32,
+                count=header["tombstones"],
+            )
+            mask[tombstones] = False
+        return mask
+
+    @staticmethod
+    def _encode_names(
+        names: List[str], table: List[str]
+    ) -> Tuple[np.ndarray, List[str]]:
+        """Name ids for names, extending (a copy of) the name table"""
+        table = list(table)
+        lookup = {name: i for i, name in enumerate(table)}
+        ids = np.empty(len(names), dtype=np.uint32)
+        for i, name in enumerate(names):
+            if name not in lookup:
+                lookup[name] = len(table)
+                table.append(name)
+            ids[i] = lookup[name]
+        return ids, table
+
+    @staticmethod
+    def _as_matrix(
+        names: List[str], embeddings, dtype: str
+    ) -> Union[np.ndarray, QuantizedMatrix]:
+        """Rows in the stored representation of the given dtype"""
+        if not len(names):
+            # reshape(0, -1) is ambiguous for an empty array
+            embeddings = np.empty((0, config.SFACE_EMBEDDING_SIZE), dtype=np.float32)
+        elif not isinstance(embeddings, QuantizedMatrix):
+            embeddings = np.ascontiguousarray(
+                np.asarray(embeddings, dtype=np.float32).reshape(len(names), -1)
+            )
+        return quantize_gallery(embeddings, dtype)
+
+    @staticmethod
+    def _vector_parts(matrix: Union[np.ndarray, QuantizedMatrix]) -> List[Tuple[str, np.ndarray]]:
+        """(file kind, array) pairs holding the rows of a gallery"""
+        if not isinstance(matrix, QuantizedMatrix):
+            return [(VECTOR_FILES["float32"], matrix)]
+        parts = [(VECTOR_FILES[matrix.dtype], np.ascontiguousarray(matrix.data))]
+        if matrix.scales is not None:
+            parts.append(("scales.f32", np.ascontiguousarray(matrix.scales)))
+        return parts
+
+    # ==================== WRITE ====================
+
+    def _write_generation(
+        self,
+        generation: int,
+        revision: int,
+        names: List[str],
+        matrix: np.ndarray,
+        aligned: bool,
+    ) -> dict:
+        """
+        Write a complete new generation and commit it
+
+        aligned: Whether the rows were embedded from landmark-aligned crops
+        """
+        ids, table = self._encode_names(names, [])
+
+        os.makedirs(self.directory, exist_ok=True)
+        for kind, array in self._vector_parts(matrix):
+            self._write_atomic(self._file(kind, generation), array.tobytes())
+        self._write_atomic(self._file("ids.u32", generation), ids.tobytes())
+        self._write_atomic(self._file("tombstones.u32", generation), b"")
+        self._write_atomic(
+            self._file("names.json", generation),
+            json.dumps(table, ensure_ascii=False).encode("utf-8"),
+        )
+
+        header = {
+            "version": FORMAT_VERSION,
+            "generation": generation,
+            "revision": revision,
+            "dim": int(matrix.shape[1]),
+            "count": int(matrix.shape[0]),
+            "tombstones": 0,
+            "dtype": matrix.dtype if isinstance(matrix, QuantizedMatrix) else "float32",
+            "model": os.path.basename(config.SFACE_MODEL_PATH),
+            "aligned": bool(aligned),
+        }
+        self._commit(header)
+        self._remove_stale_generations(generation)
+        return header
+
+    def _remove_stale_generations(self, generation: int) -> None:
+        """Delete data files of other generations (and leftover temp files)"""
+        keep = {os.path.basename(self._file(kind, generation)) for kind in DATA_FILES}
+        keep.add(self.HEADER)
+        for name in os.listdir(self.directory):
+            if name not in keep:
+                try:
+                    os.remove(self._path(name))
+                except OSError:
+                    pass
+
+    def write(self, names: List[str], embeddings: np.ndarray, aligned: bool = None) -> bool:
+        """
+        Replace the stored gallery (new generation, SFACE_GALLERY_DTYPE)
+
+        Args:
+            names: Name of each row
+            embeddings: (N, D) matrix, list of D-vectors or QuantizedMatrix
+            aligned: Rows come from aligned crops (default SFACE_ALIGN_FACES,
+                     i.e. embedded by the current training code)
+
+        Returns:
+            bool: True if saved
+        """
+        matrix = self._as_matrix(names, embeddings, config.SFACE_GALLERY_DTYPE)
+        if aligned is None:
+            aligned = config.SFACE_ALIGN_FACES
+        try:
+            with _write_lock:
+                previous = self._read_header() if self.exists() else None
+                if previous is None:
+                    generation, revision = 0, 1
+                else:
+                    generation = previous["generation"] + 1
+                    revision = previous["revision"] + 1
+                self._write_generation(generation, revision, list(names), matrix, aligned)
+        except Exception as e:
+            self._log(f"ERROR writing gallery: {e}")
+            return False
+        return True
+
+    def update(
+        self,
+        remove: Optional[np.ndarray] = None,
+        names: Optional[List[str]] = None,
+        embeddings: Optional[np.ndarray] = None,
+        expected_revision: Optional[int] = None,
+    ) -> bool:
+        """
+        Delete and/or append rows, writing only the delta (one commit)
+
+        Appended rows are stored in the dtype of the existing gallery.
+
+        Args:
+            remove: Positions of live rows (read() order) to delete
+            names: Names of appended rows
+            embeddings: Appended rows
+            expected_revision: Revision the positions in remove were read at;
+                               the update is refused if the gallery changed
+                               since (None = no check)
+
+        Returns:
+            bool: True if saved (False on a revision mismatch: read again)
+        """
+        names = list(names or [])
+        remove = np.asarray(remove if remove is not None else [], dtype=np.int64)
+        if not self.exists():
+            if expected_revision is not None:
+                self._log("ERROR: Gallery removed since it was read, update refused")
+                return False
+            return self.write(names, embeddings)
+        if not len(remove) and not names:
+            return True
+
+        try:
+            with _write_lock:
+                header = self._read_header()
+                if (
+                    expected_revision is not None
+                    and header["revision"] != expected_revision
+                ):
+                    self._log(
+                        f"ERROR: Gallery changed since it was read (revision "
+                        f"{header['revision']}, expected {expected_revision}), "
+                        "update refused"
+                    )
+                    return False
+                generation, count = header["generation"], header["count"]
+                matrix = self._as_matrix(names, embeddings, header["dtype"])
+
+                if len(remove):
+                    live = np.flatnonzero(self._live_mask(header))
+                    if remove.min() < 0 or remove.max() >= len(live):
+                        raise IndexError(
+                            f"row to remove out of range ({len(live)} live rows)"
+                        )
+                    tombstones = live[remove].astype(np.uint32)
+                    self._append(
+                        self._file("tombstones.u32", generation),
+                        header["tombstones"] * 4,
+                        tombstones.tobytes(),
+                    )
+                    header["tombstones"] += len(tombstones)
+
+                if len(names):
+                    table = self._read_names(generation)
+                    ids, new_table = self._encode_names(names, table)
+                    if len(new_table) != len(table):
+                        self._write_atomic(
+                            self._file("names.json", generation),
+                            json.dumps(new_table, ensure_ascii=False).encode("utf-8"),
+                        )
+                    for kind, array in self._vector_parts(matrix):
+                        row_bytes = array.nbytes // len(array)
+                        self._append(
+                            self._file(kind, generation),
+                            count * row_bytes,
+                            array.tobytes(),
+                        )
+                    self._append(self._file("ids.u32", generation), count * 4, ids.tobytes())
+                    header["count"] += len(names)
+
+                header["revision"] += 1
+                self._commit(header)
+        except Exception as e:
+            self._log(f"ERROR updating gallery: {e}")
+            return False
+
+        if self.needs_compaction():
+            self.compact_async()
+        return True
+
+    # ==================== COMPACTION ====================
+
+    def needs_compaction(self) -> bool:
+        """True when tombstoned rows exceed GALLERY_COMPACT_RATIO"""
+        header = self.header
+        return (
+            header.get("tombstones", 0) > 0
+            and header["tombstones"] >= config.GALLERY_COMPACT_RATIO * header["count"]
+        )
+
+    def compact(self) -> bool:
+        """Rewrite live rows into the next generation, dropping tombstones"""
+        try:
+            with _write_lock:
+                header = self._read_header()
+                if header["tombstones"] == 0:
+                    return True
+                names, vectors = self._read_live(header)
+                self._write_generation(
+                    header["generation"] + 1,
+                    header["revision"],
+                    names,
+                    vectors,
+                    header.get("aligned", False),
+                )
+        except Exception as e:
+            self._log(f"ERROR compacting gallery: {e}")
+            return False
+
+        if config.DEBUG:
+            self._log(
+                f"Compacted: {header['count']} -> {len(names)} rows "
+                f"(generation {header['generation'] + 1})"
+            )
+        return True
+
+    def compact_async(self) -> threading.Thread:
+        """
+        Compact in a background thread
+
+        Not a daemon thread: the interpreter waits for it at exit. An
+        interrupted compaction only leaves orphan files; the committed
+        generation stays valid.
+        """
+        thread = threading.Thread(target=self.compact, name="gallery-compaction")
+        thread.start()
+        return thread
+
+    # ==================== READ ====================
+
+    def _read_live(self, header: dict) -> Tuple[List[str], np.ndarray]:
+        generation, count, dim = header["generation"], header["count"], header["dim"]
+        dtype = header["dtype"]
+        if count == 0:
+            return [], quantize_gallery(np.empty((0, dim), dtype=np.float32), dtype)
+
+        vectors = np.memmap(
+            self._file(VECTOR_FILES[dtype], generation),
+            dtype=dtype,
+            mode="r",
+            shape=(count, dim),
+        )
+        if dtype != "float32":
+            scales = None
+            if dtype == "int8":
+                scales = np.fromfile(
+                    self._file("scales.f32", generation), dtype=np.float32, count=count
+                )
+            vectors = QuantizedMatrix(vectors, scales)
+        ids = np.fromfile(self._file("ids.u32", generation), dtype=np.uint32, count=count)
+        # Opened directly: a generation removed meanwhile raises FileNotFoundError
+        with open(self._file("names.json", generation), "r", encoding="utf-8") as f:
+            table = json.load(f)
+
+        if header["tombstones"]:
+            # Copies the live rows; compaction restores the zero-copy path
+            mask = self._live_mask(header)
+            ids = ids[mask]
+            vectors = (
+                vectors.take(mask)
+                if isinstance(vectors, QuantizedMatrix)
+                else np.ascontiguousarray(vectors[mask])
+            )
+        return [table[i] for i in ids], vectors
+
+    def read(self) -> Tuple[List[str], np.ndarray]:
+        """
+        Map the stored gallery
+
+        Returns:
+            (names, read-only (N, D) float32 matrix or QuantizedMatrix);
+            ([], empty) if missing
+        """
+        if not self.exists():
+            return [], np.empty((0, config.SFACE_EMBEDDING_SIZE), dtype=np.float32)
+
+        for attempt in range(READ_RETRIES):
+            header = self._read_header()
+            try:
+                names, vectors = self._read_live(header)
+                break
+            except FileNotFoundError:
+                # A compaction committed the next generation and removed this
+                # one between the header read and the file opens: read again
+                if attempt == READ_RETRIES - 1:
+                    raise
+        if header.get("model") != os.path.basename(config.SFACE_MODEL_PATH):
+            self._log(
+                f"WARNING: Gallery built with {header.get('model')}, "
+                "retrain recommended"
+            )
+        if bool(header.get("aligned", False)) != bool(config.SFACE_ALIGN_FACES):
+            # The recognizer crops live faces in the gallery's mode meanwhile
+            self._log(
+                f"WARNING: Gallery built with{'' if header.get('aligned') else 'out'} "
+                f"face alignment but SFACE_ALIGN_FACES = {config.SFACE_ALIGN_FACES}, "
+                "full retrain recommended"
+            )
+
+        self.header = header
+        return names, vectors
+
+    def migrate_from_pickle(self, pickle_path: str) -> bool:
+        """
+        One-time import of a legacy embeddings.pkl ((names, embeddings) tuple)
+
+        The pickle is left untouched as a backup; once the store exists it
+        is no longer read. Legacy pickles were embedded from bbox crops, so
+        the gallery is marked as not aligned.
+        """
+        try:
+            with open(pickle_path, "rb") as f:
+                names, embeddings = pickle.load(f)
+        except Exception as e:
+            self._log(f"ERROR reading legacy embeddings: {e}")
+            return False
+
+        if not self.write(list(names), embeddings, aligned=False):
+            return False
+
+        self._log(f"[OK] Migrated {len(names)} embeddings from {pickle_path}")
+        return True
+
+
+# ==================== TESTING ====================
+
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    print("Testing Gallery Store...")
+    print("=" * 50)
+
+    store = GalleryStore(tempfile.mkdtemp())
+    rng = np.random.default_rng(0)
+    n = 100000
+    names = [f"user{i // 100}" for i in range(n)]
+    vectors = rng.standard_normal((n, config.SFACE_EMBEDDING_SIZE)).astype(np.float32)
+
+    start = time.perf_counter()
+    store.write(names, vectors)
+    print(f"Write {n} rows: {time.perf_counter() - start:.3f}s")
+
+    start = time.perf_counter()
+    loaded_names, loaded = store.read()
+    print(f"Read (memmap): {time.perf_counter() - start:.3f}s")
+    print(f"Identical: {loaded_names == names and np.array_equal(loaded, vectors)}")
+
+    extra = rng.standard_normal((100, config.SFACE_EMBEDDING_SIZE)).astype(np.float32)
+    start = time.perf_counter()
+    store.update(names=["new_user"] * 100, embeddings=extra)
+    print(f"Append 100 rows: {time.perf_counter() - start:.4f}s")
+
+    start = time.perf_counter()
+    deleted = store.update(remove=np.arange(100))
+    print(f"Delete 100 rows (no append): {deleted}, {time.perf_counter() - start:.4f}s")
+
+    loaded_names, loaded = store.read()
+    print(f"Rows after update: {len(loaded_names)} (expected {n})")
+    print(f"Appended rows intact: {np.array_equal(loaded[-100:], extra)}")
+
+    store.compact()
+    print(f"After compaction: generation {store.header['generation']}, "
+          f"{store.header['count']} rows")
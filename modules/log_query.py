@@ -0,0 +1,319 @@
+"""
+Access Log Query Module
+Truy vấn access log theo khoảng thời gian / trường và thống kê theo ngày
+
+query_logs() streams matching records oldest first. The CSV store skips
+rotated files that end before the time range and stops at the first row
+past its end; the SQLite store turns the filters into an indexed WHERE.
+
+Aggregations (count_by, first_last_per_day) read the daily rollups kept by
+the log writer, so a dashboard never rescans the raw log.
+
+Time ranges compare timestamp strings, which assumes a sortable
+LOG_TIMESTAMP_FORMAT (the default "%Y-%m-%d %H:%M:%S" is).
+"""
+
+import os
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import config
+from .access_log import (
+    catch_up_rollups,
+    connect_rollups,
+    connect_sqlite,
+    csv_records,
+    default_log_path,
+    is_sqlite_path,
+    rollup_path,
+    rotated_log_files,
+    sqlite_record,
+)
+
+
+TimeBound = Union[str, date, datetime, None]
+FieldFilter = Union[str, Iterable[str], None]
+
+ROLLUP_FIELDS = ("day", "hour", "name", "status")
+
+
+def _timestamp(value: TimeBound) -> Optional[str]:
+    """Time bound -> timestamp string in LOG_TIMESTAMP_FORMAT"""
+    if value is None or isinstance(value, str):
+        return value
+    if not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    return value.strftime(config.LOG_TIMESTAMP_FORMAT)
+
+
+def _day(value: TimeBound) -> Optional[str]:
+    """Day bound -> 'YYYY-MM-DD'"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value[:10]
+    return value.strftime("%Y-%m-%d")
+
+
+def _values(value: FieldFilter) -> Optional[set]:
+    """Field filter -> set of accepted values (None = any)"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return {value}
+    return set(value)
+
+
+# ==================== RAW RECORDS ====================
+
+
+def query_logs(
+    log_path: str = None,
+    start: TimeBound = None,
+    end: TimeBound = None,
+    name: FieldFilter = None,
+    status: FieldFilter = None,
+    method: FieldFilter = None,
+    door: FieldFilter = None,
+    min_confidence: float = None,
+) -> Iterator[Dict[str, str]]:
+    """
+    Stream access records matching every given filter, oldest first
+
+    Args:
+        log_path: CSV or SQLite log (default from LOG_BACKEND)
+        start: Inclusive lower time bound (datetime, date or timestamp string)
+        end: Exclusive upper time bound
+        name / status / method / door: One value or a collection of values
+        min_confidence: Minimum confidence score
+
+    Yields:
+        Dict: Record with the LOG_HEADER fields
+    """
+    log_path = log_path or default_log_path()
+    start, end = _timestamp(start), _timestamp(end)
+    filters = {
+        "name": _values(name),
+        "status": _values(status),
+        "method": _values(method),
+        "door": _values(door),
+    }
+
+    if is_sqlite_path(log_path):
+        yield from _query_sqlite(log_path, start, end, filters, min_confidence)
+        return
+
+    filters = {field: accepted for field, accepted in filters.items() if accepted is not None}
+    for record in _query_csv(log_path, start, end):
+        if min_confidence is not None and float(record["confidence"]) < min_confidence:
+            continue
+        if all(record[field] in accepted for field, accepted in filters.items()):
+            yield record
+
+
+def _query_csv(log_path: str, start: Optional[str], end: Optional[str]) -> Iterator[Dict[str, str]]:
+    """Records of the CSV files overlapping [start, end)"""
+    files = rotated_log_files(log_path)
+    if start is not None:
+        # A rotated file is named after its last day: skip files ending before start
+        first_day = start[:10]
+        base = os.path.splitext(os.path.basename(log_path))[0]
+        files = [p for p in files if os.path.basename(p)[len(base) + 1:][:10] >= first_day]
+    if os.path.exists(log_path):
+        files.append(log_path)
+
+    for path in files:
+        with open(path, "r", newline="", encoding="utf-8") as f:
+            for record in csv_records(f):
+                if start is not None and record["timestamp"] < start:
+                    continue
+                if end is not None and record["timestamp"] >= end:
+                    return  # Rows are chronological: nothing later matches
+                yield record
+
+
+def _query_sqlite(
+    log_path: str,
+    start: Optional[str],
+    end: Optional[str],
+    filters: Dict[str, Optional[set]],
+    min_confidence: Optional[float],
+) -> Iterator[Dict[str, str]]:
+    """Records of the SQLite log, filtered in SQL"""
+    if not os.path.exists(log_path):
+        return
+
+    clauses, params = [], []
+    if start is not None:
+        clauses.append("timestamp >= ?")
+        params.append(start)
+    if end is not None:
+        clauses.append("timestamp < ?")
+        params.append(end)
+    if min_confidence is not None:
+        clauses.append("confidence >= ?")
+        params.append(min_confidence)
+    for field, accepted in filters.items():
+        if accepted is not None:
+            clauses.append(f"{field} IN ({', '.join('?' * len(accepted))})")
+            params.extend(sorted(accepted))
+
+    query = "SELECT timestamp, name, method, confidence, status, door FROM access_log"
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+
+    conn = connect_sqlite(log_path)
+    try:
+        cursor = conn.execute(query + " ORDER BY id", params)
+        for rows in iter(lambda: cursor.fetchmany(1000), []):
+            for row in rows:
+                yield sqlite_record(row)
+    finally:
+        conn.close()
+
+
+# ==================== ROLLUPS ====================
+
+
+def read_rollups(
+    log_path: str = None,
+    start_day: TimeBound = None,
+    end_day: TimeBound = None,
+    name: FieldFilter = None,
+    status: FieldFilter = None,
+) -> List[Dict[str, object]]:
+    """
+    Daily rollup buckets, one per (day, hour, name, status)
+
+    Args:
+        log_path: CSV or SQLite log (default from LOG_BACKEND)
+        start_day / end_day: Inclusive day range
+        name / status: One value or a collection of values
+
+    Returns:
+        List[Dict]: day, hour, name, status, count, first, last
+    """
+    log_path = log_path or default_log_path()
+    if is_sqlite_path(log_path):
+        if not os.path.exists(log_path):
+            return []
+        conn = connect_sqlite(log_path)
+    else:
+        if not os.path.exists(log_path) and not rotated_log_files(log_path):
+            return []
+        conn = connect_rollups(rollup_path(log_path))
+        # Count rows the writer has not added yet (other process, crash)
+        catch_up_rollups(conn, log_path)
+
+    clauses, params = [], []
+    if start_day is not None:
+        clauses.append("day >= ?")
+        params.append(_day(start_day))
+    if end_day is not None:
+        clauses.append("day <= ?")
+        params.append(_day(end_day))
+    for field, value in (("name", name), ("status", status)):
+        accepted = _values(value)
+        if accepted is not None:
+            clauses.append(f"{field} IN ({', '.join('?' * len(accepted))})")
+            params.extend(sorted(accepted))
+
+    query = "SELECT day, hour, name, status, count, first, last FROM access_rollup"
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+
+    try:
+        rows = conn.execute(query + " ORDER BY day, hour, name, status", params).fetchall()
+    finally:
+        conn.close()
+
+    keys = ROLLUP_FIELDS + ("count", "first", "last")
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def count_by(
+    fields: Sequence[str] = ("status",),
+    log_path: str = None,
+    start_day: TimeBound = None,
+    end_day: TimeBound = None,
+    name: FieldFilter = None,
+    status: FieldFilter = None,
+) -> Dict[tuple, int]:
+    """
+    Event counts grouped by any of day / hour / name / status
+
+    Example: count_by(("day", "status")) -> {("2024-01-01", "GRANTED"): 42, ...}
+    """
+    for field in fields:
+        if field not in ROLLUP_FIELDS:
+            raise ValueError(f"Cannot group by '{field}', expected one of {ROLLUP_FIELDS}")
+
+    counts: Dict[tuple, int] = {}
+    for bucket in read_rollups(log_path, start_day, end_day, name, status):
+        key = tuple(bucket[field] for field in fields)
+        counts[key] = counts.get(key, 0) + bucket["count"]
+    return counts
+
+
+def first_last_per_day(
+    log_path: str = None,
+    start_day: TimeBound = None,
+    end_day: TimeBound = None,
+    status: FieldFilter = "GRANTED",
+) -> Dict[Tuple[str, str], Tuple[str, str]]:
+    """
+    First and last event of each person on each day
+
+    Returns:
+        Dict: (day, name) -> (first timestamp, last timestamp)
+    """
+    result: Dict[Tuple[str, str], Tuple[str, str]] = {}
+    for bucket in read_rollups(log_path, start_day, end_day, status=status):
+        key = (bucket["day"], bucket["name"])
+        if key in result:
+            first, last = result[key]
+            result[key] = (min(first, bucket["first"]), max(last, bucket["last"]))
+        else:
+            result[key] = (bucket["first"], bucket["last"])
+    return result
+
+
+# ==================== TESTING ====================
+
+if __name__ == "__main__":
+    import tempfile
+    import time
+    from .access_log import close_writer, get_writer
+
+    print("Testing Access Log Query...")
+    print("=" * 50)
+
+    for filename in ("access_log.csv", "access_log.db"):
+        path = os.path.join(tempfile.mkdtemp(), filename)
+        writer = get_writer(path)
+        for i in range(20000):
+            day, hour = 1 + i // 4000, 8 + (i // 400) % 10
+            writer.write([
+                f"2024-01-0{day} {hour:02d}:{i % 60:02d}:00",
+                f"user{i % 7}",
+                "SFACE",
+                "0.90",
+                "DENIED" if i % 5 == 0 else "GRANTED",
+                str(i % 4),
+            ])
+            if i % 5000 == 0:
+                writer.flush(timeout=30.0)
+        close_writer(path)
+
+        start = time.perf_counter()
+        denied = list(query_logs(path, start="2024-01-03", end=date(2024, 1, 5),
+                                 status="DENIED", door="3"))
+        query_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        per_status = count_by(("status",), path)
+        rollup_ms = (time.perf_counter() - start) * 1000
+        presence = first_last_per_day(path, start_day="2024-01-02", end_day="2024-01-02")
+
+        print(f"{filename}: DENIED at door 3 on Jan 3-4: {len(denied)} ({query_ms:.1f} ms)")
+        print(f"  counts {per_status} ({rollup_ms:.1f} ms)")
+        print(f"  user0 on Jan 2: {presence.get(('2024-01-02', 'user0'))}")
@@ -0,0 +1,322 @@
+"""
+MJPEG Streamer Module
+Phát video đã xử lý qua HTTP (multipart JPEG), encode 1 lần cho mọi người xem
+
+The processing loop calls publish() with each annotated BGR frame; this
+only stores a reference. An encoder thread wakes up STREAM_FPS times per
+second, resizes the newest frame to STREAM_WIDTH and encodes it once to
+JPEG. Every viewer of /stream.mjpg is sent the same encoded buffer, so the
+output rate and the encoding cost do not depend on the processing rate or
+on the number of viewers. Nothing is encoded while nobody is watching.
+
+Endpoints:
+    /stream.mjpg    multipart/x-mixed-replace MJPEG stream
+    /snapshot.jpg   single JPEG of the latest frame
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+import config
+
+
+BOUNDARY = b"frame"
+
+
+class MJPEGStreamer:
+    """
+    Shared-encode MJPEG HTTP server
+
+    Attributes:
+        host / port: Address the HTTP server binds to
+        quality: JPEG quality (1-100)
+        width: Output width in pixels (0 = frame size), height keeps the ratio
+        fps: Output frames per second (independent of publish rate)
+    """
+
+    def __init__(
+        self,
+        host: str = None,
+        port: int = None,
+        quality: int = None,
+        width: int = None,
+        fps: float = None,
+    ):
+        self.host = host or config.STREAM_HOST
+        self.port = config.STREAM_PORT if port is None else port
+        self.quality = quality or config.STREAM_JPEG_QUALITY
+        self.width = config.STREAM_WIDTH if width is None else width
+        self.fps = fps or config.STREAM_FPS
+
+        self._cond = threading.Condition()
+        self._frame: Optional[np.ndarray] = None
+        self._frame_seq = 0
+        self._jpeg: Optional[bytes] = None
+        self._jpeg_seq = 0
+        self._jpeg_frame_seq = 0  # Frame the current JPEG was encoded from
+
+        self._running = False
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._threads = []
+
+        # Statistics
+        self.viewers = 0
+        self.frames_published = 0
+        self.frames_encoded = 0
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.encode_time = 0.0
+
+    def _log(self, msg: str) -> None:
+        """Internal logging helper"""
+        print(f"[MJPEGStreamer] {msg}")
+
+    @property
+    def url(self) -> str:
+        """URL a browser uses to open the stream"""
+        return config.STREAM_URL or f"http://localhost:{self.port}/stream.mjpg"
+
+    # ==================== LIFECYCLE ====================
+
+    def start(self) -> bool:
+        """Start the HTTP server and the encoder thread"""
+        if self._running:
+            return True
+
+        handler = type("StreamHandler", (_StreamHandler,), {"streamer": self})
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), handler)
+        except OSError as e:
+            self._log(f"ERROR: Cannot listen on {self.host}:{self.port}: {e}")
+            return False
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]  # Port 0 = any free port
+
+        self._running = True
+        self._threads = [
+            threading.Thread(target=self._server.serve_forever, name="mjpeg-http", daemon=True),
+            threading.Thread(target=self._encode_loop, name="mjpeg-encoder", daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+
+        if config.DEBUG:
+            self._log(f"Streaming on {self.url} ({self.fps} FPS, quality {self.quality})")
+        return True
+
+    def stop(self) -> None:
+        """Stop serving; connected viewers are disconnected"""
+        if not self._running:
+            return
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        self._server.shutdown()
+        self._server.server_close()
+        for t in self._threads:
+            t.join(timeout=2.0)
+        self._threads = []
+
+    def is_running(self) -> bool:
+        return self._running
+
+    # ==================== PRODUCER SIDE ====================
+
+    def publish(self, frame: np.ndarray) -> None:
+        """
+        Offer a new BGR frame (no copy, no encoding here)
+
+        The frame must not be modified after it is published.
+        """
+        with self._cond:
+            self._frame = frame
+            self._frame_seq += 1
+            self.frames_published += 1
+
+    def encode(self, frame: np.ndarray) -> Optional[bytes]:
+        """Resize to the output width and JPEG-encode one frame"""
+        if self.width and frame.shape[1] != self.width:
+            height = max(1, round(frame.shape[0] * self.width / frame.shape[1]))
+            frame = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+        ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        return buf.tobytes() if ok else None
+
+    def _encode_loop(self) -> None:
+        interval = 1.0 / self.fps
+        next_tick = time.monotonic()
+        encoded_seq = 0
+        while self._running:
+            next_tick += interval
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.monotonic()  # Fell behind: do not burst
+
+            with self._cond:
+                frame, seq = self._frame, self._frame_seq
+                if frame is None or seq == encoded_seq or self.viewers == 0:
+                    continue
+
+            start = time.perf_counter()
+            jpeg = self.encode(frame)
+            self.encode_time += time.perf_counter() - start
+            if jpeg is None:
+                continue
+
+            encoded_seq = seq
+            with self._cond:
+                self._jpeg = jpeg
+                self._jpeg_seq += 1
+                self._jpeg_frame_seq = seq
+                self.frames_encoded += 1
+                self._cond.notify_all()
+
+    # ==================== VIEWER SIDE ====================
+
+    def wait_jpeg(self, last_seq: int, timeout: float = 1.0) -> Tuple[int, Optional[bytes]]:
+        """
+        Block until an encoded frame newer than last_seq is available
+
+        Returns:
+            (seq, jpeg): jpeg is None on timeout or shutdown
+        """
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self._jpeg_seq > last_seq or not self._running, timeout
+            )
+            if self._jpeg_seq > last_seq and self._running:
+                return self._jpeg_seq, self._jpeg
+            return last_seq, None
+
+    def snapshot(self) -> Optional[bytes]:
+        """JPEG of the latest published frame"""
+        with self._cond:
+            frame = self._frame
+            if frame is None:
+                return None
+            if self._jpeg_frame_seq == self._frame_seq:
+                return self._jpeg  # Already encoded for the viewers
+        return self.encode(frame)
+
+    def _add_viewer(self, delta: int) -> None:
+        with self._cond:
+            self.viewers += delta
+
+    def get_stats(self) -> dict:
+        return {
+            "viewers": self.viewers,
+            "published": self.frames_published,
+            "encoded": self.frames_encoded,
+            "sent": self.frames_sent,
+            "bytes_sent": self.bytes_sent,
+            "avg_encode_ms": (
+                self.encode_time * 1000 / self.frames_encoded if self.frames_encoded else 0.0
+            ),
+        }
+
+
+class _StreamHandler(BaseHTTPRequestHandler):
+    """HTTP handler; `streamer` is bound by MJPEGStreamer.start()"""
+
+    streamer: MJPEGStreamer = None
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/stream.mjpg":
+            self._send_stream()
+        elif path == "/snapshot.jpg":
+            self._send_snapshot()
+        else:
+            self.send_error(404)
+
+    def _send_snapshot(self) -> None:
+        jpeg = self.streamer.snapshot()
+        if jpeg is None:
+            self.send_error(503, "No frame yet")
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(jpeg)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(jpeg)
+
+    def _send_stream(self) -> None:
+        streamer = self.streamer
+        self.send_response(200)
+        self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY.decode()}")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+
+        streamer._add_viewer(1)
+        seq = 0
+        try:
+            while streamer.is_running():
+                # A slow viewer simply skips to the newest frame
+                seq, jpeg = streamer.wait_jpeg(seq)
+                if jpeg is None:
+                    continue
+                self.wfile.write(
+                    b"--" + BOUNDARY + b"\r\nContent-Type: image/jpeg\r\n"
+                    + f"Content-Length: {len(jpeg)}\r\n\r\n".encode()
+                    + jpeg + b"\r\n"
+                )
+                streamer.frames_sent += 1
+                streamer.bytes_sent += len(jpeg)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Viewer closed the page
+        finally:
+            streamer._add_viewer(-1)
+
+    def log_message(self, format, *args):
+        if config.DEBUG:
+            print(f"[MJPEGStreamer] {self.address_string()} {format % args}")
+
+
+# ==================== TESTING ====================
+
+if __name__ == "__main__":
+    import urllib.request
+
+    print("Testing MJPEG Streamer...")
+    print("=" * 50)
+
+    streamer = MJPEGStreamer(host="127.0.0.1", port=0, fps=20)
+    streamer.start()
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+
+    def producer():
+        for i in range(200):  # ~100 FPS processing
+            f = frame.copy()
+            cv2.putText(f, str(i), (50, 240), 0, 3, (255, 255, 255), 3)
+            streamer.publish(f)
+            time.sleep(0.01)
+
+    def viewer(results, index):
+        url = f"http://127.0.0.1:{streamer.port}/stream.mjpg"
+        data = b""
+        with urllib.request.urlopen(url, timeout=1.0) as r:
+            try:
+                while True:
+                    data += r.read1(65536)
+            except OSError:
+                pass  # No frame for 1 s: producer finished
+        results[index] = data.count(b"--" + BOUNDARY)
+
+    results = [0, 0, 0]
+    threads = [threading.Thread(target=producer)] + [
+        threading.Thread(target=viewer, args=(results, i)) for i in range(3)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    print(f"Stats: {streamer.get_stats()}")
+    print(f"Frames received per viewer: {results}")
+    streamer.stop()
@@ -0,0 +1,245 @@
+"""
+Model Registry Module
+Cấp phát model đã warm-up, dùng lại giữa training, capture, GUI và các worker
+
+Instances are keyed by (model kind, model path, input size) and warmed up
+(one blank inference) when they are created, so the first real frame does
+not pay OpenCV's network setup.
+
+Two scopes:
+    get_detector() / get_recognizer()        process-wide shared instances
+        (the live GUI; the shared recognizer also holds the gallery)
+    thread_detector() / thread_recognizer()  one instance per thread or
+        worker process, for code that runs concurrently (multi-camera
+        workers, training, dataset capture); reused by later calls from
+        the same thread
+
+preload() builds the shared instances in a background thread, so the ONNX
+models and the gallery are read while the GUI is being imported and built.
+Heavy imports happen inside the getters: importing this module is cheap.
+"""
+
+import threading
+from typing import List, Optional, Tuple
+
+import config
+
+
+_lock = threading.Lock()
+_instances = {}
+# One lock per key: loading the recognizer does not block get_database()
+_key_locks = {}
+_local = threading.local()
+_preload_thread: Optional[threading.Thread] = None
+
+
+def _get(key, factory):
+    """Shared instance for key, created by factory() on first use"""
+    with _lock:
+        instance = _instances.get(key)
+        if instance is not None:
+            return instance
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+
+    # Concurrent callers wait for the first one to finish building it
+    with key_lock:
+        instance = _instances.get(key)
+        if instance is None:
+            instance = factory()
+            with _lock:
+                _instances[key] = instance
+        return instance
+
+
+def _get_local(key, factory):
+    """Calling thread's instance for key, created by factory() on first use"""
+    instances = getattr(_local, "instances", None)
+    if instances is None:
+        instances = _local.instances = {}
+    instance = instances.get(key)
+    if instance is None:
+        instance = instances[key] = factory()
+    return instance
+
+
+# ==================== KEYS AND FACTORIES ====================
+
+
+def detector_key(model_path: str = None, frame_size: Tuple[int, int] = None) -> tuple:
+    """Registry key of a YuNet detector warmed up for frame_size (width, height)"""
+    return (
+        "yunet",
+        model_path or config.YUNET_MODEL_PATH,
+        tuple(frame_size or (config.CAMERA_WIDTH, config.CAMERA_HEIGHT)),
+    )
+
+
+def recognizer_key(model_path: str = None) -> tuple:
+    """Registry key of an SFace recognizer (fixed 112x112 input)"""
+    return ("sface", model_path or config.SFACE_MODEL_PATH, (112, 112))
+
+
+def _create_detector(key: tuple):
+    from .detector_yunet import YuNetDetector
+
+    _, model_path, frame_size = key
+    detector = YuNetDetector(model_path)
+    ms = detector.warm_up(frame_size)
+    if config.DEBUG and detector.model is not None:
+        print(f"[ModelRegistry] YuNet warmed up for {frame_size[0]}x{frame_size[1]} in {ms:.1f} ms")
+    return detector
+
+
+def _create_recognizer(key: tuple):
+    from .recognizer_sface import SFaceRecognizer
+
+    recognizer = SFaceRecognizer(model_path=key[1])
+    ms = recognizer.warm_up()
+    if config.DEBUG and recognizer.model is not None:
+        print(f"[ModelRegistry] SFace warmed up in {ms:.1f} ms")
+    return recognizer
+
+
+# ==================== SHARED INSTANCES ====================
+
+
+def get_database():
+    """Shared Database"""
+    from .database import Database
+
+    return _get("database", Database)
+
+
+def get_detector(frame_size: Tuple[int, int] = None, model_path: str = None):
+    """
+    Shared, warmed-up YuNetDetector (ONNX model loaded once)
+
+    Its tracking state belongs to one video stream: concurrent users
+    should call thread_detector() instead.
+    """
+    key = detector_key(model_path, frame_size)
+    return _get(key, lambda: _create_detector(key))
+
+
+def get_recognizer(model_path: str = None):
+    """
+    Shared SFaceRecognizer with the gallery loaded (if a model was trained)
+
+    Returns:
+        SFaceRecognizer: Same instance on every call
+    """
+    key = recognizer_key(model_path)
+
+    def create():
+        recognizer = _create_recognizer(key)
+        if get_database().model_exists("sface"):
+            recognizer.load_embeddings()
+        return recognizer
+
+    return _get(key, create)
+
+
+def registered_users() -> List[str]:
+    """Enrolled user names, read from the shared gallery (no extra unpickling)"""
+    recognizer = get_recognizer()
+    return sorted(set(recognizer.known_names))
+
+
+# ==================== PER-THREAD INSTANCES ====================
+
+
+def thread_detector(frame_size: Tuple[int, int] = None, model_path: str = None):
+    """
+    Warmed-up YuNetDetector owned by the calling thread (or worker process)
+
+    Args:
+        frame_size: (width, height) to warm up for (default camera size)
+        model_path: YuNet ONNX model (default YUNET_MODEL_PATH)
+    """
+    key = detector_key(model_path, frame_size)
+    return _get_local(key, lambda: _create_detector(key))
+
+
+def thread_recognizer(model_path: str = None):
+    """
+    Warmed-up SFaceRecognizer owned by the calling thread, without a gallery
+
+    Workers attach the shared gallery with attach_gallery().
+    """
+    key = recognizer_key(model_path)
+    return _get_local(key, lambda: _create_recognizer(key))
+
+
+# ==================== LIFECYCLE ====================
+
+
+def preload() -> threading.Thread:
+    """
+    Load the detector, the recognizer and the gallery in the background
+
+    Later get_*() calls simply wait for the objects being built.
+
+    Returns:
+        threading.Thread: Loader thread (already started)
+    """
+    global _preload_thread
+
+    def run():
+        from .startup_profiler import profiler
+
+        with profiler.step("load detector"):
+            get_detector()
+        with profiler.step("load recognizer + gallery"):
+            get_recognizer()
+
+    with _lock:
+        if _preload_thread is None:
+            _preload_thread = threading.Thread(target=run, name="model-preload", daemon=True)
+            _preload_thread.start()
+        return _preload_thread
+
+
+def loaded() -> List:
+    """Keys of the shared instances created so far"""
+    with _lock:
+        return list(_instances)
+
+
+def clear() -> None:
+    """Drop every shared instance and the calling thread's own (next calls reload)"""
+    global _preload_thread
+    with _lock:
+        _instances.clear()
+        _preload_thread = None
+    _local.instances = {}
+
+
+# ==================== TESTING ====================
+
+if __name__ == "__main__":
+    import time
+    import numpy as np
+    from .detector_yunet import YuNetDetector
+
+    print("Testing Model Registry...")
+    print("=" * 50)
+
+    frame = np.random.default_rng(0).integers(0, 255, (480, 640, 3), dtype=np.uint8)
+
+    cold = YuNetDetector()
+    start = time.perf_counter()
+    cold.detect_with_landmarks(frame)
+    print(f"First frame, cold detector:     {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    warm = thread_detector((640, 480))
+    start = time.perf_counter()
+    warm.detect_with_landmarks(frame)
+    print(f"First frame, registry detector: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    print(f"Same thread, same instance: {thread_detector((640, 480)) is warm}")
+    other = []
+    t = threading.Thread(target=lambda: other.append(thread_detector((640, 480))))
+    t.start()
+    t.join()
+    print(f"Other thread, own instance: {other[0] is not warm}")
+    print(f"Shared detector is not a thread instance: {get_detector() is not warm}")
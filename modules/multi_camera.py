@@ -0,0 +1,318 @@
+"""
+Multi-Camera Module
+Đọc nhiều camera / video file đồng thời, dùng chung 1 pool worker nhận diện
+
+Each source has a reader thread feeding a bounded queue. A fixed pool of
+inference workers (each with its own cv2.FaceDetectorYN and
+cv2.FaceRecognizerSF instance) pulls frames from whichever camera has
+work; all workers search the same in-memory gallery.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, List, Optional, Union
+
+import numpy as np
+import config
+from .camera import CameraManager
+from .database import Database
+from .detector_yunet import YuNetDetector
+from . import model_registry
+from .recognizer_sface import SFaceRecognizer
+from .tracker import FaceTracker, Track
+
+
+class FrameResult:
+    """
+    Recognition result of one frame
+
+    Attributes:
+        camera_index: Index of the source in MultiCameraManager.sources
+        seq: Frame number within the source
+        frame: BGR frame
+        tracks: Tracks matched in this frame (identity in track.name)
+        latency: Seconds from capture to end of recognition
+    """
+
+    def __init__(self, camera_index: int, seq: int, frame: np.ndarray,
+                 tracks: List[Track], latency: float):
+        self.camera_index = camera_index
+        self.seq = seq
+        self.frame = frame
+        self.tracks = tracks
+        self.latency = latency
+
+
+class CameraSource:
+    """
+    One camera / video file with its bounded frame queue
+
+    Live cameras drop the oldest queued frame when the queue is full;
+    video files block the reader instead (backpressure, no frame lost).
+    """
+
+    def __init__(self, index: int, source: Union[int, str], queue_size: int):
+        self.index = index
+        self.source = source
+        self.is_file = isinstance(source, str) and os.path.isfile(source)
+        self.camera = CameraManager(source, threaded=False)
+        self.door = (
+            config.CAMERA_DOORS[index] if index < len(config.CAMERA_DOORS) else str(index)
+        )
+        self.tracker = FaceTracker()
+
+        self.queue = deque()
+        self.queue_size = queue_size
+        self.busy = False  # A worker is processing a frame of this source
+        self.finished = False
+
+        # Statistics
+        self.frames_read = 0
+        self.frames_dropped = 0
+        self.frames_processed = 0
+        self.latency_sum = 0.0
+
+    def stats(self) -> dict:
+        return {
+            "source": self.source,
+            "queue_depth": len(self.queue),
+            "read": self.frames_read,
+            "dropped": self.frames_dropped,
+            "processed": self.frames_processed,
+            "avg_latency_ms": (
+                1000.0 * self.latency_sum / self.frames_processed
+                if self.frames_processed
+                else 0.0
+            ),
+        }
+
+
+class MultiCameraManager:
+    """
+    Multi-source capture + shared inference worker pool
+
+    Attributes:
+        sources: CameraSource list
+        num_workers: Inference threads (each owns detector + recognizer)
+        on_result: Callback(FrameResult) called from worker threads
+    """
+
+    def __init__(
+        self,
+        sources: List[Union[int, str]] = None,
+        num_workers: int = None,
+        queue_size: int = None,
+        on_result: Optional[Callable[[FrameResult], None]] = None,
+    ):
+        sources = sources if sources is not None else config.CAMERA_SOURCES
+        queue_size = queue_size or config.MULTI_CAMERA_QUEUE_SIZE
+        self.sources = [CameraSource(i, s, queue_size) for i, s in enumerate(sources)]
+        self.num_workers = num_workers or config.INFERENCE_WORKERS
+        self.on_result = on_result
+
+        self.database = Database()
+
+        # Gallery loaded once per process, shared by every worker's recognizer
+        self.gallery = model_registry.get_recognizer()
+
+        self._cond = threading.Condition()
+        self._running = False
+        self._threads: List[threading.Thread] = []
+        self._next_source = 0
+
+    # ==================== LIFECYCLE ====================
+
+    def start(self) -> bool:
+        """Open all sources and start reader + worker threads"""
+        opened = [s for s in self.sources if s.camera.open()]
+        if not opened:
+            print("[MultiCameraManager] ERROR: No source could be opened")
+            return False
+
+        self._running = True
+        for source in opened:
+            t = threading.Thread(
+                target=self._reader_loop, args=(source,),
+                name=f"reader-{source.index}", daemon=True,
+            )
+            t.start()
+            self._threads.append(t)
+
+        for i in range(self.num_workers):
+            t = threading.Thread(
+                target=self._worker_loop, name=f"inference-{i}", daemon=True
+            )
+            t.start()
+            self._threads.append(t)
+
+        if config.DEBUG:
+            print(f"[MultiCameraManager] Started {len(opened)} sources, "
+                  f"{self.num_workers} workers")
+        return True
+
+    def stop(self) -> None:
+        """Stop all threads and release the cameras"""
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join(timeout=2.0)
+        self._threads = []
+        for source in self.sources:
+            source.camera.release()
+
+    def refresh_gallery(self) -> None:
+        """Reload embeddings (e.g. after training); workers pick it up"""
+        self.gallery.load_embeddings()
+
+    def is_running(self) -> bool:
+        """False once stopped or when every video file has been consumed"""
+        if not self._running:
+            return False
+        with self._cond:
+            return not all(s.finished and not s.queue and not s.busy for s in self.sources)
+
+    def stats(self) -> List[dict]:
+        with self._cond:
+            return [s.stats() for s in self.sources]
+
+    # ==================== THREADS ====================
+
+    def _reader_loop(self, source: CameraSource) -> None:
+        """Read frames of one source into its bounded queue"""
+        while self._running:
+            ret, frame = source.camera.read()
+            if not ret:
+                if source.is_file:
+                    break  # End of video
+                time.sleep(0.05)
+                continue
+
+            with self._cond:
+                if source.is_file:
+                    # Backpressure: wait for room instead of dropping
+                    self._cond.wait_for(
+                        lambda: len(source.queue) < source.queue_size or not self._running
+                    )
+                elif len(source.queue) >= source.queue_size:
+                    source.queue.popleft()
+                    source.frames_dropped += 1
+
+                source.frames_read += 1
+                source.queue.append((source.frames_read, time.time(), frame))
+                self._cond.notify_all()
+
+        with self._cond:
+            source.finished = True
+            self._cond.notify_all()
+
+    def _take_work(self) -> Optional[CameraSource]:
+        """
+        Pick the next source with queued frames that no worker is handling
+        (round-robin; keeps each source's frames in order for its tracker)
+        """
+        n = len(self.sources)
+        for offset in range(n):
+            source = self.sources[(self._next_source + offset) % n]
+            if source.queue and not source.busy:
+                self._next_source = (source.index + 1) % n
+                source.busy = True
+                return source
+        return None
+
+    def _worker_loop(self) -> None:
+        """Inference worker: own warmed-up YuNet + SFace instances, shared gallery"""
+        detector = model_registry.thread_detector()
+        recognizer = model_registry.thread_recognizer()
+        recognizer.attach_gallery(self.gallery)
+
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: not self._running or self._take_work_ready())
+                if not self._running:
+                    return
+                source = self._take_work()
+                if source is None:
+                    continue
+                seq, captured_at, frame = source.queue.popleft()
+                self._cond.notify_all()  # Room in the queue for the reader
+
+            try:
+                if recognizer.gallery is not self.gallery.gallery:
+                    recognizer.attach_gallery(self.gallery)
+                tracks = self._process(source, frame, detector, recognizer)
+                result = FrameResult(
+                    source.index, seq, frame, tracks, time.time() - captured_at
+                )
+                if self.on_result is not None:
+                    self.on_result(result)
+            except Exception as e:
+                print(f"[MultiCameraManager] ERROR processing source "
+                      f"{source.source}: {e}")
+                result = None
+            finally:
+                with self._cond:
+                    source.busy = False
+                    if result is not None:
+                        source.frames_processed += 1
+                        source.latency_sum += result.latency
+                    self._cond.notify_all()
+
+    def _take_work_ready(self) -> bool:
+        return any(s.queue and not s.busy for s in self.sources)
+
+    def _process(self, source: CameraSource, frame: np.ndarray,
+                 detector: YuNetDetector, recognizer: SFaceRecognizer) -> List[Track]:
+        """Detect, track, recognize due tracks (batched) and log access"""
+        detections = detector.detect_with_landmarks(frame)
+        tracks = source.tracker.update(detections)
+
+        pending = [
+            t for t in tracks
+            if source.tracker.needs_recognition(t, recognizer.get_threshold())
+        ]
+        predictions = recognizer.predict_faces(frame, [t.detection for t in pending])
+        for track, (name, score) in zip(pending, predictions):
+            source.tracker.set_identity(track, name, score)
+
+        for track in tracks:
+            if source.tracker.should_log(track):
+                status = "GRANTED" if track.name != config.UNKNOWN_PERSON_NAME else "DENIED"
+                # Non-blocking: queued for the background log writer
+                self.database.log_access(
+                    track.name, "SFACE", track.score, status, door=source.door
+                )
+        return tracks
+
+
+# ==================== TESTING ====================
+
+if __name__ == "__main__":
+    import sys
+
+    print("Testing Multi-Camera Manager...")
+    print("=" * 50)
+
+    # Sources from the command line (camera IDs or video files)
+    sources = [int(a) if a.isdigit() else a for a in sys.argv[1:]] or None
+    manager = MultiCameraManager(sources)
+
+    if not manager.start():
+        sys.exit(1)
+
+    try:
+        while manager.is_running():
+            time.sleep(2.0)
+            for s in manager.stats():
+                print(f"  {s['source']}: queue={s['queue_depth']} read={s['read']} "
+                      f"dropped={s['dropped']} processed={s['processed']} "
+                      f"latency={s['avg_latency_ms']:.1f}ms")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        manager.stop()
+
+    print("=" * 50)
+    print("Multi-camera test completed")
@@ -0,0 +1,246 @@
+"""
+Frame Pipeline Module
+Chạy các bước capture → detect → recognize → render song song, nối bằng hàng đợi có giới hạn
+
+Each stage runs in its own thread and hands FramePackets to the next one
+through a StageQueue. A full queue drops its oldest packet, so a slow stage
+never builds up latency: it always works on the newest frame available.
+YuNet, SFace and cv2 drawing release the GIL, so detection of frame N+1
+overlaps recognition of frame N and throughput approaches the slowest
+stage instead of the sum of all stages.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import config
+
+
+class FramePacket:
+    """
+    One frame travelling through the pipeline
+
+    Attributes:
+        seq: Capture sequence number
+        frame: Raw BGR frame (never drawn on)
+        t_capture: time.perf_counter() at capture
+        detections: Detection dicts of the tracked faces (detect stage)
+        tracks: Matching Track objects (detect stage)
+        faces: (bbox, name, score) per face, frozen by the recognize stage
+        outputs: Whatever the last stage produces for the consumer
+    """
+
+    def __init__(self, seq: int, frame: np.ndarray):
+        self.seq = seq
+        self.frame = frame
+        self.t_capture = time.perf_counter()
+        self.detections: List[dict] = []
+        self.tracks: list = []
+        self.faces: List[Tuple[Tuple[int, int, int, int], str, float]] = []
+        self.outputs: Any = None
+
+
+class StageQueue:
+    """
+    Bounded FIFO that drops the oldest item when full
+
+    Attributes:
+        maxsize: Items kept
+        dropped: Items discarded to make room
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def put(self, item) -> None:
+        """Append without blocking (evicts the oldest item if full)"""
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout: float = None):
+        """Oldest item, or None on timeout / after close()"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._items or self._closed, timeout)
+            return self._items.popleft() if self._items else None
+
+    def close(self) -> None:
+        """Wake up every waiting get()"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class PipelineStage:
+    """
+    One worker thread: input queue → fn → output queue
+
+    The first stage has no input queue; its fn() is a source called in a
+    loop (returning None when it has nothing, e.g. a failed camera read).
+
+    Attributes:
+        name: Stage name (thread name and stats key)
+        processed: Packets emitted
+        busy_time: Seconds spent inside fn
+        latency_sum: Sum of (emit time - capture time) over emitted packets
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable,
+        input_queue: Optional[StageQueue],
+        output_queue: StageQueue,
+    ):
+        self.name = name
+        self.fn = fn
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+        # Statistics
+        self.processed = 0
+        self.errors = 0
+        self.busy_time = 0.0
+        self.latency_sum = 0.0
+
+    def start(self) -> None:
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=f"stage-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0) -> None:
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while self._running:
+            if self.input_queue is not None:
+                packet = self.input_queue.get(timeout=0.1)
+                if packet is None:
+                    continue
+
+            start = time.perf_counter()
+            try:
+                out = self.fn(packet) if self.input_queue is not None else self.fn()
+            except Exception as e:
+                self.errors += 1
+                print(f"[Pipeline] ERROR in stage '{self.name}': {e}")
+                continue
+            end = time.perf_counter()
+            self.busy_time += end - start
+
+            if out is None:
+                continue
+            self.processed += 1
+            self.latency_sum += end - out.t_capture
+            self.output_queue.put(out)
+
+    def get_stats(self) -> dict:
+        n = self.processed
+        return {
+            "queue_depth": len(self.input_queue) if self.input_queue is not None else 0,
+            "dropped": self.input_queue.dropped if self.input_queue is not None else 0,
+            "processed": n,
+            "errors": self.errors,
+            "avg_ms": self.busy_time * 1000 / n if n else 0.0,
+            "latency_ms": self.latency_sum * 1000 / n if n else 0.0,
+        }
+
+
+class FramePipeline:
+    """
+    Chain of PipelineStages with bounded drop-oldest queues between them
+
+    Example:
+        pipeline = FramePipeline([("capture", read), ("detect", detect), ("render", render)])
+        pipeline.start()
+        packet = pipeline.get()  # newest fully processed FramePacket
+
+    Attributes:
+        stages: PipelineStage list, source first
+        output: Queue of finished packets (consumer side)
+    """
+
+    def __init__(self, stages: List[Tuple[str, Callable]], queue_size: int = None):
+        queue_size = queue_size or config.PIPELINE_QUEUE_SIZE
+        self.stages: List[PipelineStage] = []
+        input_queue = None
+        for i, (name, fn) in enumerate(stages):
+            # Finished packets: keep only the newest
+            output_queue = StageQueue(1 if i == len(stages) - 1 else queue_size)
+            self.stages.append(PipelineStage(name, fn, input_queue, output_queue))
+            input_queue = output_queue
+        self.output = input_queue
+
+    def start(self) -> None:
+        # Consumers first, so the source never feeds a stopped stage
+        for stage in reversed(self.stages):
+            stage.start()
+
+    def stop(self) -> None:
+        for stage in self.stages:
+            stage.stop()
+        self.output.close()
+
+    def get(self, timeout: float = 1.0) -> Optional[FramePacket]:
+        """Next finished packet (None on timeout)"""
+        return self.output.get(timeout)
+
+    def get_stats(self) -> Dict[str, dict]:
+        """Per-stage queue depth, drops, ms per packet and latency since capture"""
+        stats = {stage.name: stage.get_stats() for stage in self.stages}
+        stats["output"] = {"queue_depth": len(self.output), "dropped": self.output.dropped}
+        return stats
+
+
+# ==================== TESTING ====================
+
+if __name__ == "__main__":
+    import cv2
+
+    print("Testing Frame Pipeline...")
+    print("=" * 50)
+
+    frame = np.random.default_rng(0).integers(0, 255, (480, 640, 3), dtype=np.uint8)
+    seq = [0]
+
+    def capture():
+        time.sleep(1 / 60)  # 60 FPS camera
+        seq[0] += 1
+        return FramePacket(seq[0], frame)
+
+    def heavy(packet):
+        cv2.GaussianBlur(packet.frame, (31, 31), 0)  # Releases the GIL
+        return packet
+
+    stages = [("capture", capture), ("detect", heavy), ("recognize", heavy), ("render", heavy)]
+    pipeline = FramePipeline(stages)
+    pipeline.start()
+    start = time.perf_counter()
+    received = 0
+    while time.perf_counter() - start < 2.0:
+        if pipeline.get() is not None:
+            received += 1
+    pipeline.stop()
+
+    print(f"Output FPS: {received / 2.0:.1f}")
+    for name, s in pipeline.get_stats().items():
+        print(f"  {name}: {s}")
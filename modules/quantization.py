@@ -0,0 +1,159 @@
+"""
+Gallery Quantization Module
+Lưu và tính điểm gallery ở dạng float16 hoặc int8 (scale theo từng vector)
+
+float16 halves the gallery; int8 stores each row as round(x / s) with a
+per-row float32 scale s = max|x| / 127 (about 4x smaller). Scoring converts
+one chunk of rows at a time to float32, so no full-size float32 copy of the
+gallery is ever materialized.
+"""
+
+from typing import List, Union
+
+import numpy as np
+import config
+
+
+GALLERY_DTYPES = ("float32", "float16", "int8")
+
+
+class QuantizedMatrix:
+    """
+    (N, D) gallery stored as float16 or per-row scaled int8
+
+    Indexing (matrix[rows]) returns dequantized float32 rows, so search
+    indexes written for plain arrays keep working; scores() is the chunked
+    full-gallery scoring path.
+
+    Attributes:
+        data: (N, D) float16 or int8 array (may be a memmap)
+        scales: (N,) float32 row scales (int8 only, None for float16)
+    """
+
+    def __init__(self, data: np.ndarray, scales: np.ndarray = None):
+        self.data = data
+        self.scales = scales
+
+    @classmethod
+    def from_float32(cls, matrix: np.ndarray, dtype: str) -> "QuantizedMatrix":
+        """
+        Quantize a float32 matrix
+
+        Args:
+            matrix: (N, D) float32 rows
+            dtype: 'float16' or 'int8'
+        """
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if dtype == "float16":
+            return cls(matrix.astype(np.float16))
+        if dtype == "int8":
+            scales = np.abs(matrix).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            data = np.rint(matrix / scales[:, None]).astype(np.int8)
+            return cls(data, scales.astype(np.float32))
+        raise ValueError(f"Unsupported gallery dtype: {dtype}")
+
+    @property
+    def dtype(self) -> str:
+        return self.data.dtype.name
+
+    @property
+    def shape(self):
+        return self.data.shape
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes + (0 if self.scales is None else self.scales.nbytes)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, rows) -> np.ndarray:
+        """Dequantized float32 rows"""
+        block = self.data[rows].astype(np.float32)
+        if self.scales is not None:
+            block *= self.scales[rows][..., None]
+        return block
+
+    def take(self, rows) -> "QuantizedMatrix":
+        """Row subset, still quantized"""
+        return QuantizedMatrix(
+            np.ascontiguousarray(self.data[rows]),
+            None if self.scales is None else self.scales[rows].copy(),
+        )
+
+    @classmethod
+    def concatenate(cls, parts: List["QuantizedMatrix"]) -> "QuantizedMatrix":
+        """Stack row blocks of the same dtype as they are (no requantization)"""
+        scales = [p.scales for p in parts]
+        return cls(
+            np.concatenate([p.data for p in parts]),
+            None if scales[0] is None else np.concatenate(scales),
+        )
+
+    def to_float32(self) -> np.ndarray:
+        return self[:]
+
+    def scores(self, queries: np.ndarray, chunk_rows: int = None) -> np.ndarray:
+        """
+        queries @ gallery.T, one chunk of rows at a time
+
+        Args:
+            queries: (M, D) float32 probes
+            chunk_rows: Rows converted to float32 per step
+
+        Returns:
+            (M, N) float32 cosine similarities
+        """
+        chunk_rows = chunk_rows or config.SFACE_SCORE_CHUNK_ROWS
+        queries = np.asarray(queries, dtype=np.float32)
+        out = np.empty((len(queries), len(self.data)), dtype=np.float32)
+        for start in range(0, len(self.data), chunk_rows):
+            end = start + chunk_rows
+            block = self.data[start:end].astype(np.float32)
+            np.matmul(queries, block.T, out=out[:, start:end])
+            if self.scales is not None:
+                # Scale after the product: M*N multiplies instead of N*D
+                out[:, start:end] *= self.scales[start:end]
+        return out
+
+
+def quantize_gallery(
+    matrix: np.ndarray, dtype: str = None
+) -> Union[np.ndarray, QuantizedMatrix]:
+    """
+    Gallery in the configured representation (SFACE_GALLERY_DTYPE)
+
+    float32 returns the matrix unchanged.
+    """
+    dtype = dtype or config.SFACE_GALLERY_DTYPE
+    if dtype == "float32":
+        return matrix
+    if isinstance(matrix, QuantizedMatrix):
+        if matrix.dtype == dtype:
+            return matrix
+        matrix = matrix.to_float32()
+    return QuantizedMatrix.from_float32(matrix, dtype)
+
+
+# ==================== TESTING ====================
+
+if __name__ == "__main__":
+    print("Testing Gallery Quantization...")
+    print("=" * 50)
+
+    rng = np.random.default_rng(0)
+    gallery = rng.standard_normal((10000, config.SFACE_EMBEDDING_SIZE)).astype(np.float32)
+    gallery /= np.linalg.norm(gallery, axis=1, keepdims=True)
+    probes = gallery[:100] + 0.05 * rng.standard_normal((100, gallery.shape[1])).astype(np.float32)
+    probes /= np.linalg.norm(probes, axis=1, keepdims=True)
+    exact = probes @ gallery.T
+
+    for dtype in ("float16", "int8"):
+        q = QuantizedMatrix.from_float32(gallery, dtype)
+        scores = q.scores(probes)
+        print(
+            f"{dtype}: {gallery.nbytes / q.nbytes:.1f}x smaller, "
+            f"max score error {np.abs(scores - exact).max():.5f}, "
+            f"top-1 agreement {np.mean(scores.argmax(1) == exact.argmax(1)):.3f}"
+        )
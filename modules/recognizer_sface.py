@@ -2,11 +2,19 @@ import cv2
 import numpy as np
 from typing import Tuple, List, Optional, Union
 import os
+import time
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
 import config
 from .database import Database
+from .search_index import create_index
+from .face_aligner import FaceAligner
+from .quantization import QuantizedMatrix, quantize_gallery
+from .embedding_cache import EmbeddingCache, file_sha1, model_fingerprint
 
 # Import Detector for alignment during training
 from .detector_yunet import YuNetDetector
+from . import model_registry
 
 
 class SFaceRecognizer:
@@ -14,12 +22,26 @@ class SFaceRecognizer:
     SFace face recognizer using ONNX model
     """
 
-    def __init__(self, threshold: Optional[float] = None):
+    def __init__(self, threshold: Optional[float] = None, model_path: Optional[str] = None):
         self.threshold = threshold or config.SFACE_THRESHOLD
-        self.model_path = config.SFACE_MODEL_PATH
+        self.model_path = model_path or config.SFACE_MODEL_PATH
         self.model = None
+        # Raw DNN net for batched forward passes (loaded on first batch)
+        self.net = None
+        self.batch_supported = True
+        self.aligner = FaceAligner()
+        # Crop mode of live faces: the one the loaded gallery was embedded
+        # with (SFACE_ALIGN_FACES after a full training)
+        self.align_faces = bool(config.SFACE_ALIGN_FACES)
         self.known_names: List[str] = []
-        self.known_embeddings: List[np.ndarray] = []
+        # Dataset image behind each gallery row (for incremental training)
+        self.known_sources: List[Optional[str]] = []
+        # Gallery: contiguous (N, D) matrix, rows L2-normalized
+        # (float32, or QuantizedMatrix with SFACE_GALLERY_DTYPE float16/int8)
+        self.gallery: Union[np.ndarray, QuantizedMatrix] = np.empty(
+            (0, config.SFACE_EMBEDDING_SIZE), dtype=np.float32
+        )
+        self.index = create_index()
         self.database = Database()
         self.is_trained = False
 
@@ -32,6 +54,104 @@ class SFaceRecognizer:
         """Internal logging helper"""
         print(f"[SFaceRecognizer] {msg}")
 
+    @property
+    def known_embeddings(self) -> np.ndarray:
+        """Gallery embeddings, one row per enrolled image"""
+        return self.gallery
+
+    def _set_gallery(
+        self,
+        names: List[str],
+        embeddings: Union[List[np.ndarray], np.ndarray, QuantizedMatrix],
+        sources: Optional[List[Optional[str]]] = None,
+    ) -> None:
+        """
+        Pack embeddings into one contiguous, pre-normalized matrix so
+        predict() scores the whole gallery with a single mat-vec product
+        (quantized to SFACE_GALLERY_DTYPE when configured).
+
+        sources: Dataset-relative image path of each row (None if unknown)
+        """
+        if len(embeddings) == 0:
+            self.known_names = []
+            self.known_sources = []
+            self.gallery = np.empty(
+                (0, config.SFACE_EMBEDDING_SIZE), dtype=np.float32
+            )
+            self.index = create_index(self.index.kind)
+            return
+
+        if isinstance(embeddings, QuantizedMatrix):
+            # Stored quantized rows are already normalized
+            matrix = quantize_gallery(embeddings)
+        else:
+            matrix = np.ascontiguousarray(
+                np.vstack([np.asarray(e).reshape(1, -1) for e in embeddings])
+                if isinstance(embeddings, list)
+                else embeddings,
+                dtype=np.float32,
+            )
+            # Normalize only rows that need it: already-stored rows stay
+            # bit-identical to their on-disk copy
+            norms = np.linalg.norm(matrix, axis=1)
+            unnormalized = ~np.isclose(norms, 1.0, atol=1e-4) & (norms > 0)
+            if unnormalized.any():
+                matrix = matrix.copy()  # Never modify the caller's array
+                matrix[unnormalized] /= norms[unnormalized, None]
+            matrix = quantize_gallery(matrix)
+
+        self.known_names = list(names)
+        self.known_sources = list(sources) if sources else [None] * len(names)
+        self.gallery = matrix
+        self._build_index()
+
+    def _gallery_fingerprint(self) -> str:
+        """Hash of names + vectors, used to validate a persisted index"""
+        digest = hashlib.sha1()
+        digest.update("\n".join(self.known_names).encode("utf-8"))
+        if isinstance(self.gallery, QuantizedMatrix):
+            digest.update(np.ascontiguousarray(self.gallery.data).tobytes())
+            if self.gallery.scales is not None:
+                digest.update(self.gallery.scales.tobytes())
+        else:
+            digest.update(memoryview(self.gallery).cast("B"))
+        return digest.hexdigest()
+
+    def _build_index(self) -> None:
+        """(Re)build the search index over the current gallery"""
+        _, labels = np.unique(np.array(self.known_names), return_inverse=True)
+        labels = labels.astype(np.int64)
+
+        if not self.index.persistent:
+            self.index.build(self.gallery, labels)
+            return
+
+        # Reuse the index saved next to the embeddings if it matches
+        fingerprint = self._gallery_fingerprint()
+        state = self.database.load_index()
+        if (
+            str(state.get("kind", "")) == self.index.kind
+            and str(state.get("fingerprint", "")) == fingerprint
+            and self.index.load_state(self.gallery, labels, state)
+        ):
+            if config.DEBUG:
+                self._log(f"[OK] Search index loaded ({self.index.kind})")
+            return
+
+        self.index.build(self.gallery, labels)
+        state = dict(self.index.get_state())
+        state["kind"] = np.array(self.index.kind)
+        state["fingerprint"] = np.array(fingerprint)
+        self.database.save_index(state)
+
+    def set_index_type(self, kind: str) -> None:
+        """Switch gallery search strategy ('flat', 'prototype', 'ivf')"""
+        self.index = create_index(kind)
+        if len(self.gallery):
+            self._build_index()
+        if config.DEBUG:
+            self._log(f"Search index: {kind}")
+
     def load_model(self) -> bool:
         """Load SFace ONNX model"""
         if not os.path.exists(self.model_path):
@@ -48,11 +168,39 @@ class SFaceRecognizer:
             self._log(f"ERROR loading model: {e}")
             return False
 
-        # align_face method removed as we switched to BBox cropping
+    def _load_batch_net(self) -> bool:
+        """Load the SFace ONNX graph as a cv2.dnn net for batched inference"""
+        if self.net is not None:
+            return True
+        try:
+            self.net = cv2.dnn.readNet(self.model_path)
+            return True
+        except Exception as e:
+            self._log(f"WARNING: Batched inference unavailable: {e}")
+            self.batch_supported = False
+            return False
+
+    def warm_up(self) -> float:
+        """
+        Run the single and the batched forward pass once on blank crops
+
+        Loads the batch net and lets OpenCV plan both networks at load time
+        instead of on the first recognized face (or first multi-face frame).
+
+        Returns:
+            float: Warm-up time in ms (0 if the model is not loaded)
+        """
+        if self.model is None:
+            return 0.0
+        blank = np.zeros((112, 112, 3), dtype=np.uint8)
+        start = time.perf_counter()
+        self.extract_embedding(blank)
+        self.extract_embeddings([blank, blank])
+        return (time.perf_counter() - start) * 1000
 
     def extract_embedding(self, face_image: np.ndarray) -> Optional[np.ndarray]:
         """
-        Extract 512-d embedding from face image (Crop -> Resize -> Feature -> Norm)
+        Extract embedding from face image (Crop/Aligned -> Resize -> Feature -> Norm)
         """
         if self.model is None:
             return None
@@ -76,43 +224,121 @@ class SFaceRecognizer:
                 self._log(f"ERROR extracting embedding: {e}")
             return None
 
-    def train(self, dataset_path: Optional[str] = None) -> bool:
-        """Train SFace from dataset with BBox Cropping"""
-        if self.model is None:
-            self._log("ERROR: Model not loaded")
-            return False
+    def extract_embeddings(self, face_images: List[np.ndarray]) -> Optional[np.ndarray]:
+        """
+        Extract embeddings for several face crops with one forward pass
 
-        dataset_path = dataset_path or config.DATASET_DIR
-        if not os.path.exists(dataset_path):
-            self._log(f"ERROR: Dataset not found: {dataset_path}")
-            return False
+        All crops are resized to 112x112 and stacked into a single
+        (M, 3, 112, 112) blob (same preprocessing as FaceRecognizerSF.feature).
+        Falls back to one feature() call per crop if the net rejects batches.
 
-        self._log(f"Training from dataset: {dataset_path}")
+        Returns:
+            (M, D) L2-normalized embeddings, or None on failure
+        """
+        if self.model is None or not face_images:
+            return None
 
-        # Initialize detector for training alignment
-        detector = YuNetDetector()
-        if detector.model is None:
-            self._log("ERROR: Detector not available for training alignment")
-            return False
+        try:
+            crops = [
+                f if f.shape[0] == 112 and f.shape[1] == 112 else cv2.resize(f, (112, 112))
+                for f in face_images
+            ]
 
-        names, embeddings = [], []
-        user_dirs = [
+            embeddings = None
+            if len(crops) > 1 and self.batch_supported and self._load_batch_net():
+                try:
+                    blob = cv2.dnn.blobFromImages(
+                        crops, 1.0, (112, 112), (0, 0, 0), swapRB=True, crop=False
+                    )
+                    self.net.setInput(blob)
+                    embeddings = self.net.forward().reshape(len(crops), -1)
+                except Exception as e:
+                    self._log(f"WARNING: Batched forward failed, using single mode: {e}")
+                    self.batch_supported = False
+
+            if embeddings is None:
+                embeddings = np.vstack([self.model.feature(c).reshape(1, -1) for c in crops])
+
+            # L2 Normalize
+            embeddings = embeddings.astype(np.float32)
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            return embeddings / norms
+        except Exception as e:
+            if config.DEBUG:
+                self._log(f"ERROR extracting embeddings: {e}")
+            return None
+
+    def _analyze_image_file(
+        self, detector: YuNetDetector, image_path: str
+    ) -> Optional[dict]:
+        """
+        Training pipeline for one dataset image
+        (Decode -> Detect -> Largest face -> Align/Crop -> Stats -> Embed)
+
+        The quality filter is applied later (_passes_quality), so the result
+        can be cached and reused when the thresholds change.
+
+        Returns:
+            EmbeddingCache entry, or None if the image cannot be read
+        """
+        img = cv2.imread(image_path)
+        if img is None:
+            return None
+
+        no_face = {"bbox": None, "mean": 0.0, "std": 0.0, "embedding": None}
+
+        # Detect face to crop
+        # Used 0.6 conf threshold (default)
+        faces = detector.detect_with_landmarks(img)
+
+        if not faces:
+            return no_face
+
+        # Take largest face
+        face = max(faces, key=lambda f: f["bbox"][2] * f["bbox"][3])
+
+        # Align (or BBox crop) as configured: training (re)builds the gallery
+        # in the SFACE_ALIGN_FACES mode
+        face_crop = self.face_crops(img, [face], aligned=config.SFACE_ALIGN_FACES)[0]
+        if face_crop.size == 0:
+            return no_face
+
+        return {
+            "bbox": tuple(int(v) for v in face["bbox"]),
+            "mean": float(np.mean(face_crop)),
+            "std": float(np.std(face_crop)),
+            "embedding": self.extract_embedding(face_crop),
+        }
+
+    @staticmethod
+    def _passes_quality(entry: Optional[dict]) -> bool:
+        """Filter Low Quality (Dark/Flat) faces"""
+        return (
+            entry is not None
+            and entry["embedding"] is not None
+            and entry["mean"] >= config.TRAIN_MIN_FACE_MEAN
+            and entry["std"] >= config.TRAIN_MIN_FACE_STD
+        )
+
+    def _list_training_images(self, dataset_path: str) -> List[Tuple[str, str]]:
+        """
+        (user_name, image_path) pairs in deterministic (sorted) order
+        """
+        jobs = []
+        user_dirs = sorted(
             d
             for d in os.listdir(dataset_path)
             if os.path.isdir(os.path.join(dataset_path, d)) and not d.startswith(".")
-        ]
-
-        if not user_dirs:
-            self._log("ERROR: No user directories found")
-            return False
+        )
 
         for user_name in user_dirs:
             user_path = os.path.join(dataset_path, user_name)
-            image_files = [
+            image_files = sorted(
                 f
                 for f in os.listdir(user_path)
                 if f.lower().endswith((".jpg", ".jpeg", ".png"))
-            ]
+            )
 
             if len(image_files) < config.MIN_IMAGES_PER_PERSON:
                 self._log(
@@ -121,37 +347,296 @@ class SFaceRecognizer:
                 )
 
             for image_file in image_files[: config.MAX_IMAGES_PER_PERSON]:
-                image_path = os.path.join(user_path, image_file)
-                img = cv2.imread(image_path)
-                if img is None:
-                    continue
+                jobs.append((user_name, os.path.join(user_path, image_file)))
+
+        return jobs
+
+    def _analyze_images(
+        self, image_paths: List[str], num_workers: int
+    ) -> List[Optional[dict]]:
+        """
+        Analyze dataset images, sharded across a process pool
+
+        Each worker process owns its YuNet and SFace instances. Results come
+        back in input order, so training output is deterministic regardless
+        of the number of workers.
+        """
+        total = len(image_paths)
+        step = max(1, total // 10)
+        results: List[Optional[dict]] = []
+
+        def report(done: int) -> None:
+            if done % step == 0 or done == total:
+                self._log(f"Progress: {done}/{total} images ({100 * done // total}%)")
+
+        if num_workers <= 1 or total < 2:
+            # Reuses this thread's warmed-up detector across training runs
+            detector = model_registry.thread_detector()
+            if detector.model is None:
+                self._log("ERROR: Detector not available for training alignment")
+                return [None] * total
+            for i, path in enumerate(image_paths, 1):
+                results.append(self._analyze_image_file(detector, path))
+                report(i)
+            return results
+
+        self._log(f"Training with {num_workers} worker processes")
+        chunksize = max(1, min(16, total // (num_workers * 4)))
+        with ProcessPoolExecutor(
+            max_workers=num_workers, initializer=_init_train_worker
+        ) as executor:
+            for i, entry in enumerate(
+                executor.map(_train_worker_analyze, image_paths, chunksize=chunksize), 1
+            ):
+                results.append(entry)
+                report(i)
+        return results
+
+    def _model_fingerprint(self) -> str:
+        """Models + preprocessing behind cached embeddings (see EmbeddingCache)"""
+        return model_fingerprint(
+            [self.model_path, config.YUNET_MODEL_PATH],
+            {
+                "aligned": bool(config.SFACE_ALIGN_FACES),
+                "detection_max_side": config.DETECTION_MAX_SIDE,
+            },
+        )
+
+    def _manifest_settings(self, dataset_path: str, fingerprint: str) -> dict:
+        """Settings that invalidate the whole gallery when changed"""
+        return {
+            "dataset": os.path.abspath(dataset_path),
+            "model": fingerprint,
+            "min_face_mean": config.TRAIN_MIN_FACE_MEAN,
+            "min_face_std": config.TRAIN_MIN_FACE_STD,
+        }
+
+    def _scan_dataset(
+        self, jobs: List[Tuple[str, str]], dataset_path: str, previous: dict
+    ) -> Tuple[dict, List[str]]:
+        """
+        Compare dataset images against the previous manifest
+
+        An image is unchanged when its mtime and size match; otherwise its
+        SHA-1 decides (a touched but identical file is not re-embedded).
+
+        Returns:
+            (manifest images {rel_path: entry}, rel_paths to embed)
+        """
+        images, pending = {}, []
+        for user_name, path in jobs:
+            rel = os.path.relpath(path, dataset_path).replace(os.sep, "/")
+            stat = os.stat(path)
+            old = previous.get(rel)
+
+            if (
+                old is not None
+                and old["user"] == user_name
+                and old["mtime"] == stat.st_mtime
+                and old["size"] == stat.st_size
+            ):
+                images[rel] = old
+                continue
+
+            sha1 = file_sha1(path)
+            if old is not None and old["user"] == user_name and old["sha1"] == sha1:
+                images[rel] = dict(old, mtime=stat.st_mtime, size=stat.st_size)
+                continue
+
+            images[rel] = {
+                "user": user_name,
+                "sha1": sha1,
+                "mtime": stat.st_mtime,
+                "size": stat.st_size,
+                "embedded": False,
+            }
+            pending.append(rel)
+
+        return images, pending
+
+    def _append_rows(
+        self, keep: np.ndarray, added: List[np.ndarray]
+    ) -> Union[np.ndarray, QuantizedMatrix]:
+        """
+        Kept gallery rows followed by new embeddings
+
+        Kept rows stay exactly as stored: a quantized gallery is not
+        dequantized and quantized again (that would drift from the rows
+        on disk and invalidate the persisted index). Only the new rows
+        are normalized and quantized, to the dtype of the gallery.
+        """
+        if isinstance(self.gallery, QuantizedMatrix):
+            kept = self.gallery.take(keep)
+        else:
+            kept = self.gallery[keep]
+        if not added:
+            return kept
+
+        new = np.vstack([np.asarray(e, dtype=np.float32).reshape(1, -1) for e in added])
+        norms = np.linalg.norm(new, axis=1, keepdims=True)
+        new = new / np.where(norms > 0, norms, 1.0)
+        if isinstance(kept, QuantizedMatrix):
+            return QuantizedMatrix.concatenate(
+                [kept, QuantizedMatrix.from_float32(new, kept.dtype)]
+            )
+        return np.vstack([kept, new])
+
+    def _save_gallery(
+        self,
+        manifest: Optional[dict] = None,
+        removed: Optional[np.ndarray] = None,
+        added: int = 0,
+    ) -> bool:
+        """
+        Persist embeddings and (optionally) the training manifest
+
+        Args:
+            manifest: Training manifest to save alongside
+            removed: Positions (in the previously saved gallery) of deleted rows;
+                     when given, only the delta is written instead of the
+                     whole gallery
+            added: Number of rows appended at the end of self.gallery
+
+        A delta refused because the stored gallery changed since it was
+        loaded (another process enrolled or deleted users) is not applied:
+        the gallery is reloaded from disk and False is returned.
+        """
+        if removed is None:
+            saved = self.database.save_embeddings(
+                self.known_names, self.gallery, aligned=self.align_faces
+            )
+        else:
+            start = len(self.known_names) - added
+            # Quantized rows are appended as they are, not re-quantized
+            rows = (
+                self.gallery.take(slice(start, None))
+                if isinstance(self.gallery, QuantizedMatrix)
+                else self.gallery[start:]
+            )
+            saved = self.database.update_embeddings(
+                removed,
+                self.known_names[start:],
+                rows,
+                expected_revision=self.database.gallery_revision,
+            )
+            if not saved:
+                # Positions in removed may point at other rows now
+                self.load_embeddings()
+        if not saved:
+            return False
+        if manifest is not None:
+            manifest["rows"] = list(self.known_sources)
+            return self.database.save_manifest(manifest)
+        return True
+
+    def train(
+        self,
+        dataset_path: Optional[str] = None,
+        num_workers: Optional[int] = None,
+        incremental: bool = False,
+    ) -> bool:
+        """
+        Train SFace from dataset (landmark alignment or BBox cropping)
+        Args:
+            dataset_path: Dataset root (one sub-directory per user)
+            num_workers: Worker processes (default TRAIN_WORKERS, 0 = CPU count)
+            incremental: Only embed new/changed images and drop removed ones
+                         (falls back to a full retrain without a valid manifest)
+        """
+        if self.model is None:
+            self._log("ERROR: Model not loaded")
+            return False
 
-                # Detect face to crop
-                # Used 0.6 conf threshold (default)
-                faces = detector.detect_faces(img)
+        dataset_path = dataset_path or config.DATASET_DIR
+        if not os.path.exists(dataset_path):
+            self._log(f"ERROR: Dataset not found: {dataset_path}")
+            return False
 
-                if not faces:
-                    continue
+        self._log(f"Training from dataset: {dataset_path}")
 
-                # Take largest face
-                x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+        jobs = self._list_training_images(dataset_path)
+        if not jobs:
+            self._log("ERROR: No user directories found")
+            return False
+
+        fingerprint = self._model_fingerprint()
+        settings = self._manifest_settings(dataset_path, fingerprint)
+        previous = {}
+        if incremental:
+            manifest = self.database.load_manifest()
+            if not self.is_trained and self.database.model_exists("sface"):
+                self.load_embeddings()
+            if (
+                manifest.get("settings") == settings
+                and self.is_trained
+                and None not in self.known_sources
+            ):
+                previous = manifest.get("images", {})
+            else:
+                self._log("No manifest or training settings changed, running full training")
+                incremental = False
 
-                # Crop
-                face_crop = img[y : y + h, x : x + w]
-                if face_crop.size == 0:
-                    continue
+        images, pending = self._scan_dataset(jobs, dataset_path, previous)
+        pending_set = set(pending)
 
-                # Filter Low Quality (Dark/Flat)
-                # Mean > 40, Std > 20
-                if np.mean(face_crop) < 40 or np.std(face_crop) < 20:
-                    continue
+        # Gallery rows kept as-is: source image still present and unchanged
+        if incremental:
+            keep = np.array(
+                [src in images and src not in pending_set for src in self.known_sources],
+                dtype=bool,
+            )
+        else:
+            keep = np.zeros(len(self.known_names), dtype=bool)
 
-                embedding = self.extract_embedding(face_crop)
-                if embedding is not None:
-                    names.append(user_name)
-                    embeddings.append(embedding)
+        manifest = {"settings": settings, "images": images}
+        if incremental:
+            removed = len(keep) - int(keep.sum())
+            self._log(
+                f"Incremental update: {len(pending)} new/changed images, "
+                f"{removed} embeddings dropped, {len(images) - len(pending)} unchanged"
+            )
+            if not pending and removed == 0:
+                self._save_gallery(manifest, removed=np.empty(0, dtype=np.int64))
+                self._log("[OK] Embeddings already up to date")
+                return True
+
+        if num_workers is None:
+            num_workers = config.TRAIN_WORKERS
+        num_workers = num_workers or os.cpu_count() or 1
+
+        # Content-addressed cache: only never-seen images go through the models
+        cache = EmbeddingCache()
+        cache.open(fingerprint)
+        analyses = {rel: cache.get(images[rel]["sha1"]) for rel in pending}
+        misses = [rel for rel in pending if analyses[rel] is None]
+
+        start = time.perf_counter()
+        paths = [os.path.join(dataset_path, rel) for rel in misses]
+        outputs = self._analyze_images(paths, num_workers) if paths else []
+        for rel, entry in zip(misses, outputs):
+            if entry is not None:
+                cache.put(images[rel]["sha1"], entry)
+            analyses[rel] = entry
+        if misses:
+            cache.save()
+        self._log(
+            f"Embedded {len(paths)} images in {time.perf_counter() - start:.1f}s "
+            f"({cache.hits} cache hits)"
+        )
 
-        if not embeddings:
+        names = [n for n, k in zip(self.known_names, keep) if k]
+        sources = [s for s, k in zip(self.known_sources, keep) if k]
+        added = []
+        for rel in pending:
+            entry = analyses[rel]
+            images[rel]["embedded"] = self._passes_quality(entry)
+            if images[rel]["embedded"]:
+                names.append(images[rel]["user"])
+                sources.append(rel)
+                added.append(entry["embedding"])
+        embeddings = self._append_rows(keep, added)
+
+        if len(embeddings) == 0:
             self._log(
                 "ERROR: No valid embeddings extracted. (Check dataset quality/lighting)"
             )
@@ -161,11 +646,20 @@ class SFaceRecognizer:
             f"Total embeddings: {len(embeddings)}, Unique users: {len(set(names))}"
         )
 
-        self.known_names = names
-        self.known_embeddings = embeddings
+        self._set_gallery(names, embeddings, sources)
         self.is_trained = True
-
-        if self.database.save_embeddings(names, embeddings):
+        # Incremental training only runs on a gallery of the same mode
+        self.align_faces = bool(config.SFACE_ALIGN_FACES)
+
+        # Incremental: append new rows + tombstone dropped ones (O(delta))
+        delta = {}
+        if incremental:
+            delta = {
+                "removed": np.flatnonzero(~keep),
+                "added": len(names) - int(keep.sum()),
+            }
+
+        if self._save_gallery(manifest, **delta):
             self._log("[OK] Training completed and embeddings saved")
             return True
 
@@ -176,14 +670,26 @@ class SFaceRecognizer:
         """Load embeddings from file"""
         try:
             names, embeddings = self.database.load_embeddings()
-            if not names or not embeddings:
+            if not names or len(embeddings) == 0:
                 self._log("ERROR: Failed to load embeddings")
                 return False
 
-            self.known_names = names
-            self.known_embeddings = embeddings
+            # Source image of each row (needed by incremental training)
+            rows = self.database.load_manifest().get("rows")
+            sources = rows if rows is not None and len(rows) == len(names) else None
+
+            self._set_gallery(names, embeddings, sources)
             self.is_trained = True
 
+            # Probes must be cropped like the stored rows (e.g. a gallery
+            # migrated from embeddings.pkl is not aligned)
+            self.align_faces = self.database.gallery_aligned
+            if self.align_faces != bool(config.SFACE_ALIGN_FACES):
+                self._log(
+                    f"Gallery embedded with{'' if self.align_faces else 'out'} face "
+                    "alignment: live faces use the same crops until the next full training"
+                )
+
             self._log(
                 f"[OK] Embeddings loaded: {len(names)} encodings, "
                 f"{len(set(names))} unique users"
@@ -193,13 +699,28 @@ class SFaceRecognizer:
             self._log(f"ERROR loading embeddings: {e}")
             return False
 
+    def attach_gallery(self, other: "SFaceRecognizer") -> None:
+        """
+        Share another recognizer's gallery and search index (no copy)
+
+        Used by worker pools: each worker owns its FaceRecognizerSF
+        instance but all of them search the same read-only gallery.
+        """
+        self.known_names = other.known_names
+        self.known_sources = other.known_sources
+        self.gallery = other.gallery
+        self.align_faces = other.align_faces
+        self.index = other.index
+        self.threshold = other.threshold
+        self.is_trained = other.is_trained
+
     def predict(self, face_roi: np.ndarray) -> Tuple[str, float]:
         """
         Recognize face using Cosine Similarity on Face Crop
         Args:
             face_roi: Cropped face image (BGR)
         """
-        if not self.is_trained or not self.known_embeddings or self.model is None:
+        if not self.is_trained or len(self.gallery) == 0 or self.model is None:
             return config.UNKNOWN_PERSON_NAME, 0.0
 
         # Step 1: Extract (Resize + Feature + Norm)
@@ -207,30 +728,103 @@ class SFaceRecognizer:
         if embedding is None:
             return config.UNKNOWN_PERSON_NAME, 0.0
 
-        try:
-            # cv2.FaceRecognizerSF_FR_COSINE returns Cosine Similarity (1 is same, -1 is opposite)
-            scores = [
-                self.model.match(
-                    embedding.astype(np.float32).reshape(1, -1),
-                    known.astype(np.float32).reshape(1, -1),
-                    cv2.FaceRecognizerSF_FR_COSINE,
-                )
-                for known in self.known_embeddings
-            ]
+        # Step 2: Match against the gallery
+        return self.match_embedding(embedding)
 
-            max_score = float(np.max(scores))
-            best_match_idx = int(np.argmax(scores))
-            best_match_name = self.known_names[best_match_idx]
+    def face_crops(
+        self, frame: np.ndarray, detections: List[dict], aligned: Optional[bool] = None
+    ) -> List[np.ndarray]:
+        """
+        Model inputs for detected faces
 
-            # Check threshold (Higher is better for Similarity)
-            if max_score > self.threshold:
-                return best_match_name, max_score
-            else:
-                return config.UNKNOWN_PERSON_NAME, max_score
+        Aligned 112x112 warps written into the aligner's reusable buffers,
+        or plain bbox crops.
+
+        Args:
+            frame: Full frame (BGR)
+            detections: YuNetDetector.detect_with_landmarks() output
+            aligned: Crop mode (default: the mode of the loaded gallery)
+        """
+        if self.align_faces if aligned is None else aligned:
+            return self.aligner.align_batch(frame, [d["landmarks"] for d in detections])
+
+        crops = []
+        for d in detections:
+            x, y, w, h = d["bbox"]
+            crops.append(frame[y : y + h, x : x + w])
+        return crops
+
+    def predict_faces(
+        self, frame: np.ndarray, detections: List[dict]
+    ) -> List[Tuple[str, float]]:
+        """
+        Recognize every detected face of a frame (align/crop + batch predict)
+        Args:
+            frame: Full frame (BGR)
+            detections: YuNetDetector.detect_with_landmarks() output
+        """
+        if not detections:
+            return []
+        return self.predict_batch(self.face_crops(frame, detections))
+
+    def predict_batch(self, face_rois: List[np.ndarray]) -> List[Tuple[str, float]]:
+        """
+        Recognize several faces (e.g. every face in a frame) at once
+        Args:
+            face_rois: Cropped face images (BGR)
+        Returns:
+            One (name, score) per crop, in input order
+        """
+        unknown = [(config.UNKNOWN_PERSON_NAME, 0.0)] * len(face_rois)
+        if not face_rois:
+            return []
+        if not self.is_trained or len(self.gallery) == 0 or self.model is None:
+            return unknown
+
+        embeddings = self.extract_embeddings(face_rois)
+        if embeddings is None:
+            return unknown
+
+        return self.match_embeddings(embeddings)
+
+    def match_embedding(self, embedding: np.ndarray) -> Tuple[str, float]:
+        """
+        Match an L2-normalized embedding against the gallery
+        Args:
+            embedding: Probe embedding (D,)
+        Returns:
+            (name, cosine similarity) - name is UNKNOWN below threshold
+        """
+        return self.match_embeddings(np.asarray(embedding).reshape(1, -1))[0]
+
+    def match_embeddings(self, embeddings: np.ndarray) -> List[Tuple[str, float]]:
+        """
+        Match a (M, D) batch of L2-normalized embeddings against the gallery
+        Returns:
+            One (name, cosine similarity) per row
+        """
+        if len(self.gallery) == 0:
+            return [(config.UNKNOWN_PERSON_NAME, 0.0)] * len(embeddings)
+
+        try:
+            # Rows and probe are unit vectors -> dot product == cosine similarity
+            # (same value as cv2.FaceRecognizerSF_FR_COSINE, one BLAS call)
+            probes = np.asarray(embeddings, dtype=np.float32)
+            rows, scores = self.index.search(probes)
+
+            results = []
+            for row, score in zip(rows, scores):
+                # Check threshold (Higher is better for Similarity)
+                score = float(score)
+                if score > self.threshold:
+                    results.append((self.known_names[int(row)], score))
+                else:
+                    results.append((config.UNKNOWN_PERSON_NAME, score))
+            return results
 
         except Exception as e:
             self._log(f"ERROR during prediction: {e}")
-            return config.UNKNOWN_PERSON_NAME, 0.0
+            return [(config.UNKNOWN_PERSON_NAME, 0.0)] * len(embeddings)
 
     def update_threshold(self, new_threshold: float) -> None:
         self.threshold = new_threshold
@@ -248,25 +842,68 @@ class SFaceRecognizer:
 
     def delete_user(self, name: str) -> bool:
         """Xóa user khỏi bộ nhớ và database"""
-        if not self.known_names:
-            return False
+        # Second attempt after a save refused because the stored gallery
+        # changed meanwhile (_save_gallery reloaded it)
+        for _ in range(2):
+            if not self.known_names:
+                return False
 
-        indices_to_keep = [i for i, n in enumerate(self.known_names) if n != name]
-        if len(indices_to_keep) == len(self.known_names):
-            self._log(f"User '{name}' not found in embeddings")
-            return False
+            keep = np.array([n != name for n in self.known_names], dtype=bool)
+            if keep.all():
+                self._log(f"User '{name}' not found in embeddings")
+                return False
 
-        self.known_names = [self.known_names[i] for i in indices_to_keep]
-        self.known_embeddings = [self.known_embeddings[i] for i in indices_to_keep]
+            self._set_gallery(
+                [n for n in self.known_names if n != name],
+                self.gallery.take(keep)
+                if isinstance(self.gallery, QuantizedMatrix)
+                else self.gallery[keep],
+                [s for s, k in zip(self.known_sources, keep) if k],
+            )
 
-        if self.database.save_embeddings(self.known_names, self.known_embeddings):
-            self._log(f"User '{name}' deleted from embeddings")
-            return True
+            # Forget the user's images so a later incremental train re-embeds them
+            manifest = self.database.load_manifest()
+            if manifest:
+                manifest["images"] = {
+                    rel: entry
+                    for rel, entry in manifest.get("images", {}).items()
+                    if entry["user"] != name
+                }
+
+            if self._save_gallery(manifest or None, removed=np.flatnonzero(~keep)):
+                self._log(f"User '{name}' deleted from embeddings")
+                return True
 
         self._log("ERROR: Failed to save embeddings after deletion")
         return False
 
 
+# ==================== TRAINING WORKERS ====================
+
+
+# Per-process instances, created once by the pool initializer
+_worker_detector: Optional[YuNetDetector] = None
+_worker_recognizer: Optional[SFaceRecognizer] = None
+
+
+def _init_train_worker() -> None:
+    """ProcessPoolExecutor initializer: load YuNet + SFace in this process"""
+    global _worker_detector, _worker_recognizer
+    # One OpenCV thread per process: parallelism comes from the pool
+    cv2.setNumThreads(1)
+    _worker_detector = model_registry.thread_detector()
+    _worker_recognizer = model_registry.thread_recognizer()
+
+
+def _train_worker_analyze(image_path: str) -> Optional[dict]:
+    """Analyze one dataset image inside a worker process"""
+    try:
+        return _worker_recognizer._analyze_image_file(_worker_detector, image_path)
+    except Exception as e:
+        print(f"[SFaceRecognizer] ERROR embedding {image_path}: {e}")
+        return None
+
+
 # ==================== TESTING ====================
 if __name__ == "__main__":
     print("Testing SFace Recognizer...")
@@ -0,0 +1,362 @@
+"""
+Gallery Search Index Module
+Các cấu trúc tìm kiếm embedding cho SFaceRecognizer (pure NumPy)
+
+All indexes work on L2-normalized rows, so the dot product is the cosine
+similarity. search() takes a (M, D) batch of probes and returns the best
+gallery row and its score for each probe. The gallery may be a float32
+array or a QuantizedMatrix (rows are dequantized on access).
+"""
+
+import numpy as np
+from typing import Dict, Optional, Tuple, Union
+import config
+from .quantization import QuantizedMatrix
+
+
+def spherical_kmeans(
+    x: np.ndarray, k: int, iterations: int = 10, seed: int = 0
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    K-means on the unit sphere (cosine similarity)
+
+    Args:
+        x: (N, D) L2-normalized rows
+        k: Number of clusters (clipped to N)
+        iterations: Lloyd iterations
+        seed: RNG seed (deterministic result for the same input)
+
+    Returns:
+        (centroids (k, D), assignment (N,))
+    """
+    n = len(x)
+    k = max(1, min(k, n))
+    rng = np.random.default_rng(seed)
+    centroids = x[rng.choice(n, size=k, replace=False)].copy()
+    assignment = np.zeros(n, dtype=np.int64)
+
+    for _ in range(iterations):
+        assignment = np.argmax(x @ centroids.T, axis=1)
+
+        # Per-cluster sums in one pass: sort rows by cluster, reduceat
+        order = np.argsort(assignment, kind="stable")
+        counts = np.bincount(assignment, minlength=k)
+        starts = np.cumsum(counts) - counts
+        filled = counts > 0
+        centroids[filled] = np.add.reduceat(x[order], starts[filled], axis=0)
+
+        # Re-seed empty clusters with random points
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            centroids[empty] = x[rng.integers(n, size=len(empty))]
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids /= norms
+
+    assignment = np.argmax(x @ centroids.T, axis=1)
+    return centroids.astype(np.float32), assignment
+
+
+def k_medoids(x: np.ndarray, k: int, iterations: int = 5) -> np.ndarray:
+    """
+    Greedy k-medoids (cosine distance) for a small set of rows
+
+    Args:
+        x: (N, D) L2-normalized rows
+        k: Number of medoids (clipped to N)
+        iterations: Assignment/update rounds
+
+    Returns:
+        Row indices of the medoids
+    """
+    n = len(x)
+    k = max(1, min(k, n))
+    sim = x @ x.T
+
+    # Build: start from the most central point, then add the point that
+    # improves total similarity the most
+    medoids = [int(np.argmax(sim.sum(axis=1)))]
+    while len(medoids) < k:
+        best = sim[:, medoids].max(axis=1)
+        gain = np.maximum(sim - best[None, :], 0).sum(axis=1)
+        gain[medoids] = -1
+        medoids.append(int(np.argmax(gain)))
+
+    # Update: move each medoid to the most central member of its cluster
+    for _ in range(iterations):
+        assignment = np.argmax(sim[:, medoids], axis=1)
+        updated = []
+        for c, m in enumerate(medoids):
+            members = np.flatnonzero(assignment == c)
+            if len(members) == 0:
+                updated.append(m)
+                continue
+            within = sim[np.ix_(members, members)].sum(axis=1)
+            updated.append(int(members[np.argmax(within)]))
+        if updated == medoids:
+            break
+        medoids = updated
+
+    return np.array(medoids, dtype=np.int64)
+
+
+class FlatIndex:
+    """
+    Exact brute-force search (one mat-mul over the whole gallery)
+
+    Base class of all indexes. Indexes with persistent = True can export
+    their trained structures with get_state() and restore them with
+    load_state() instead of rebuilding at startup.
+    """
+
+    kind = "flat"
+    persistent = False
+
+    def __init__(self):
+        self.matrix: Optional[Union[np.ndarray, QuantizedMatrix]] = None
+        self.labels: Optional[np.ndarray] = None
+
+    def build(self, matrix: np.ndarray, labels: np.ndarray) -> None:
+        """
+        Args:
+            matrix: (N, D) L2-normalized gallery (float32 or QuantizedMatrix)
+            labels: (N,) integer identity id of each row
+        """
+        self.matrix = matrix
+        self.labels = labels
+
+    def __len__(self) -> int:
+        return 0 if self.matrix is None else len(self.matrix)
+
+    def get_state(self) -> Dict[str, np.ndarray]:
+        """Trained structures to persist (arrays only)"""
+        return {}
+
+    def load_state(
+        self, matrix: np.ndarray, labels: np.ndarray, state: Dict[str, np.ndarray]
+    ) -> bool:
+        """
+        Restore from get_state() output without retraining
+
+        Returns:
+            bool: False if the state does not fit this index/gallery
+        """
+        return False
+
+    def search(self, queries: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Args:
+            queries: (M, D) L2-normalized probes
+
+        Returns:
+            (best row index (M,), cosine similarity (M,))
+        """
+        if isinstance(self.matrix, QuantizedMatrix):
+            scores = self.matrix.scores(queries)
+        else:
+            scores = queries @ self.matrix.T
+        rows = np.argmax(scores, axis=1)
+        return rows, scores[np.arange(len(queries)), rows]
+
+
+class PrototypeIndex(FlatIndex):
+    """
+    Two-stage search: score per-identity prototypes, then re-rank exactly
+    inside the rows of the top-k identities
+
+    Attributes:
+        method: 'centroid' (spherical k-means) or 'kmedoids'
+        prototypes_per_label: Representatives kept per identity
+        top_k: Identities re-ranked with the full embeddings
+    """
+
+    kind = "prototype"
+
+    def __init__(
+        self,
+        method: str = None,
+        prototypes_per_label: int = None,
+        top_k: int = None,
+    ):
+        super().__init__()
+        self.method = method or config.SFACE_PROTOTYPE_METHOD
+        self.prototypes_per_label = (
+            prototypes_per_label or config.SFACE_PROTOTYPES_PER_USER
+        )
+        self.top_k = top_k or config.SFACE_PROTOTYPE_TOP_K
+
+        self.prototypes: Optional[np.ndarray] = None
+        self.prototype_labels: Optional[np.ndarray] = None
+        # Gallery rows grouped by label: order[offsets[l]:offsets[l + 1]]
+        self.order: Optional[np.ndarray] = None
+        self.offsets: Optional[np.ndarray] = None
+        self.num_labels = 0
+
+    def build(self, matrix: np.ndarray, labels: np.ndarray) -> None:
+        super().build(matrix, labels)
+
+        self.num_labels = int(labels.max()) + 1 if len(labels) else 0
+        self.order = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels, minlength=self.num_labels)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+
+        prototypes, prototype_labels = [], []
+        for label in range(self.num_labels):
+            rows = matrix[self.order[self.offsets[label] : self.offsets[label + 1]]]
+            if len(rows) == 0:
+                continue
+            if self.method == "kmedoids":
+                reps = rows[k_medoids(rows, self.prototypes_per_label)]
+            elif self.prototypes_per_label == 1:
+                reps = rows.mean(axis=0, keepdims=True)
+                reps /= max(np.linalg.norm(reps), 1e-12)
+            else:
+                reps, _ = spherical_kmeans(rows, self.prototypes_per_label)
+            prototypes.append(reps)
+            prototype_labels.extend([label] * len(reps))
+
+        # Prototypes are ordered by label, so per-label max is a reduceat
+        self.prototypes = np.ascontiguousarray(np.vstack(prototypes), dtype=np.float32)
+        self.prototype_labels = np.array(prototype_labels, dtype=np.int64)
+        self._prototype_starts = np.flatnonzero(
+            np.r_[True, np.diff(self.prototype_labels) != 0]
+        )
+        self._present_labels = self.prototype_labels[self._prototype_starts]
+
+    def search(self, queries: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # Stage 1: coarse score per identity
+        proto_scores = queries @ self.prototypes.T
+        label_scores = np.maximum.reduceat(proto_scores, self._prototype_starts, axis=1)
+
+        k = min(self.top_k, label_scores.shape[1])
+        if k < label_scores.shape[1]:
+            top = np.argpartition(-label_scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.tile(np.arange(k), (len(queries), 1))
+
+        # Stage 2: exact re-rank inside the candidate identities
+        best_rows = np.empty(len(queries), dtype=np.int64)
+        best_scores = np.empty(len(queries), dtype=np.float32)
+        for i, query in enumerate(queries):
+            candidates = np.concatenate(
+                [
+                    self.order[self.offsets[l] : self.offsets[l + 1]]
+                    for l in self._present_labels[top[i]]
+                ]
+            )
+            scores = self.matrix[candidates] @ query
+            j = int(np.argmax(scores))
+            best_rows[i] = candidates[j]
+            best_scores[i] = scores[j]
+
+        return best_rows, best_scores
+
+
+class IVFIndex(FlatIndex):
+    """
+    Inverted-file index: rows are bucketed by a spherical k-means coarse
+    quantizer and a probe only scans the nprobe closest buckets
+
+    Attributes:
+        nlist: Number of buckets (0 = 4 * sqrt(N))
+        nprobe: Buckets scanned per probe (recall@1 vs latency knob)
+    """
+
+    kind = "ivf"
+    persistent = True
+
+    def __init__(self, nlist: int = None, nprobe: int = None):
+        super().__init__()
+        self.nlist = config.SFACE_IVF_NLIST if nlist is None else nlist
+        self.nprobe = nprobe or config.SFACE_IVF_NPROBE
+
+        self.centroids: Optional[np.ndarray] = None
+        # Rows grouped by bucket: order[offsets[c]:offsets[c + 1]]
+        self.order: Optional[np.ndarray] = None
+        self.offsets: Optional[np.ndarray] = None
+
+    def build(self, matrix: np.ndarray, labels: np.ndarray) -> None:
+        super().build(matrix, labels)
+
+        n = len(matrix)
+        nlist = self.nlist or int(4 * np.sqrt(n))
+        nlist = max(1, min(nlist, n))
+
+        # Train the coarse quantizer on a sample, then assign every row
+        rng = np.random.default_rng(0)
+        sample_size = min(n, 64 * nlist)
+        sample = matrix[np.sort(rng.choice(n, size=sample_size, replace=False))]
+        self.centroids, _ = spherical_kmeans(sample, nlist)
+
+        assignment = np.empty(n, dtype=np.int64)
+        for start in range(0, n, 65536):
+            block = matrix[start : start + 65536]
+            assignment[start : start + 65536] = np.argmax(
+                block @ self.centroids.T, axis=1
+            )
+        self._set_buckets(assignment)
+
+    def _set_buckets(self, assignment: np.ndarray) -> None:
+        self.order = np.argsort(assignment, kind="stable")
+        counts = np.bincount(assignment, minlength=len(self.centroids))
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    def get_state(self) -> Dict[str, np.ndarray]:
+        return {"centroids": self.centroids, "order": self.order, "offsets": self.offsets}
+
+    def load_state(
+        self, matrix: np.ndarray, labels: np.ndarray, state: Dict[str, np.ndarray]
+    ) -> bool:
+        if not {"centroids", "order", "offsets"} <= set(state):
+            return False
+        if len(state["order"]) != len(matrix):
+            return False
+        if self.nlist and self.nlist != len(state["centroids"]):
+            return False
+
+        super().build(matrix, labels)
+        self.centroids = state["centroids"].astype(np.float32)
+        self.order = state["order"].astype(np.int64)
+        self.offsets = state["offsets"].astype(np.int64)
+        return True
+
+    def search(self, queries: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        coarse = queries @ self.centroids.T
+        nprobe = min(self.nprobe, len(self.centroids))
+        if nprobe < len(self.centroids):
+            probes = np.argpartition(-coarse, nprobe - 1, axis=1)[:, :nprobe]
+        else:
+            probes = np.tile(np.arange(nprobe), (len(queries), 1))
+
+        best_rows = np.empty(len(queries), dtype=np.int64)
+        best_scores = np.empty(len(queries), dtype=np.float32)
+        for i, query in enumerate(queries):
+            candidates = np.concatenate(
+                [self.order[self.offsets[c] : self.offsets[c + 1]] for c in probes[i]]
+            )
+            if len(candidates) == 0:
+                # All probed buckets empty: fall back to exact scan
+                candidates = np.arange(len(self.matrix))
+            scores = self.matrix[candidates] @ query
+            j = int(np.argmax(scores))
+            best_rows[i] = candidates[j]
+            best_scores[i] = scores[j]
+
+        return best_rows, best_scores
+
+
+INDEX_TYPES = {
+    FlatIndex.kind: FlatIndex,
+    PrototypeIndex.kind: PrototypeIndex,
+    IVFIndex.kind: IVFIndex,
+}
+
+
+def create_index(kind: str = None):
+    """
+    Create an empty search index by name ('flat', 'prototype', 'ivf')
+    """
+    kind = kind or config.SFACE_INDEX_TYPE
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type: {kind}")
+    return INDEX_TYPES[kind]()
@@ -0,0 +1,113 @@
+"""
+Startup Profiler Module
+Đo thời gian từng bước khởi động đến khung hình nhận diện đầu tiên (--profile-startup)
+
+Timestamps are measured from the moment this module is first imported
+(main.py imports it before anything heavy). Steps may run in several
+threads (e.g. model preloading overlaps the GUI build); each one records
+its own start and duration. Milestones such as the first processed frame
+are recorded once. Everything is a no-op until enabled.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Tuple
+
+
+class StartupProfiler:
+    """
+    Step timings and one-time milestones of the application startup
+
+    Attributes:
+        enabled: Record and print timings (off by default)
+        steps: (name, start offset s, duration s, thread name) per finished step
+        marks: (name, offset s) per milestone
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.t0 = time.perf_counter()
+        self.steps: List[Tuple[str, float, float, str]] = []
+        self.marks: List[Tuple[str, float]] = []
+        self._lock = threading.Lock()
+
+    def elapsed(self) -> float:
+        """Seconds since the profiler was created"""
+        return time.perf_counter() - self.t0
+
+    @contextmanager
+    def step(self, name: str):
+        """Time the enclosed block as one startup step"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            with self._lock:
+                self.steps.append(
+                    (name, start - self.t0, duration, threading.current_thread().name)
+                )
+
+    def mark(self, name: str) -> bool:
+        """
+        Record a milestone the first time it is reached (printed immediately)
+
+        Returns:
+            bool: True if this call recorded it
+        """
+        if not self.enabled:
+            return False
+        with self._lock:
+            if any(mark == name for mark, _ in self.marks):
+                return False
+            offset = self.elapsed()
+            self.marks.append((name, offset))
+        print(f"[Startup] {name}: {offset * 1000:.0f} ms after start")
+        return True
+
+    def report(self) -> str:
+        """Timing table of the steps and milestones recorded so far"""
+        with self._lock:
+            steps = sorted(self.steps, key=lambda s: s[1])
+            marks = list(self.marks)
+
+        lines = ["STARTUP PROFILE", f"  {'step':<28} {'start':>9} {'took':>9}  thread"]
+        for name, start, duration, thread in steps:
+            lines.append(
+                f"  {name:<28} {start * 1000:>7.0f}ms {duration * 1000:>7.0f}ms  {thread}"
+            )
+        for name, offset in marks:
+            lines.append(f"  * {name:<26} {offset * 1000:>7.0f}ms")
+        return "\n".join(lines)
+
+
+# Process-wide instance (enabled by main.py --profile-startup)
+profiler = StartupProfiler()
+
+
+# ==================== TESTING ====================
+
+if __name__ == "__main__":
+    print("Testing Startup Profiler...")
+    print("=" * 50)
+
+    profiler.enabled = True
+    with profiler.step("import"):
+        time.sleep(0.05)
+
+    def load():
+        with profiler.step("load models"):
+            time.sleep(0.1)
+
+    loader = threading.Thread(target=load, name="loader")
+    loader.start()
+    with profiler.step("build GUI"):
+        time.sleep(0.08)
+    loader.join()
+    profiler.mark("first frame")
+    profiler.mark("first frame")  # Recorded once
+    print(profiler.report())
@@ -0,0 +1,241 @@
+"""
+Face Tracker Module
+Gán ID cho khuôn mặt qua các frame để chỉ nhận diện 1 lần / track
+
+IoU matching between Kalman-predicted track boxes and new detections.
+Each track caches its identity; SFace only runs again on a schedule or
+while the match is borderline.
+"""
+
+import numpy as np
+from typing import List, Optional, Tuple
+import config
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """
+    Pairwise IoU of (x, y, w, h) boxes
+
+    Args:
+        boxes_a: (A, 4)
+        boxes_b: (B, 4)
+
+    Returns:
+        (A, B) IoU matrix
+    """
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+
+    ax2, ay2 = a[:, 0] + a[:, 2], a[:, 1] + a[:, 3]
+    bx2, by2 = b[:, 0] + b[:, 2], b[:, 1] + b[:, 3]
+
+    iw = np.minimum(ax2[:, None], bx2[None, :]) - np.maximum(a[:, None, 0], b[None, :, 0])
+    ih = np.minimum(ay2[:, None], by2[None, :]) - np.maximum(a[:, None, 1], b[None, :, 1])
+    inter = np.clip(iw, 0, None) * np.clip(ih, 0, None)
+
+    area_a = a[:, 2] * a[:, 3]
+    area_b = b[:, 2] * b[:, 3]
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-6), 0.0)
+
+
+class KalmanBoxFilter:
+    """
+    Constant-velocity Kalman filter on the box centre
+
+    State: [cx, cy, w, h, vx, vy]; size follows a random walk.
+    """
+
+    def __init__(self, bbox: Tuple[int, int, int, int]):
+        x, y, w, h = bbox
+        self.state = np.array([x + w / 2, y + h / 2, w, h, 0, 0], dtype=np.float64)
+        self.covariance = np.diag([10.0, 10.0, 10.0, 10.0, 100.0, 100.0])
+
+        self.transition = np.eye(6)
+        self.transition[0, 4] = 1.0
+        self.transition[1, 5] = 1.0
+        self.observation = np.eye(4, 6)
+        self.process_noise = np.diag([1.0, 1.0, 1.0, 1.0, 0.5, 0.5])
+        self.measurement_noise = np.diag([4.0, 4.0, 9.0, 9.0])
+
+    def predict(self) -> Tuple[int, int, int, int]:
+        self.state = self.transition @ self.state
+        self.covariance = (
+            self.transition @ self.covariance @ self.transition.T + self.process_noise
+        )
+        return self.bbox()
+
+    def update(self, bbox: Tuple[int, int, int, int]) -> None:
+        x, y, w, h = bbox
+        measurement = np.array([x + w / 2, y + h / 2, w, h], dtype=np.float64)
+
+        innovation = measurement - self.observation @ self.state
+        s = self.observation @ self.covariance @ self.observation.T + self.measurement_noise
+        gain = self.covariance @ self.observation.T @ np.linalg.inv(s)
+        self.state = self.state + gain @ innovation
+        self.covariance = (np.eye(6) - gain @ self.observation) @ self.covariance
+
+    def bbox(self) -> Tuple[int, int, int, int]:
+        cx, cy, w, h = self.state[:4]
+        w, h = max(w, 1.0), max(h, 1.0)
+        return int(cx - w / 2), int(cy - h / 2), int(w), int(h)
+
+
+class Track:
+    """
+    One tracked face
+
+    Attributes:
+        track_id: Unique ID
+        bbox: Last box (detected, or predicted while missed)
+        detection: Detection dict matched this frame (None if missed)
+        name / score: Cached identity (None until first recognition)
+        hits: Frames with a matched detection
+        misses: Consecutive frames without detection
+        frames_since_recognition: Frames since SFace last ran on this track
+        logged_name: Identity already written to the access log
+    """
+
+    def __init__(self, track_id: int, detection: dict):
+        self.track_id = track_id
+        self.filter = KalmanBoxFilter(detection["bbox"])
+        self.bbox = tuple(detection["bbox"])
+        self.detection: Optional[dict] = detection
+        self.name: Optional[str] = None
+        self.score = 0.0
+        self.hits = 1
+        self.misses = 0
+        self.frames_since_recognition = 0
+        self.logged_name: Optional[str] = None
+
+
+class FaceTracker:
+    """
+    Multi-face tracker (greedy IoU association + Kalman prediction)
+
+    Attributes:
+        iou_threshold: Minimum IoU to associate a detection with a track
+        max_misses: Frames a track survives without detections
+        recognition_interval: Frames between re-recognitions of a confident track
+        retry_interval: Frames between re-recognitions of a borderline/unknown track
+        confidence_margin: Score margin above threshold considered confident
+    """
+
+    def __init__(
+        self,
+        iou_threshold: float = None,
+        max_misses: int = None,
+        recognition_interval: int = None,
+        retry_interval: int = None,
+        confidence_margin: float = None,
+    ):
+        self.iou_threshold = iou_threshold or config.TRACKER_IOU_THRESHOLD
+        self.max_misses = (
+            config.TRACKER_MAX_MISSES if max_misses is None else max_misses
+        )
+        self.recognition_interval = (
+            recognition_interval or config.TRACKER_RECOGNITION_INTERVAL
+        )
+        self.retry_interval = retry_interval or config.TRACKER_RETRY_INTERVAL
+        self.confidence_margin = (
+            config.TRACKER_CONFIDENCE_MARGIN
+            if confidence_margin is None
+            else confidence_margin
+        )
+
+        self.tracks: List[Track] = []
+        self._next_id = 1
+
+        # Statistics
+        self.face_observations = 0
+        self.recognitions = 0
+
+    def reset(self) -> None:
+        """Drop all tracks (e.g. after gallery changes)"""
+        self.tracks = []
+
+    def update(self, detections: List[dict]) -> List[Track]:
+        """
+        Advance one frame
+
+        Args:
+            detections: YuNetDetector.detect_with_landmarks() output
+
+        Returns:
+            Tracks matched to a detection in this frame
+        """
+        for track in self.tracks:
+            track.bbox = track.filter.predict()
+            track.detection = None
+            track.frames_since_recognition += 1
+
+        unmatched = list(range(len(detections)))
+        if self.tracks and detections:
+            ious = iou_matrix(
+                [t.bbox for t in self.tracks], [d["bbox"] for d in detections]
+            )
+            # Greedy: best remaining pair first
+            for flat in np.argsort(-ious, axis=None):
+                ti, di = np.unravel_index(flat, ious.shape)
+                if ious[ti, di] < self.iou_threshold:
+                    break
+                track = self.tracks[ti]
+                if track.detection is not None or di not in unmatched:
+                    continue
+                track.filter.update(detections[di]["bbox"])
+                track.bbox = tuple(detections[di]["bbox"])
+                track.detection = detections[di]
+                track.hits += 1
+                track.misses = 0
+                unmatched.remove(di)
+
+        for track in self.tracks:
+            if track.detection is None:
+                track.misses += 1
+        self.tracks = [t for t in self.tracks if t.misses <= self.max_misses]
+
+        for di in unmatched:
+            self.tracks.append(Track(self._next_id, detections[di]))
+            self._next_id += 1
+
+        active = [t for t in self.tracks if t.detection is not None]
+        self.face_observations += len(active)
+        return active
+
+    def needs_recognition(self, track: Track, threshold: float) -> bool:
+        """
+        Whether SFace should run on this track in the current frame
+
+        Args:
+            track: Active track
+            threshold: Current recognizer threshold
+        """
+        if track.name is None:
+            return True
+        if track.score < threshold + self.confidence_margin:
+            return track.frames_since_recognition >= self.retry_interval
+        return track.frames_since_recognition >= self.recognition_interval
+
+    def set_identity(self, track: Track, name: str, score: float) -> None:
+        """Cache a recognition result on the track"""
+        track.name = name
+        track.score = score
+        track.frames_since_recognition = 0
+        self.recognitions += 1
+
+    def should_log(self, track: Track) -> bool:
+        """
+        True once per identity per track (replaces the per-name cooldown)
+        """
+        if track.name is None or track.hits < config.TRACKER_MIN_HITS:
+            return False
+        if track.name == track.logged_name:
+            return False
+        track.logged_name = track.name
+        return True
+
+    def recognition_rate(self) -> float:
+        """Recognizer invocations per observed face"""
+        if self.face_observations == 0:
+            return 0.0
+        return self.recognitions / self.face_observations
@@ -4,6 +4,7 @@ Script để train SFace model từ dataset
 """
 
 import os
+import sys
 import config
 from modules.recognizer_sface import SFaceRecognizer
 from modules.database import Database
@@ -68,8 +69,8 @@ def show_configuration():
     print(f"  - Threshold: 0.6 (default)")
 
 
-def train_model(dataset_dir):
-    """Thực hiện training"""
+def train_model(dataset_dir, incremental=True):
+    """Thực hiện training (incremental: chỉ embed ảnh mới / đã thay đổi)"""
     recognizer = SFaceRecognizer()
 
     if recognizer.model is None:
@@ -81,10 +82,10 @@ def train_model(dataset_dir):
     print("\nCreating face embeddings from dataset...")
     print("(This may take a while depending on dataset size...)")
 
-    if recognizer.train(dataset_dir):
+    if recognizer.train(dataset_dir, incremental=incremental):
         print_header("[OK] TRAINING COMPLETED SUCCESSFULLY!")
         print("\nEmbeddings saved to:")
-        print(f"  - {config.SFACE_EMBEDDINGS_PATH}")
+        print(f"  - {config.SFACE_GALLERY_DIR}")
         print(f"\nTrained users: {recognizer.get_user_list()}")
         print(f"Total embeddings: {len(recognizer.known_embeddings)}")
         print("\nYou can now run the main application:")
@@ -113,8 +114,9 @@ def main():
         print("Training cancelled")
         return
 
+    # --full: bỏ qua manifest, embed lại toàn bộ dataset
     print_header("TRAINING IN PROGRESS...")
-    train_model(dataset_dir)
+    train_model(dataset_dir, incremental="--full" not in sys.argv)
 
     print("\nDone!")
 